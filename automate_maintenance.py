@@ -47,7 +47,7 @@ def discard_uncommitted_changes(repo_dir, paths_to_discard):
     """Discard uncommitted changes in specified paths and remove them from tracking."""
     print(f"Discarding uncommitted changes in {paths_to_discard}...")
     os.chdir(repo_dir)
-    success, _, _ = run_command(f"git rm -r --cached {' '.join(paths_to_discard)}")
+    success, _, _ = run_command(f"git rm -r --cached --ignore-unmatch {' '.join(paths_to_discard)}")
     if not success:
         print("Failed to remove paths from tracking. They may not be tracked.")
     success, _, _ = run_command(f"git checkout -- {' '.join(paths_to_discard)}")
@@ -123,7 +123,7 @@ def test_gro_instructor(project_dir):
     """Test gro_instructor.py in the project directory."""
     print(f"Testing gro_instructor.py in {project_dir}...")
     os.chdir(project_dir)
-    success, output, error = run_command("python src/gro_instructor.py", timeout=10, input_data="Hello\n")
+    success, output, error = run_command("python src/gro_client.py", timeout=10, input_data="Hello\n")
     print(f"Output: {output}")
     print(f"Error: {error}")
     if "Hey there! How can I assist you today?" not in output:
@@ -137,7 +137,7 @@ def main():
     project_dir = r"F:\TestProject"
     file_name = "setup_project.py"
     backup_branch = "backup-before-4fea491-reset"
-    paths_to_discard = ["data/historical/history_log.jsonl", "data/historical/state.json"]
+    paths_to_discard = ["data/historical/history_log.jsonl", "data/historical/history_log", "data/historical/state.json"]
 
     # Step 1: Create .gitignore
     create_gitignore(repo_dir)
@@ -0,0 +1,63 @@
+"""Time the history analytics over a large segmented log.
+
+Builds a HistoryStore with --entries entries spread over --days days, then
+times loading the columns from its index and each aggregate. Run it with
+and without NumPy installed to compare the vectorized and fallback paths.
+
+    python benchmarks/bench_analytics.py --entries 2000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src import analytics
+from src.analytics import Analytics
+from src.storage.history_store import HistoryStore
+
+INPUTS = ["Debug #e1", "Plan the release #e2", "Run the migration #e3", "Project task #e4", "Hello #e5"]
+
+
+def build_store(directory, count, days):
+    store = HistoryStore(directory)
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / count
+    for first in range(0, count, 50000):
+        store.append_many({"input": f"{INPUTS[i % 5]} {i % 1000}",
+                           "timestamp": (start + timedelta(seconds=i * step)).isoformat(),
+                           "weight": (i * 7 + i // 3) % 5 + 1} for i in range(first, min(first + 50000, count)))
+    return store
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:22} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = build_store(os.path.join(tmp, "history_log"), args.entries, args.days)
+        print(f"{len(store)} entries over {args.days} days, numpy: {'yes' if analytics.np is not None else 'no'}")
+        data = timed("load columns", lambda: Analytics.from_log(store))
+        timed("weight counts", data.weight_counts)
+        timed("histogram by day", lambda: data.histogram("day"))
+        timed("histogram by hour", lambda: data.histogram("hour"))
+        timed("rolling priority", lambda: data.rolling_priority(50))
+        week = timed("last 7 days window", lambda: data.window((datetime.now() - timedelta(days=7)).isoformat()))
+        timed(f"top inputs ({len(week)})", lambda: week.top_inputs(10))
+        timed("weekly summary", week.summary)
+
+
+if __name__ == "__main__":
+    main()
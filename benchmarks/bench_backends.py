@@ -0,0 +1,98 @@
+"""Compare the JSON and SQLite storage backends at growing history sizes.
+
+For each size it builds a state with that many chat_summaries and a log with
+that many entries, then times a cold load, one small state commit, a log
+append and the three indexed log reads.
+
+    python benchmarks/bench_backends.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.storage.backends import JsonBackend, SqliteBackend
+
+
+def make_entries(count):
+    start = datetime(2025, 1, 1)
+    return [{"input": f"Project task {i} #e{i % 5 + 1}",
+             "timestamp": (start + timedelta(seconds=i)).isoformat(),
+             "weight": i % 5 + 1} for i in range(count)]
+
+
+def make_state(entries):
+    return {
+        "history": entries[-5:],
+        "chat_summaries": [{"date": e["timestamp"][:10], "summary": f"Recent activity: {e['input']}"} for e in entries],
+        "e3_reflections": [],
+        "wip": {},
+        "related_data": {},
+        "progress": "",
+        "latest_input": entries[-1]["input"],
+        "input_count": len(entries),
+    }
+
+
+def timed(fn, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3)
+
+
+def bench(backend_factory, entries):
+    backend = backend_factory()
+    backend.write_state(make_state(entries))
+    for start in range(0, len(entries), 50000):
+        backend.log.append_many(entries[start:start + 50000])
+    backend.close()
+
+    results = {}
+    backend = backend_factory()
+    holder = {}
+    results["cold_load_ms"] = timed(lambda: holder.update(state=backend.read_state(dict)))
+    state = holder["state"]
+
+    def commit_one():
+        state["chat_summaries"].append({"date": "2025-06-01", "summary": "Recent activity: 1x #e1"})
+        state["input_count"] += 1
+        backend.write_state(state)
+    results["commit_one_summary_ms"] = timed(commit_one, repeat=5)
+    extra = make_entries(1)[0]
+    results["log_append_ms"] = timed(lambda: backend.log.append(extra), repeat=5)
+    results["log_last_10_ms"] = timed(lambda: backend.log.last(10), repeat=5)
+    since = entries[-100]["timestamp"]
+    results["log_since_ms"] = timed(lambda: backend.log.since(since), repeat=5)
+    results["log_weight_last_10_ms"] = timed(lambda: backend.log.with_weight(3, limit=10), repeat=5)
+    backend.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    report = {}
+    for size in args.sizes:
+        entries = make_entries(size)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_file = os.path.join(tmp_dir, "state.json")
+            report[size] = {
+                "json": bench(lambda: JsonBackend(state_file, os.path.join(tmp_dir, "history_log")), entries),
+                "sqlite": bench(lambda: SqliteBackend(os.path.join(tmp_dir, "state.db")), entries),
+            }
+        print(json.dumps({size: report[size]}, indent=2), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare full copies of state.json with the incremental snapshot+delta backups backup_state_json makes.
+
+Simulates a state.json that gains a few summaries between backups and
+reports total backup time, disk footprint and restore time.
+
+    python benchmarks/bench_backup.py --summaries 20000 --backups 100
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.src.backup import IncrementalBackup
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--summaries", type=int, default=5000, help="chat_summaries in the initial state")
+    parser.add_argument("--backups", type=int, default=50)
+    parser.add_argument("--growth", type=int, default=5, help="summaries added between backups")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "state.json")
+        state = {"history": [], "chat_summaries": [{"date": "2025-03-18", "summary": f"Recent activity: {i}x #e1"}
+                                                   for i in range(args.summaries)],
+                 "input_count": 0, "progress": ""}
+        timings = {"copy": 0.0, "incremental": 0.0}
+        incremental = IncrementalBackup(os.path.join(tmp, "incremental"), keep=args.backups)
+        for n in range(args.backups):
+            for i in range(args.growth):
+                state["chat_summaries"].append({"date": "2025-03-19", "summary": f"Backup {n} item {i}"})
+            state["input_count"] += args.growth
+            state["progress"] = f"Updated {n}"
+            with open(source, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+
+            start = time.perf_counter()
+            os.makedirs(os.path.join(tmp, "copies"), exist_ok=True)
+            shutil.copy2(source, os.path.join(tmp, "copies", f"state_{n}.json"))
+            timings["copy"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            incremental.backup(source)
+            timings["incremental"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        restored = incremental.state_at(incremental.catalog[len(incremental.catalog) // 2]["id"])
+        restore_seconds = time.perf_counter() - start
+        print(json.dumps({
+            "backups": args.backups,
+            "state_bytes": os.path.getsize(source),
+            "copy": {"seconds": round(timings["copy"], 4), "disk_bytes": dir_size(os.path.join(tmp, "copies"))},
+            "incremental": {"seconds": round(timings["incremental"], 4), "disk_bytes": incremental.disk_usage(),
+                            "snapshots": sum(1 for item in incremental.catalog if item["type"] == "snapshot")},
+            "restore_midpoint_seconds": round(restore_seconds, 4),
+            "restore_ok": incremental.state_at() == state and len(restored["chat_summaries"]) < len(state["chat_summaries"]),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
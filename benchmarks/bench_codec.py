@@ -0,0 +1,79 @@
+"""Time encoding and decoding state documents and log lines with each codec.
+
+"stdlib pretty" is the old json.dumps(state, indent=2) path and is the
+baseline; the other rows are the formats storage.format can select, using
+orjson/msgpack when they are installed.
+
+    python benchmarks/bench_codec.py --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.storage import codec
+
+
+def make_state(size):
+    start = datetime(2025, 1, 1)
+    entries = [{"input": f"Project task {i} #e{i % 5 + 1}", "timestamp": (start + timedelta(seconds=i)).isoformat(),
+                "weight": i % 5 + 1} for i in range(size)]
+    return {
+        "history": entries[-5:],
+        "chat_summaries": [{"date": e["timestamp"][:10], "summary": f"Recent activity: 3x #e2, 1x #e{e['weight']}"}
+                           for e in entries],
+        "e3_reflections": [{"date": e["timestamp"][:10], "summary": f"Processed #e3 input: {e['input']}",
+                            "state": "WIP, Short Term"} for e in entries[::10]],
+        "wip": {}, "related_data": {}, "progress": "", "latest_input": entries[-1]["input"], "input_count": size,
+    }, entries
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def formats():
+    rows = [("stdlib pretty", lambda s: json.dumps(s, indent=2).encode("utf-8"), json.loads),
+            ("stdlib compact", lambda s: json.dumps(s, separators=(",", ":")).encode("utf-8"), json.loads)]
+    for name in ("json", "pretty", "msgpack"):
+        if name == "msgpack" and codec.msgpack is None:
+            continue
+        c = codec.CODECS[name]
+        rows.append((f"codec {name}", c.encode, c.decode))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="chat_summaries (and log lines) per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"orjson: {'yes' if codec.orjson else 'no'}, msgpack: {'yes' if codec.msgpack else 'no'}")
+
+    for size in args.sizes:
+        state, entries = make_state(size)
+        print(f"\n{size} summaries")
+        print(f"{'format':16} {'bytes':>12} {'encode ms':>10} {'decode ms':>10}")
+        for name, encode, decode in formats():
+            data = encode(state)
+            enc = best_of(args.repeat, lambda: encode(state))
+            dec = best_of(args.repeat, lambda: decode(data))
+            print(f"{name:16} {len(data):12} {enc * 1000:10.1f} {dec * 1000:10.1f}")
+        # Log lines are encoded one entry at a time, so per-call overhead matters more than throughput
+        old = best_of(args.repeat, lambda: [json.dumps(e) for e in entries])
+        new = best_of(args.repeat, lambda: [codec.dumps(e) for e in entries])
+        print(f"log lines: json.dumps {old * 1e6 / size:.2f} us/line, codec.dumps {new * 1e6 / size:.2f} us/line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare a cold start per message against round trips to the resident daemon.
+
+Times, on a temporary project:
+  cold      python src/gro_client.py with no daemon running: it falls back to an in-process
+            GroInstructor, i.e. what python src/gro_instructor.py does (interpreter start + state load)
+  client    python src/gro_client.py against a running gro_daemon.py (interpreter start, no state load)
+  socket    one message over an already open client connection (the round trip alone)
+
+    python benchmarks/bench_daemon.py --messages 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.gro_client import connect, socket_path
+
+CLIENT = os.path.join(PROJECT_DIR, "src", "gro_client.py")
+DAEMON = os.path.join(PROJECT_DIR, "src", "gro_daemon.py")
+
+
+def timed_runs(count, fn):
+    times = []
+    for i in range(count):
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {"p50_ms": round(times[len(times) // 2] * 1000, 2), "max_ms": round(times[-1] * 1000, 2)}
+
+
+def check(process, expected="gro_instructor:"):
+    if expected not in process.stdout:
+        raise RuntimeError(f"unexpected output: {process.stdout!r} {process.stderr!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--history", type=int, default=20000, help="entries in the project's state history")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        for sub in ("data/historical", "docs"):
+            os.makedirs(os.path.join(root, sub))
+        # A realistic state to load: summaries and reflections accumulated over time
+        with open(os.path.join(root, "data", "historical", "state.json"), "w", encoding="utf-8") as f:
+            json.dump({"history": [], "input_count": args.history, "wip": {}, "related_data": {},
+                       "chat_summaries": [{"date": "2026-01-01", "summary": f"Recent activity: {i}x #e2"}
+                                          for i in range(args.history // 10)],
+                       "e3_reflections": [{"date": "2026-01-01", "summary": f"Processed #e3 input: task {i}",
+                                           "state": "WIP, Short Term"} for i in range(args.history // 5)]}, f)
+        env = dict(os.environ, GRO_SOCKET=socket_path(root))
+        run = lambda message: subprocess.run([sys.executable, CLIENT, "--project", root], input=message + "\n",
+                                             text=True, capture_output=True, env=env, timeout=60)
+        result = {"cold": timed_runs(args.messages, lambda i: check(run(f"Debug {i} #e1")))}
+        daemon = subprocess.Popen([sys.executable, DAEMON, "--project", root], env=env,
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            daemon.stdout.readline()  # "gro_daemon listening on ..."
+            result["client"] = timed_runs(args.messages, lambda i: check(run(f"Debug {i} #e1")))
+            with connect(env["GRO_SOCKET"]) as client:
+                result["socket"] = timed_runs(args.messages * 10, lambda i: client.respond(f"Debug {i} #e1"))
+        finally:
+            with connect(env["GRO_SOCKET"]) as client:
+                client.request({"command": "shutdown"})
+            daemon.wait(timeout=30)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
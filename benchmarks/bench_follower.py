@@ -0,0 +1,65 @@
+"""Compare respond() latency with inline summaries/#e3 capture against follow_log mode.
+
+In follow_log mode the summaries and #e3 markdown captures run on the log
+follower thread, so respond() only updates the resident state and appends
+to the log. The end state is checked to hold the same reflections and
+summaries either way.
+
+    python benchmarks/bench_follower.py --messages 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.gro_instructor import GroInstructor
+
+
+def make_messages(count):
+    # Every other message is an #e3 (markdown capture), every 25th asks for a summary
+    return [f"Project task {i} #e3" if i % 2 else (f"please summarize {i}" if i % 25 == 0 else f"Hello {i} #e5")
+            for i in range(count)]
+
+
+def run(root, messages, follow_log):
+    for sub in ("data/historical", "docs"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    agent = GroInstructor(project_dir=root, follow_log=follow_log)
+    latencies = []
+    for message in messages:
+        start = time.perf_counter()
+        agent.respond(message)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    agent.close()
+    drain = time.perf_counter() - start
+    state = agent.load_state()
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+        "total_s": round(sum(latencies), 3),
+        "close_s": round(drain, 3),
+        "e3_reflections": len(state.get("e3_reflections", [])),
+        "chat_summaries": len(state.get("chat_summaries", [])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    messages = make_messages(args.messages)
+    result = {}
+    for mode, follow in (("inline", False), ("follow_log", True)):
+        with tempfile.TemporaryDirectory() as root:
+            result[mode] = run(root, messages, follow)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure journaled state commits in durable and relaxed (no fsync) modes.
+
+Times back-to-back commits of a state of the given size, then many threads
+marking a shared StateEngine dirty and flushing: the engine coalesces
+concurrent flushes, so one journaled commit covers every update made while
+the previous one was in flight (group commit).
+
+    python benchmarks/bench_journal.py --summaries 1000 --commits 200 --threads 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.storage.backends import JsonBackend
+from src.storage.state_engine import StateEngine
+
+
+def make_state(summaries):
+    return {"history": [], "chat_summaries": [{"date": "2025-01-01", "summary": f"Recent activity: {i}x #e2"}
+                                              for i in range(summaries)],
+            "progress": "", "latest_input": "", "input_count": 0}
+
+
+def bench_commits(directory, durable, state, commits):
+    backend = JsonBackend(os.path.join(directory, f"commits-{durable}.json"), durable=durable)
+    start = time.perf_counter()
+    for i in range(commits):
+        state["input_count"] = i
+        backend.write_state(state)
+    return commits / (time.perf_counter() - start)
+
+
+def bench_group_commit(directory, durable, state, threads, updates):
+    backend = JsonBackend(os.path.join(directory, f"group-{durable}.json"), durable=durable)
+    backend.write_state(state)
+    engine = StateEngine(backend.path, backend=backend, flush_on_exit=False)
+    commits = [0]
+    engine.add_flush_hook(lambda s: commits.__setitem__(0, commits[0] + 1))
+
+    def worker():
+        for _ in range(updates):
+            with engine.lock:
+                engine.state["input_count"] += 1
+                engine.mark_dirty()
+            engine.flush()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return threads * updates / elapsed, commits[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--summaries", type=int, default=1000, help="chat_summaries in the state")
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=50, help="updates per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"state: {args.summaries} summaries")
+        for durable in (True, False):
+            mode = "durable" if durable else "relaxed"
+            rate = bench_commits(tmp, durable, make_state(args.summaries), args.commits)
+            print(f"{mode:8} sequential: {rate:8.0f} commits/s")
+            rate, commits = bench_group_commit(tmp, durable, make_state(args.summaries), args.threads, args.updates)
+            total = args.threads * args.updates
+            print(f"{mode:8} {args.threads} threads: {rate:8.0f} updates/s ({total} updates in {commits} commits)")
+
+
+if __name__ == "__main__":
+    main()
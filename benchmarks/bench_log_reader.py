@@ -0,0 +1,92 @@
+"""Compare ways of pulling the weight/timestamp columns out of a history log.
+
+- full parse: read every line and json.loads it (what the tools used to do)
+- mmap fields: LogReader over the same .jsonl, decoding only the two fields
+- store index: HistoryStore.weights()/timestamps(), read from index.bin
+
+Peak Python heap (tracemalloc) is reported alongside time; mapped file
+pages don't count towards it, which is the point of the mmap reader.
+
+    python benchmarks/bench_log_reader.py --entries 1000000 --input-bytes 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.storage.history_store import HistoryStore, parse_timestamp
+from src.storage.log_reader import LogReader
+
+
+def write_log(directory, count, input_bytes):
+    start = datetime(2025, 1, 1)
+    pad = "x" * input_bytes
+    entries = ({"input": f"Project task {i} #e{i % 5 + 1} {pad}", "timestamp": (start + timedelta(seconds=i)).isoformat(),
+                "weight": i % 5 + 1} for i in range(count))
+    store = HistoryStore(os.path.join(directory, "history_log"))
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == 10000:
+            store.append_many(batch)
+            batch = []
+    store.append_many(batch)
+    path = os.path.join(directory, "history_log.jsonl")
+    store.export_jsonl(path)
+    return path, store
+
+
+def full_parse(path):
+    weights, stamps = array("b"), array("d")
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            weights.append(entry["weight"])
+            stamps.append(parse_timestamp(entry["timestamp"]))
+    return weights, stamps
+
+
+def mmap_fields(path):
+    with LogReader(path) as reader:
+        return reader.weights(), reader.timestamps()
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    # Tracing slows allocation-heavy code a lot, so the heap is measured on a second, untimed run
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--input-bytes", type=int, default=100, help="padding added to each input")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path, store = write_log(tmp, args.entries, args.input_bytes)
+        print(f"{args.entries} entries, {os.path.getsize(path) / 1e6:.1f} MB")
+        expected = None
+        for name, fn, arg in (("full parse", full_parse, path), ("mmap fields", mmap_fields, path),
+                              ("store index", lambda s: (s.weights(), s.timestamps()), store)):
+            result, elapsed, peak = measure(fn, arg)
+            expected = expected or result
+            assert result == expected, name
+            print(f"{name:12} {elapsed:8.3f} s   peak heap {peak / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare #e3 and #e1 respond() latency with inline and queued markdown captures.
+
+#e3 and #DT messages append to docs/e3_summaries.md. With the markdown
+writer (the default) respond() only queues the capture and a worker thread
+writes it in batches, so an #e3 reply should cost about what an #e1 one
+does. The markdown is checked to come out byte-identical either way.
+
+    python benchmarks/bench_markdown_writer.py --messages 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.gro_instructor import GroInstructor
+
+
+def make_messages(count):
+    # Alternate #e1 and #e3, with a #DT goal on every tenth #e3
+    return [(f"Ship {i} #e3 #DT ‘deep thought’ plan {i} #DTend" if i % 20 == 1 else f"Task {i} #e3") if i % 2
+            else f"Debug {i} #e1" for i in range(count)]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(int(len(values) * fraction), len(values) - 1)] * 1000, 3)
+
+
+def run(root, messages, async_markdown):
+    for sub in ("data/historical", "docs"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    agent = GroInstructor(project_dir=root, async_markdown=async_markdown)
+    latencies = {"#e1": [], "#e3": []}
+    for message in messages:
+        start = time.perf_counter()
+        agent.respond(message)
+        latencies["#e3" if "#e3" in message else "#e1"].append(time.perf_counter() - start)
+    start = time.perf_counter()
+    agent.close()
+    drain = time.perf_counter() - start
+    with open(agent.summaries_file, "rb") as f:
+        markdown = f.read()
+    result = {f"{tag} p{p}_ms": percentile(values, p / 100) for tag, values in latencies.items() for p in (50, 99)}
+    result["close_s"] = round(drain, 3)
+    return result, markdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+    messages = make_messages(args.messages)
+    result = {}
+    outputs = []
+    for mode, queued in (("inline", False), ("queued", True)):
+        with tempfile.TemporaryDirectory() as root:
+            result[mode], markdown = run(root, messages, queued)
+            outputs.append(markdown)
+    result["identical_markdown"] = outputs[0] == outputs[1]
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
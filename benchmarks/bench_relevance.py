@@ -0,0 +1,90 @@
+"""Time the relevance index on a large synthetic history log.
+
+Builds a HistoryStore of --entries messages drawn from a Zipf-like
+vocabulary in a temporary directory, then reports the time to build the
+index from scratch, to reopen it, to index one more message, and the
+query latency (p50/p99) for short queries.
+
+    python benchmarks/bench_relevance.py --entries 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.storage.history_store import HistoryStore
+from src.storage.relevance_index import RelevanceIndex
+
+
+def vocabulary(size):
+    return [f"w{i}" for i in range(size)]
+
+
+def message(rng, words):
+    # Zipf-like: low-numbered words are far more common than high-numbered ones
+    picked = [words[min(len(words) - 1, int(rng.paretovariate(1.1)) - 1)] for _ in range(rng.randint(3, 10))]
+    return " ".join(picked) + f" #e{rng.randint(1, 5)}"
+
+
+def percentiles(times):
+    times = sorted(times)
+    return {"p50_ms": round(times[len(times) // 2] * 1000, 3),
+            "p99_ms": round(times[min(len(times) - 1, int(len(times) * 0.99))] * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-postings", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    words = vocabulary(args.vocabulary)
+    result = {"entries": args.entries}
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(os.path.join(root, "history_log"))
+        start = datetime.now() - timedelta(days=90)
+        step = 90 * 86400 / args.entries
+        for first in range(0, args.entries, 50000):
+            store.append_many({"input": message(rng, words), "weight": rng.randint(1, 5),
+                               "timestamp": (start + timedelta(seconds=i * step)).isoformat()}
+                              for i in range(first, min(first + 50000, args.entries)))
+        directory = os.path.join(root, "relevance_index")
+        began = time.perf_counter()
+        index = RelevanceIndex(directory, store, max_postings=args.max_postings)
+        index.flush()
+        result["build_s"] = round(time.perf_counter() - began, 2)
+        index.close()
+        began = time.perf_counter()
+        index = RelevanceIndex(directory, store, max_postings=args.max_postings)
+        result["open_ms"] = round((time.perf_counter() - began) * 1000, 2)
+        result["segments"] = len(index.segments)
+        add_times = []
+        for i in range(args.queries):
+            entry = {"input": message(rng, words), "weight": 3, "timestamp": datetime.now().isoformat()}
+            position = len(store)
+            store.append(entry)
+            began = time.perf_counter()
+            index.add_entries([entry], position)
+            add_times.append(time.perf_counter() - began)
+        result["add"] = percentiles(add_times)
+        query_times = []
+        for i in range(args.queries):
+            query = message(rng, words)
+            began = time.perf_counter()
+            index.search(query, 3)
+            query_times.append(time.perf_counter() - began)
+        result["query"] = percentiles(query_times)
+        index.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Time replaying a large history log into state.json with 1..N worker processes.
+
+Builds a history_log.jsonl of --entries entries, replays it in one process
+and then across process pools of increasing size, and checks every
+parallel result is identical to the sequential one.
+
+    python benchmarks/bench_replay.py --entries 1000000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.replay import replay
+from src.storage.codec import dumps
+
+INPUTS = ["Debug #e1", "Plan the release #e2", "Run the migration #e3", "Project task #e4", "Hello #e5",
+          "Ship it #e3 #DT ‘deep thought’ automate the release #DTend", "please summarize"]
+
+
+def build_log(path, count):
+    start = datetime.now() - timedelta(days=30)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            text = INPUTS[i % 5] if i % 1000 else INPUTS[5 + (i // 1000) % 2]
+            f.write(dumps({"input": f"{text} {i % 997}", "timestamp": (start + timedelta(seconds=i)).isoformat(),
+                           "weight": (i % 5) + 1}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "history_log.jsonl")
+        build_log(log, args.entries)
+        result = {"entries": args.entries, "cpus": os.cpu_count()}
+        start = time.perf_counter()
+        expected = dumps(replay(log, 1))
+        result["sequential_s"] = round(time.perf_counter() - start, 3)
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            state = replay(log, workers)
+            elapsed = time.perf_counter() - start
+            result[f"workers_{workers}"] = {"seconds": round(elapsed, 3),
+                                            "speedup": round(result["sequential_s"] / elapsed, 2),
+                                            "identical": dumps(state) == expected}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
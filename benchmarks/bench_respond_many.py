@@ -0,0 +1,64 @@
+"""Compare looping GroInstructor.respond() against respond_many() on a fresh project.
+
+    python benchmarks/bench_respond_many.py --messages 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.gro_instructor import GroInstructor
+
+
+def make_messages(count, with_e3):
+    messages = []
+    for i in range(count):
+        tag = f"#e{i % 5 + 1}"
+        if tag == "#e3" and not with_e3:
+            tag = "#e2"
+        messages.append(f"{['Hello', 'Help', 'Debug', 'Project task'][i % 4]} {i} {tag}")
+    return messages
+
+
+def fresh_instructor(root):
+    for sub in ("data/historical", "docs"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    return GroInstructor(project_dir=root)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--with-e3", action="store_true", help="include #e3 messages (markdown capture)")
+    args = parser.parse_args()
+    messages = make_messages(args.messages, args.with_e3)
+
+    with tempfile.TemporaryDirectory() as loop_dir, tempfile.TemporaryDirectory() as batch_dir:
+        looped = fresh_instructor(loop_dir)
+        loop_seconds, loop_replies = timed(lambda: [looped.respond(m) for m in messages] + [looped.close()])
+        batched = fresh_instructor(batch_dir)
+        batch_seconds, batch_replies = timed(lambda: batched.respond_many(messages) + [batched.close()])
+        same_counts = looped.load_state()["input_count"] == batched.load_state()["input_count"]
+
+    print(json.dumps({
+        "messages": args.messages,
+        "respond_loop_seconds": round(loop_seconds, 4),
+        "respond_many_seconds": round(batch_seconds, 4),
+        "speedup": round(loop_seconds / batch_seconds, 2) if batch_seconds else None,
+        "same_replies": loop_replies[:-1] == batch_replies[:-1],
+        "same_input_count": same_counts,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
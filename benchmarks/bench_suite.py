@@ -0,0 +1,289 @@
+"""Benchmark suite for the respond / scrape / summarize / HTTP hot paths, with regression checks.
+
+Builds a synthetic project per size in a temporary directory: a state.json
+holding size/10 chat summaries and size/5 #e3 reflections, and a history
+log of size entries. Each hot path is timed op by op (p50/p90/p99/max)
+and, in a separate pass under tracemalloc, its allocations are measured.
+Everything runs offline; the HTTP benchmark uses an in-process server on
+a free localhost port.
+
+    python benchmarks/bench_suite.py run --sizes 1000 100000 --output results.json
+    python benchmarks/bench_suite.py run --only respond scrape --ops 500
+    python benchmarks/bench_suite.py compare baseline.json results.json --threshold 0.2
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.GrokAgent.GrokAgent import GrokAgent
+from src.GrokAgent.SummarizerAgent import SummarizerAgent
+from src.gro_instructor import GroInstructor
+from src.storage.history_store import HistoryStore
+from src.utils.server import IngestServer
+
+CONFIG = """server:
+  host: localhost
+  port: 0
+data:
+  max_size_mb: 0
+  keywords: ["project", "task"]
+  history_size: 5
+storage:
+  backend: json
+  durable: true
+  format: json
+summarizer:
+  window: 0
+"""
+INPUTS = ["Debug #e1", "Plan the release #e2", "Run the migration #e3", "Project task #e4", "Hello #e5"]
+METRICS = ["p50_ms", "p90_ms", "p99_ms", "max_ms", "mean_ms", "alloc_peak_kb", "alloc_kb_per_op"]
+
+
+class Fixture:
+    """A throwaway project directory with a state and history log of a given size."""
+
+    def __init__(self, root, size):
+        self.root = root
+        self.size = size
+        self.config = os.path.join(root, "config", "dev_config.yaml")
+        self.data_dir = os.path.join(root, "data", "historical")
+        self.state_file = os.path.join(self.data_dir, "state.json")
+        for sub in ("config", "data/historical", "docs"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        with open(self.config, "w", encoding="utf-8") as f:
+            f.write(CONFIG)
+        start = datetime.now() - timedelta(days=30)
+        step = 30 * 86400 / max(size, 1)
+        entry = lambda i: {"input": f"{INPUTS[i % 5]} {i % 1000}",
+                           "timestamp": (start + timedelta(seconds=i * step)).isoformat(), "weight": i % 5 + 1}
+        store = HistoryStore(os.path.join(self.data_dir, "history_log"))
+        for first in range(0, size, 50000):
+            store.append_many(entry(i) for i in range(first, min(first + 50000, size)))
+        state = {
+            "history": [entry(i) for i in range(max(0, size - 5), size)][::-1],
+            "chat_summaries": [{"date": "2026-01-01", "summary": f"Recent activity: {i % 10}x #e2"}
+                               for i in range(size // 10)],
+            "e3_reflections": [{"date": "2026-01-01", "summary": f"Processed #e3 input: task {i}",
+                                "state": "WIP, Short Term"} for i in range(size // 5)],
+            "wip": {}, "related_data": {}, "progress": "", "latest_input": "", "input_count": size,
+        }
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+
+# Each benchmark is a context manager: set up against a fixture, yield op(i), tear down
+
+@contextlib.contextmanager
+def bench_load(fixture):
+    def op(i):
+        GroInstructor(project_dir=fixture.root, flush_every=None, flush_interval_ms=None).close()
+    yield op
+
+
+@contextlib.contextmanager
+def bench_respond(fixture):
+    agent = GroInstructor(project_dir=fixture.root)
+    yield lambda i: agent.respond(f"Hello {i} #e{(1, 2, 4, 5)[i % 4]}")  # #e3 has its own benchmark
+    agent.close()
+
+
+@contextlib.contextmanager
+def bench_respond_e3(fixture):
+    agent = GroInstructor(project_dir=fixture.root)
+    yield lambda i: agent.respond(f"Project task {i} #e3")
+    agent.flush_captures()
+    agent.close()
+
+
+@contextlib.contextmanager
+def bench_respond_summarize(fixture):
+    agent = GroInstructor(project_dir=fixture.root)
+    yield lambda i: agent.respond(f"please summarize {i}")
+    agent.close()
+
+
+@contextlib.contextmanager
+def bench_scrape(fixture):
+    agent = GrokAgent(config_path=fixture.config, state_file=fixture.state_file)
+    yield lambda i: agent.scrape_data({"input": f"Project task {i} #e4"})
+
+
+@contextlib.contextmanager
+def bench_summarize_and_prune(fixture):
+    summarizer = SummarizerAgent(fixture.state_file)
+    def op(i):
+        with contextlib.redirect_stdout(io.StringIO()):  # it prints the whole history on every call
+            summarizer.summarize_and_prune(f"Project task {i}")
+    yield op
+
+
+@contextlib.contextmanager
+def bench_http_post(fixture):
+    agent = GrokAgent(config_path=fixture.config, state_file=fixture.state_file)
+    httpd = IngestServer(("localhost", 0), agent, state_file=fixture.state_file,
+                         sessions_root=os.path.join(fixture.root, "data", "sessions"))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("localhost", httpd.server_address[1], timeout=30)
+    def op(i):
+        conn.request("POST", "/", json.dumps({"input": f"Project task {i} #e{i % 5 + 1}"}),
+                     {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"POST failed with {response.status}")
+    yield op
+    conn.close()
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.close()
+
+
+BENCHMARKS = {
+    "load": bench_load,
+    "respond": bench_respond,
+    "respond_e3": bench_respond_e3,
+    "respond_summarize": bench_respond_summarize,
+    "scrape": bench_scrape,
+    "summarize_and_prune": bench_summarize_and_prune,
+    "http_post": bench_http_post,
+}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def time_ops(op, ops, budget):
+    """Run op up to ops times (at least 5, at most budget seconds) and return the per-op latency stats."""
+    times = []
+    deadline = time.perf_counter() + budget
+    for i in range(ops):
+        start = time.perf_counter()
+        op(i)
+        end = time.perf_counter()
+        times.append(end - start)
+        if end > deadline and len(times) >= 5:
+            break
+    times.sort()
+    return {"ops": len(times), "p50_ms": percentile(times, 0.5) * 1000, "p90_ms": percentile(times, 0.9) * 1000,
+            "p99_ms": percentile(times, 0.99) * 1000, "max_ms": times[-1] * 1000,
+            "mean_ms": sum(times) / len(times) * 1000}
+
+
+def measure_allocations(op, ops, offset):
+    """Median peak allocation per op and net bytes retained per op, under tracemalloc."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        first = tracemalloc.get_traced_memory()[0]
+        for i in range(ops):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            op(offset + i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        net = tracemalloc.get_traced_memory()[0] - first
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+    return {"alloc_peak_kb": percentile(peaks, 0.5) / 1024, "alloc_kb_per_op": net / ops / 1024}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            start = time.perf_counter()
+            fixture = Fixture(root, size)
+            print(f"size {size}: fixture built in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            for name in args.only or BENCHMARKS:
+                with contextlib.redirect_stdout(io.StringIO()), BENCHMARKS[name](fixture) as op:
+                    stats = time_ops(op, args.ops, args.budget)
+                    if args.alloc_ops:
+                        stats.update(measure_allocations(op, min(args.alloc_ops, stats["ops"]), stats["ops"]))
+                stats = {k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}
+                results[f"{name}@{size}"] = stats
+                print(f"  {name:20} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                      f"({stats['ops']} ops)", file=sys.stderr)
+    report = {
+        "meta": {"created": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+def compare(args):
+    """Print each shared benchmark's change; exit 1 if any metric regressed past the threshold."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+    regressions = 0
+    print(f"{'benchmark':32} {'metric':16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key in sorted(set(baseline) & set(current)):
+        for metric in args.metrics:
+            old, new = baseline[key].get(metric), current[key].get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            # Small absolute differences are noise, however large in relative terms
+            regressed = change > args.threshold and new - old > (args.min_kb if "kb" in metric else args.min_ms)
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{key:32} {metric:16} {old:10.3f} {new:10.3f} {change:+8.1%}{flag}")
+    for key in sorted(set(baseline) ^ set(current)):
+        print(f"{key:32} only in {'baseline' if key in baseline else 'current'}")
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks and write a results file")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    run_parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    run_parser.add_argument("--ops", type=int, default=200, help="timed ops per benchmark")
+    run_parser.add_argument("--budget", type=float, default=10.0, help="seconds per benchmark before stopping early")
+    run_parser.add_argument("--alloc-ops", type=int, default=20, help="ops measured under tracemalloc (0 to skip)")
+    run_parser.add_argument("--output", default="bench_results.json")
+    compare_parser = commands.add_parser("compare", help="flag regressions of a results file against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts")
+    compare_parser.add_argument("--metrics", nargs="+", default=["p50_ms", "alloc_peak_kb"],
+                                choices=METRICS, help="metrics to check (tail latencies are noisier)")
+    compare_parser.add_argument("--min-ms", type=float, default=0.1, help="ignore time differences below this")
+    compare_parser.add_argument("--min-kb", type=float, default=16.0, help="ignore memory differences below this")
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Load test for src/utils/server.py: reports p50/p99 latency and requests per second.
+
+With --url it targets a running server; otherwise it starts one in-process on a
+free port against a temporary state file, so it can run anywhere.
+
+    python benchmarks/load_test_server.py --requests 2000 --concurrency 16
+    python benchmarks/load_test_server.py --batch 50
+    python benchmarks/load_test_server.py --sessions 16  # spread workers over per-session shards
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def start_local_server(tmp_dir):
+    from src.GrokAgent.GrokAgent import GrokAgent
+    from src.utils.server import IngestServer
+    agent = GrokAgent(config_path=os.path.join(PROJECT_DIR, "config", "dev_config.yaml"),
+                      state_file=os.path.join(tmp_dir, "state.json"))
+    httpd = IngestServer(("localhost", 0), agent, state_file=agent.state_file,
+                         sessions_root=os.path.join(tmp_dir, "sessions"))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://localhost:{httpd.server_address[1]}"
+
+
+def worker(url, count, batch, latencies, errors, session=None):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+    path = "/batch" if batch > 1 else "/"
+    if session is not None:
+        path = f"/sessions/{session}{path}"
+    for i in range(count):
+        if batch > 1:
+            payload = {"inputs": [{"input": f"Project task {i}.{j} #e{j % 5 + 1}"} for j in range(batch)]}
+        else:
+            payload = {"input": f"Project task {i} #e{i % 5 + 1}"}
+        body = json.dumps(payload)
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            reply = json.loads(response.read())
+            if response.status != 200 or reply.get("status") != "saved":
+                errors.append(reply)
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run(url, requests, concurrency, batch, sessions=0):
+    latencies = []
+    errors = []
+    per_worker = max(1, requests // concurrency)
+    threads = [threading.Thread(target=worker, args=(url, per_worker, batch, latencies, errors,
+                                                     f"s{i % sessions}" if sessions else None))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "requests": total,
+        "inputs": total * batch,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "inputs_per_second": round(total * batch / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target server, e.g. http://localhost:8000 (default: start one in-process)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1, help="inputs per request; >1 posts to /batch")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="post to /sessions/s0../sessions/sN-1 round-robin by worker (default: one shared state)")
+    args = parser.parse_args()
+
+    httpd = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = args.url
+        if not url:
+            httpd, url = start_local_server(tmp_dir)
+        try:
+            result = run(url, args.requests, args.concurrency, args.batch, args.sessions)
+        finally:
+            if httpd is not None:
+                httpd.shutdown()
+                httpd.server_close()
+                httpd.close()
+        if httpd is not None and not args.sessions:
+            with open(os.path.join(tmp_dir, "state.json"), encoding="utf-8") as f:
+                result["history_kept"] = len(json.load(f)["history"])
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,7 @@ def setup_project(project_dir, template_dir):
 def verify_project(project_dir):
     """Verify the project setup by running gro_instructor.py and checking its response."""
     process = subprocess.run(
-        ["python", "src/gro_instructor.py"],
+        ["python", "src/gro_client.py"],  # answered by gro_daemon.py when one is running
         cwd=project_dir,
         input="#e1\n",
         text=True,
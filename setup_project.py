@@ -1,34 +1,44 @@
-import os
 import json
+import os
+import re
+import sys
 
-def update_gro_instructor():
-    """Update gro_instructor.py to use template_data/ for state and history files."""
-    file_path = os.path.join("src", "gro_instructor.py")
-    if not os.path.exists(file_path):
-        print(f"Error: {file_path} not found.")
-        return
+def update_storage_root():
+    """Point storage.root at template_data/ in the configs, so state and history files live there."""
+    for name in ("dev_config.yaml", "prod_config.yaml"):
+        config_file = os.path.join("config", name)
+        if not os.path.exists(config_file):
+            print(f"Error: {config_file} not found.")
+            sys.exit(1)
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+        with open(config_file, "r", encoding="utf-8") as f:
+            content = f.read()
 
-    # Replace the file paths
-    content = content.replace(
-        'self.state_file = os.path.join(project_dir, "data", "historical", "state.json")',
-        'self.state_file = os.path.join(project_dir, "template_data", "state.json")'
-    )
-    content = content.replace(
-        'self.log_file = os.path.join(project_dir, "data", "historical", "history_log.jsonl")',
-        'self.log_file = os.path.join(project_dir, "template_data", "history_log.jsonl")'
-    )
+        # Edit the line in place so the file's comments survive; add the key (or section) if it's missing
+        root = re.compile(r"^(storage:[ \t]*\n(?:[ \t]+.*\n|[ \t]*\n)*?[ \t]+root:)[^#\n]*?([ \t]*(?:#.*)?)$",
+                          re.MULTILINE)
+        if root.search(content):
+            content = root.sub(r"\1 template_data\2", content, count=1)
+        elif re.search(r"^storage:[ \t]*$", content, re.MULTILINE):
+            content = re.sub(r"^storage:[ \t]*$", "storage:\n  root: template_data", content, count=1,
+                             flags=re.MULTILINE)
+        else:
+            content = content.rstrip("\n") + "\nstorage:\n  root: template_data\n"
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(content)
-    print(f"Updated {file_path} to use template_data/ for state and history files.")
+        with open(config_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        print(f"Updated {config_file} to use template_data/ for state and history files.")
 
 def update_gitignore():
-    """Ensure .gitignore includes __pycache__/ and data/historical/."""
+    """Ensure .gitignore includes __pycache__/ and data/historical/, keeping its state and history log tracked.
+
+    The history log is the segmented store in history_log/ (history_log.jsonl is only imported on the first
+    run), so the store is tracked, but not the lock and follower checkpoint it keeps next to the segments.
+    """
     gitignore_path = ".gitignore"
-    required_entries = ["__pycache__/", "data/historical/*", "!data/historical/state.json", "!data/historical/history_log.jsonl"]
+    required_entries = ["__pycache__/", "data/historical/*", "!data/historical/state.json",
+                        "!data/historical/history_log/", "**/history_log/writer.lock",
+                        "**/history_log/follower.checkpoint.json"]
 
     # Read existing .gitignore
     try:
@@ -79,7 +89,7 @@ def update_state_json():
 
 if __name__ == "__main__":
     print("Setting up project...")
-    update_gro_instructor()
+    update_storage_root()
     update_gitignore()
     update_state_json()
     print("Setup complete. Follow the remaining steps in SETUP.md.")
\ No newline at end of file
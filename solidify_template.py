@@ -65,6 +65,13 @@ def finalize_state_json():
     history_file = os.path.join(TEMPLATE_DIR, "history_log.jsonl")
     open(history_file, "w").close()
     print(f"Created/updated empty {history_file}")
+
+    # The log itself lives in the segmented store; drop it with the indexes built from it and the state
+    for name in ("history_log", "relevance_index", "search_index"):
+        path = os.path.join(TEMPLATE_DIR, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            print(f"Removed {path}")
     return True
 
 def polish_setup_md():
@@ -1,34 +1,50 @@
 import os
-import json
-import yaml
+import sys
 from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src import metrics
+from src.storage.backends import open_backend
+from src.config_service import get_config
+from src.storage.sessions import PROJECT_DIR, storage_roots
 
 class GrokAgent:
-    def __init__(self):
-        with open("F:/gro_Grok_Template/config/dev_config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path=None, state_file=None):
+        # Shared, cached config: parsed once per process and reloaded when the file changes
+        self.config_service = get_config(config_path)
+        # Default to state.json under storage.root (data/historical unless configured)
+        self.state_file = state_file = state_file or os.path.join(storage_roots(self.config)[0], "state.json")
+        storage = self.config.get("storage", {})
+        metrics.configure(self.config.get("metrics"), PROJECT_DIR)
+        self.backend = open_backend(storage.get("backend"), state_file, durable=storage.get("durable", True),
+                                    state_format=storage.get("format"))
 
-    def scrape_data(self, chat_input):
-        keywords = self.config["data"]["keywords"]
-        filtered = {k: v for k, v in chat_input.items() if any(kw in str(v).lower() for kw in keywords)}
-        state_file = "F:/gro_Grok_Template/data/historical/state.json"
-        state = self.load_state()
+    @property
+    def config(self):
+        return self.config_service.get()
+
+    def filter_input(self, chat_input):
+        keywords = self.config_service.keyword_set()
+        return {k: v for k, v in chat_input.items() if keywords.matches(v)}
+
+    def apply_input(self, state, chat_input):
+        """Apply a scraped chat input to an already loaded state, without any file I/O."""
+        filtered = self.filter_input(chat_input)
         # Explicitly update input if present in chat_input
         if "input" in filtered:
             state["input"] = filtered["input"]
         state["progress"] = "Updated on " + datetime.now().isoformat()
-        with open(state_file, "w") as f:
-            json.dump(state, f)
+        return state
+
+    def scrape_data(self, chat_input):
+        # Read-modify-write under the state lock so concurrent writers don't overwrite each other
+        with metrics.profiled("scrape"), metrics.span("scrape"):
+            with self.backend.transaction(dict) as state:
+                with metrics.span("scrape.apply"):
+                    self.apply_input(state, chat_input)
+        metrics.count("gro_entries_processed_total", stage="scrape")
 
     def load_state(self):
-        state_file = "F:/gro_Grok_Template/data/historical/state.json"
-        if os.path.exists(state_file):
-            try:
-                with open(state_file, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, ValueError):
-                return {}
-        return {}
+        return self.backend.read_state(dict)
 
 if __name__ == "__main__":
     agent = GrokAgent()
@@ -1,46 +1,207 @@
 import json
+import os
+import sys
+from collections import Counter, OrderedDict, deque
 from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src import metrics
+from src.storage.backends import open_backend
+from src.config_service import get_config
+from src.storage.sessions import storage_roots
+from src.tag_matcher import TagMatcher
+
+def default_state():
+    return {"history": [], "chat_summaries": [], "wip": {}, "related_data": {}, "progress": "", "latest_input": ""}
+
+class RunningAggregates:
+    """Counts kept up to date one entry at a time.
+
+    Per weight, per keyword (from a fixed keyword set), per day (only the
+    newest max_days days) and the latest N entries, so memory stays bounded
+    however long the stream runs.
+    """
+
+    def __init__(self, keywords=(), latest=5, max_days=30):
+        self.matcher = TagMatcher(keywords)
+        self.max_days = max_days
+        self.latest = deque(maxlen=latest)
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.weights = Counter()
+        self.keywords = Counter()
+        self.days = OrderedDict()
+        self.latest.clear()
+
+    def add(self, entry):
+        self.total += 1
+        self.weights[int(entry.get("weight", 2))] += 1
+        for key in self.matcher.match(str(entry.get("input", ""))).keywords:
+            self.keywords[key] += 1
+        day = str(entry.get("timestamp", ""))[:10]
+        self.days[day] = self.days.pop(day, 0) + 1
+        while len(self.days) > self.max_days:
+            self.days.popitem(last=False)
+        self.latest.append(entry)
+
+    def describe(self):
+        mix = ", ".join(f"{self.weights[w]}x #e{w}" for w in sorted(self.weights))
+        text = f"{self.total} inputs ({mix})"
+        if self.keywords:
+            text += "; keywords: " + ", ".join(f"{k} {n}" for k, n in self.keywords.most_common())
+        return text
+
+    def to_dict(self):
+        return {"total": self.total, "weights": {str(w): n for w, n in self.weights.items()},
+                "keywords": dict(self.keywords), "days": dict(self.days), "latest": list(self.latest)}
+
+    def load(self, data):
+        """Resume from a to_dict() snapshot saved by an earlier run."""
+        self.total = data.get("total", 0)
+        self.weights = Counter({int(w): n for w, n in data.get("weights", {}).items()})
+        self.keywords = Counter(data.get("keywords", {}))
+        self.days = OrderedDict(data.get("days", {}))
+        self.latest.extend(data.get("latest", []))
+        return self
+
 
 class SummarizerAgent:
-    def __init__(self):
-        self.state_file = "F:/gro_Grok_Template/data/historical/state.json"
+    def __init__(self, state_file=None, backend=None, state_format=None, window=100, keywords=None, latest=5,
+                 durable=None, config_path=None):
+        # Whatever isn't given comes from the config, like GrokAgent: state.json under storage.root,
+        # the storage backend, format and durability, and the data.keywords to count
+        config = get_config(config_path).get()
+        storage = config.get("storage", {})
+        self.state_file = state_file = state_file or os.path.join(storage_roots(config)[0], "state.json")
+        if backend is None or isinstance(backend, str):
+            backend = open_backend(backend or storage.get("backend"), state_file,
+                                   durable=storage.get("durable", True) if durable is None else durable,
+                                   state_format=storage.get("format") if state_format is None else state_format)
+        # An open backend is shared as it is (a StateShard's, say), and stays its owner's to close
+        self.backend = backend
+        if keywords is None:
+            keywords = config.get("data", {}).get("keywords") or ()
+        # Streaming stage: a summary is emitted every `window` entries and whenever the day changes
+        self.window = window
+        self.keywords = list(keywords)
+        self.totals = RunningAggregates(self.keywords, latest)
+        self.current = RunningAggregates(self.keywords, latest)
+        self._day = None
 
     def summarize_and_prune(self, input_text=""):
-        # Read the current state
-        try:
-            with open(self.state_file, "r") as f:
-                state = json.load(f)
-        except FileNotFoundError:
-            state = {"history": [], "chat_summaries": [], "wip": {}, "related_data": {}, "progress": "", "latest_input": ""}
-            print(f"State file not found, initializing new state: {state}")
-
-        # Ensure history exists
-        if "history" not in state or not isinstance(state["history"], list):
-            state["history"] = []
-
-        # Use provided input if given, else fall back to state["input"]
-        latest_input = input_text if input_text else state.get("input", "")
-        print(f"Latest input from state: {latest_input}")
-
-        # Add the latest input if it’s not empty
-        if latest_input:
-            state["history"].append({
-                "input": latest_input,
-                "timestamp": datetime.now().isoformat()
-            })
-            state["history"] = state["history"][-5:]  # Keep last 5
-            state["latest_input"] = latest_input
-            state["progress"] = f"Updated on {datetime.now().isoformat()}"
-            print(f"Updated history: {state['history']}")
-
-        # Save the updated state
+        # Read, update and save the state as one transaction so concurrent writers can't lose updates
         try:
-            with open(self.state_file, "w") as f:
-                json.dump(state, f, indent=2)
+            with metrics.profiled("summarize_and_prune"), metrics.span("summarize_and_prune"), \
+                    self.backend.transaction(default_state) as state:
+                # Ensure history exists
+                if "history" not in state or not isinstance(state["history"], list):
+                    state["history"] = []
+
+                # Use provided input if given, else fall back to state["input"]
+                latest_input = input_text if input_text else state.get("input", "")
+                print(f"Latest input from state: {latest_input}")
+
+                # Add the latest input if it’s not empty
+                if latest_input:
+                    state["history"].append({
+                        "input": latest_input,
+                        "timestamp": datetime.now().isoformat()
+                    })
+                    state["history"] = state["history"][-5:]  # Keep last 5
+                    state["latest_input"] = latest_input
+                    state["progress"] = f"Updated on {datetime.now().isoformat()}"
+                    print(f"Updated history: {state['history']}")
+            metrics.count("gro_entries_processed_total", stage="summarize_and_prune")
             print("Data summarized and pruned successfully")
         except Exception as e:
             print(f"Error writing to state file: {e}")
 
+    def resume(self, state):
+        """Pick the running totals up from state["summarizer"], where commit() leaves them."""
+        if isinstance(state.get("summarizer"), dict):
+            self.totals.load(state["summarizer"])
+        return self
+
+    def feed(self, entry):
+        """Add one entry; returns the summaries (usually none) whose window it closed."""
+        summaries = []
+        day = str(entry.get("timestamp", ""))[:10]
+        if self.current.total and day != self._day:
+            summaries.append(self.close_window())
+        self._day = day
+        self.current.add(entry)
+        self.totals.add(entry)
+        if self.current.total >= self.window:
+            summaries.append(self.close_window())
+        return summaries
+
+    def close_window(self):
+        """Summarize the entries since the last boundary and start a new window."""
+        summary = {
+            "date": self._day or datetime.now().strftime("%Y-%m-%d"),
+            "summary": f"Stream window: {self.current.describe()}; {self.totals.total} inputs so far"
+        }
+        self.current.reset()
+        return summary
+
+    def stream(self, entries):
+        """Pipeline stage: consume entries, yield a summary at each window boundary and one for the tail."""
+        for entry in entries:
+            yield from self.feed(entry)
+        if self.current.total:
+            yield self.close_window()
+
+    def commit(self, summary, state=None):
+        """Record a summary and the running totals (latest entries included) in state, or in a transaction."""
+        if state is None:
+            with self.backend.transaction(default_state) as state:
+                return self.commit(summary, state)
+        if not isinstance(state.get("chat_summaries"), list):
+            state["chat_summaries"] = []
+        state["chat_summaries"].append(summary)
+        state["summarizer"] = self.totals.to_dict()
+        return summary
+
+    def run(self, entries):
+        """Stream entries through the stage, committing each summary as it is emitted."""
+        with self.backend.transaction(default_state) as state:
+            self.resume(state)
+        for summary in self.stream(entries):
+            yield self.commit(summary)
+
+
+def entries_from_lines(lines, matcher=None):
+    """Entries from text lines: JSON log entries pass through, plain chat text is tagged like GroInstructor does."""
+    matcher = matcher or TagMatcher()
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                yield json.loads(line)
+                continue
+            except json.JSONDecodeError:
+                pass
+        weight = matcher.match(line).weight
+        yield {"input": line, "timestamp": datetime.now().isoformat(), "weight": weight if weight is not None else 2}
+
+
+def entries_from_store(store, start=0, batch_size=10000):
+    """Entries of a HistoryStore from position start onwards, read in batches."""
+    stop = len(store)
+    for first in range(start, stop, batch_size):
+        yield from store.slice(first, min(first + batch_size, stop))
+
+
 if __name__ == "__main__":
-    summarizer = SummarizerAgent()
-    summarizer.summarize_and_prune()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "--stream":
+        # Summarize chat text or JSON entries piped on stdin: tail -f log.jsonl | python SummarizerAgent.py --stream 50
+        window = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+        summarizer = SummarizerAgent(window=window)
+        for summary in summarizer.run(entries_from_lines(sys.stdin)):
+            print(f"{summary['date']}: {summary['summary']}", flush=True)
+    else:
+        summarizer = SummarizerAgent()
+        summarizer.summarize_and_prune()
@@ -0,0 +1,193 @@
+import argparse
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from itertools import accumulate
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.storage.history_store import HistoryStore, parse_timestamp
+from src.storage.log_reader import LogReader
+
+# NumPy is optional: with it the aggregates are vectorized, without it they fall back to plain loops
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WEIGHTS = range(1, 6)
+BUCKETS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+
+
+class Analytics:
+    """Aggregates over the #e1–#e5 weight stream of the history log.
+
+    The weight and timestamp columns are loaded once (from the store index
+    where there is one) and every report is computed over them: weight
+    histograms per day or hour, a rolling priority score (the mean weight
+    of the last ``window`` entries) and the most frequent inputs.
+    """
+
+    def __init__(self, weights, timestamps, log=None, offset=0):
+        if np is not None:
+            # Columns arrive as array('b') / array('d'), which NumPy can wrap without copying
+            self.weights = np.frombuffer(weights, dtype=np.int8) if isinstance(weights, array) \
+                else np.asarray(weights, dtype=np.int8)
+            self.timestamps = np.frombuffer(timestamps, dtype=np.float64) if isinstance(timestamps, array) \
+                else np.asarray(timestamps, dtype=np.float64)
+        else:
+            self.weights, self.timestamps = weights, timestamps
+        # Where these entries start in the log, so top_inputs() can find their text
+        self.log = log
+        self.offset = offset
+
+    @classmethod
+    def from_log(cls, log):
+        """Load the columns of a HistoryStore or SqliteLog, or of a .jsonl file / store directory path."""
+        if isinstance(log, str):
+            if log.endswith(".db"):
+                from src.storage.backends import SqliteBackend
+                log = SqliteBackend(log).log
+            elif os.path.isdir(log):
+                log = HistoryStore(log, readonly=True)
+            else:
+                with LogReader(log) as reader:
+                    return cls(reader.weights(), reader.timestamps(), log)
+        return cls(log.weights(), log.timestamps(), log)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def window(self, since=None, until=None):
+        """The entries logged in [since, until), found by binary search (the log is in time order)."""
+        search = (lambda t: int(np.searchsorted(self.timestamps, t))) if np is not None \
+            else (lambda t: bisect_left(self.timestamps, t))
+        start = search(parse_timestamp(since)) if since else 0
+        stop = search(parse_timestamp(until)) if until else len(self)
+        return Analytics(self.weights[start:stop], self.timestamps[start:stop], self.log, self.offset + start)
+
+    def weight_counts(self):
+        """{weight: count} for #e1–#e5."""
+        if np is not None:
+            counts = np.bincount(np.clip(self.weights, 0, 6).astype(np.intp), minlength=7)
+            return {w: int(counts[w]) for w in WEIGHTS}
+        counts = Counter(self.weights)
+        return {w: counts.get(w, 0) for w in WEIGHTS}
+
+    def histogram(self, by="day"):
+        """[(bucket label, [#e1 count, ..., #e5 count])] in time order, bucketed by local "day" or "hour"."""
+        fmt = BUCKETS[by]
+        # Count per UTC hour first, then label each distinct hour in local time, so DST shifts land correctly
+        if np is not None:
+            valid = (self.timestamps > 0) & (self.weights >= 1) & (self.weights <= 5)
+            keys = (self.timestamps[valid] // 3600).astype(np.int64) * 8 + self.weights[valid]
+            pairs, counts = np.unique(keys, return_counts=True)
+            per_hour = zip((pairs // 8).tolist(), (pairs % 8).tolist(), counts.tolist())
+        else:
+            per_hour = sorted((int(hour), w, n) for (hour, w), n in
+                              Counter((t // 3600, w) for t, w in zip(self.timestamps, self.weights)
+                                      if t > 0 and 1 <= w <= 5).items())
+        buckets = {}
+        labels = {}
+        for hour, weight, count in per_hour:
+            label = labels.get(hour)
+            if label is None:
+                label = labels[hour] = datetime.fromtimestamp(hour * 3600).strftime(fmt)
+            buckets.setdefault(label, [0] * 5)[weight - 1] += count
+        return list(buckets.items())
+
+    def rolling_priority(self, window=50):
+        """Mean weight over the trailing window of entries, one score per entry."""
+        if not len(self):
+            return []
+        if np is not None:
+            sums = np.cumsum(self.weights, dtype=np.float64)
+            scores = np.empty_like(sums)
+            head = min(window, len(sums))
+            scores[:head] = sums[:head] / np.arange(1, head + 1)
+            scores[head:] = (sums[head:] - sums[:-head]) / window
+            return scores
+        sums = list(accumulate(self.weights))
+        return [(s - (sums[i - window] if i >= window else 0)) / min(i + 1, window) for i, s in enumerate(sums)]
+
+    def top_inputs(self, n=10):
+        """The n most frequent inputs in this window, as [(input, count)]."""
+        return Counter(self._inputs()).most_common(n)
+
+    def _inputs(self):
+        start = self.offset
+        stop = start + len(self)
+        log = self.log
+        if isinstance(log, HistoryStore):
+            # The index locates the window directly; read it in chunks to bound memory
+            for chunk in range(start, stop, 10000):
+                for entry in log.slice(chunk, min(chunk + 10000, stop)):
+                    yield entry.get("input", "")
+        elif isinstance(log, str):
+            with LogReader(log) as reader:
+                for i, value in enumerate(reader.field("input", "")):
+                    if i >= stop:
+                        break
+                    if i >= start:
+                        yield value
+        elif log is not None:
+            yield from log.inputs(start, stop)
+
+    def summary(self, window=50):
+        """One line for chat_summaries: volume, weight mix and priority trend of this window."""
+        if not len(self):
+            return "No activity in this period."
+        counts = self.weight_counts()
+        total = sum(counts.values()) or 1
+        mix = ", ".join(f"{counts[w]}x #e{w}" for w in sorted(WEIGHTS, reverse=True) if counts[w])
+        scores = self.rolling_priority(window)
+        steady = scores[window - 1:] if len(scores) >= window else scores  # skip the partial warm-up windows
+        top = self.top_inputs(1)
+        line = (f"{len(self)} inputs ({mix}); #e4–#e5 share {100 * (counts[4] + counts[5]) / total:.0f}%; "
+                f"priority {float(scores[-1]):.2f} (peak {_max(steady):.2f})")
+        if top and top[0][1] > 1:
+            line += f"; most repeated: \"{top[0][0]}\" x{top[0][1]}"
+        return line
+
+    def report(self, by="day", window=50, top=10):
+        """The multi-line CLI report."""
+        lines = [f"Entries: {len(self)}" + (" (vectorized)" if np is not None else "")]
+        counts = self.weight_counts()
+        lines.append("Weights: " + ", ".join(f"#e{w} {counts[w]}" for w in WEIGHTS))
+        if len(self):
+            scores = self.rolling_priority(window)
+            steady = scores[window - 1:] if len(scores) >= window else scores
+            lines.append(f"Rolling priority (last {window}): now {float(scores[-1]):.2f}, "
+                         f"peak {_max(steady):.2f}, low {_min(steady):.2f}")
+        lines.append("")
+        lines.append(f"{by:16} " + " ".join(f"{'#e' + str(w):>6}" for w in WEIGHTS) + f" {'total':>7}")
+        for label, row in self.histogram(by):
+            lines.append(f"{label:16} " + " ".join(f"{n:6}" for n in row) + f" {sum(row):7}")
+        if top:
+            lines.append("")
+            lines.append(f"Top {top} inputs:")
+            for text, count in self.top_inputs(top):
+                lines.append(f"{count:8}  {text}")
+        return "\n".join(lines)
+
+
+def _max(values):
+    return float(values.max() if np is not None else max(values))
+
+
+def _min(values):
+    return float(values.min() if np is not None else min(values))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report on the #e1–#e5 weight stream of a history log.")
+    parser.add_argument("log", help="history_log store directory, history_log.jsonl, or state.db")
+    parser.add_argument("--by", choices=sorted(BUCKETS), default="day")
+    parser.add_argument("--window", type=int, default=50, help="entries in the rolling priority window")
+    parser.add_argument("--top", type=int, default=10, help="how many recurring inputs to list (0 for none)")
+    parser.add_argument("--since", help="only entries at or after this ISO timestamp")
+    parser.add_argument("--until", help="only entries before this ISO timestamp")
+    args = parser.parse_args()
+    analytics = Analytics.from_log(args.log).window(args.since, args.until)
+    print(analytics.report(args.by, args.window, args.top))
@@ -0,0 +1,77 @@
+import os
+import re
+import threading
+import time
+import yaml
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+
+
+def config_path(config_dir=CONFIG_DIR, env=None):
+    """dev_config.yaml or prod_config.yaml, picked by the GRO_ENV environment variable (default dev)."""
+    env = env or os.environ.get("GRO_ENV", "dev")
+    return os.path.join(config_dir, f"{env}_config.yaml")
+
+
+class KeywordSet:
+    """data.keywords compiled into one case-insensitive pattern for substring filtering."""
+
+    def __init__(self, keywords):
+        self.keywords = [str(kw) for kw in keywords or []]
+        self.pattern = re.compile("|".join(re.escape(kw) for kw in self.keywords), re.IGNORECASE) \
+            if self.keywords else None
+
+    def matches(self, value):
+        return self.pattern is not None and self.pattern.search(str(value)) is not None
+
+
+class ConfigService:
+    """A YAML config parsed once and re-parsed only when the file's mtime changes.
+
+    The mtime is checked at most every check_interval seconds, so hot paths
+    can call get() freely.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.config = None
+        self.keywords = None
+        self.get()
+
+    def get(self):
+        now = time.monotonic()
+        if self.config is not None and now - self._checked < self.check_interval:
+            return self.config
+        with self.lock:
+            self._checked = now
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self._mtime:
+                with open(self.path, "r") as f:
+                    config = yaml.safe_load(f) or {}
+                self.keywords = KeywordSet(config.get("data", {}).get("keywords"))
+                self.config = config
+                self._mtime = mtime
+        return self.config
+
+    def keyword_set(self):
+        """The compiled data.keywords of the current config."""
+        self.get()
+        return self.keywords
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_config(path=None):
+    """The process-wide ConfigService for path (default: the dev/prod config chosen by GRO_ENV)."""
+    path = os.path.abspath(path or config_path())
+    with _services_lock:
+        service = _services.get(path)
+        if service is None:
+            service = _services[path] = ConfigService(path)
+        return service
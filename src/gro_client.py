@@ -0,0 +1,121 @@
+"""Send messages to a running gro_daemon.py and print the replies.
+
+    python src/gro_client.py "Debug #e1"            # one message per argument
+    echo "Hello" | python src/gro_client.py         # or one per stdin line
+    python src/gro_client.py --session alice "Project task #e3"
+
+Only the standard library is imported up front, so a round trip costs an
+interpreter start plus one socket exchange. Without a daemon (or on
+platforms without Unix sockets) the messages are handled in-process by a
+GroInstructor, exactly as ``python src/gro_instructor.py`` would.
+"""
+import json
+import os
+import socket
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def socket_path(project_dir=None):
+    """$GRO_SOCKET, or data/gro_instructor.sock in the project."""
+    return os.environ.get("GRO_SOCKET") or os.path.join(project_dir or PROJECT_DIR, "data", "gro_instructor.sock")
+
+
+class Client:
+    """One connection to the daemon; requests and replies are JSON lines."""
+
+    def __init__(self, path=None, timeout=30):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(path or socket_path())
+        except OSError:
+            self.sock.close()
+            raise
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, payload):
+        self.file.write(json.dumps(payload).encode("utf-8") + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("gro_daemon closed the connection")
+        return json.loads(line)
+
+    def respond(self, message, session=None):
+        reply = self.request({"message": message, "session": session})
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["reply"]
+
+    def search(self, query="", session=None, **filters):
+        """Records matching query (see GroInstructor.search); filters are states, since, until, sources, limit."""
+        reply = self.request(dict(filters, command="search", query=query, session=session))
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["results"]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect(path=None, timeout=30):
+    """A Client for the running daemon, or None if there isn't one."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        return Client(path, timeout)
+    except OSError:
+        return None
+
+
+def respond(messages, session=None, project_dir=None):
+    """Replies to messages from the daemon if one is running, else from an in-process GroInstructor."""
+    client = connect(socket_path(project_dir))
+    if client is not None:
+        with client:
+            return [client.respond(message, session) for message in messages]
+    sys.path.append(PROJECT_DIR)
+    from src.gro_instructor import GroInstructor
+    agent = GroInstructor(project_dir=project_dir, session_id=session)
+    try:
+        return [agent.respond(message) for message in messages]
+    finally:
+        agent.close()
+
+
+def search(query="", session=None, project_dir=None, **filters):
+    """Search results from the daemon if one is running, else from an in-process GroInstructor."""
+    client = connect(socket_path(project_dir))
+    if client is not None:
+        with client:
+            return client.search(query, session, **filters)
+    sys.path.append(PROJECT_DIR)
+    from src.gro_instructor import GroInstructor
+    agent = GroInstructor(project_dir=project_dir, session_id=session)
+    try:
+        return agent.search(query, **filters)
+    finally:
+        agent.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    while args and args[0] in ("--session", "--project"):
+        if len(args) < 2:
+            print("Usage: python gro_client.py [--session ID] [--project DIR] [message ...]")
+            sys.exit(1)
+        options[args[0]] = args[1]
+        args = args[2:]
+    messages = args or [line.rstrip("\n") for line in sys.stdin if line.strip()]
+    for reply in respond(messages, options.get("--session"), options.get("--project")):
+        print(f"gro_instructor: {reply}")
@@ -0,0 +1,121 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.gro_client import connect, socket_path
+from src.gro_instructor import GroInstructor, session_pool
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """Answers JSON-line requests on one connection until the client hangs up."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("command") == "shutdown":
+                    self.send({"status": "stopping"})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                if request.get("command") == "search":
+                    self.send({"results": self.server.search(request)})
+                    continue
+                reply = {"reply": self.server.respond(str(request.get("message", "")), request.get("session"))}
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.send(reply)
+
+    def send(self, payload):
+        self.wfile.write(json.dumps(payload).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class GroDaemon(socketserver.ThreadingUnixStreamServer):
+    """A resident GroInstructor answering gro_client.py over a Unix domain socket.
+
+    State is loaded once and flushed write-behind as usual, so a scripted
+    message costs a socket round trip instead of an interpreter start and a
+    state parse. Requests naming a session go to that session's shard (see
+    gro_instructor.session_pool); the rest go to the project's default state.
+    """
+    daemon_threads = True
+
+    def __init__(self, path=None, project_dir=None, **kwargs):
+        self.path = path or socket_path(project_dir)
+        client = connect(self.path, timeout=1)
+        if client is not None:
+            client.close()
+            raise OSError(f"gro_daemon is already running on {self.path}")
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left behind by a daemon that didn't shut down cleanly
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        super().__init__(self.path, DaemonHandler)
+        os.chmod(self.path, 0o600)  # only the owner may talk to it
+        try:
+            self.agent = GroInstructor(project_dir=project_dir, **kwargs)
+            self.sessions = session_pool(project_dir, **kwargs)
+        except Exception:
+            self.server_close()
+            os.unlink(self.path)
+            raise
+
+    def respond(self, message, session=None):
+        if session is None:
+            return self.agent.respond(message)
+        with self.sessions.session(session) as agent:
+            return agent.respond(message)
+
+    def search(self, request):
+        filters = {key: request[key] for key in ("states", "since", "until", "sources", "limit") if key in request}
+        session = request.get("session")
+        if session is None:
+            return self.agent.search(str(request.get("query", "")), **filters)
+        with self.sessions.session(session) as agent:
+            return agent.search(str(request.get("query", "")), **filters)
+
+    def close(self):
+        """Stop listening, then flush and close every resident state."""
+        self.server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.sessions.close()
+        self.agent.close()
+
+
+def serve(path=None, project_dir=None):
+    daemon = GroDaemon(path, project_dir)
+    signal.signal(signal.SIGTERM, lambda *args: threading.Thread(target=daemon.shutdown, daemon=True).start())
+    print(f"gro_daemon listening on {daemon.path}", flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    project_dir = args[args.index("--project") + 1] if "--project" in args[:-1] else None
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: gro_daemon needs Unix domain sockets; gro_client.py runs in-process on this platform.")
+        sys.exit(1)
+    if args[:1] == ["stop"]:
+        client = connect(socket_path(project_dir))
+        if client is None:
+            print("gro_daemon is not running.")
+            sys.exit(1)
+        with client:
+            print(client.request({"command": "shutdown"})["status"])
+    else:
+        try:
+            serve(project_dir=project_dir)
+        except OSError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
@@ -1,46 +1,177 @@
-import json
 import os
 import sys
-import re
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.storage.state_engine import StateEngine
+from src.storage.backends import open_backend
+from src.storage.bounded_history import BoundedHistory, RECENT_FIRST
+from src.storage.summaries_index import SummariesIndex
+from src import metrics
+from src.tag_matcher import TagMatcher
+from src.config_service import config_path, get_config
+from src.storage.archive import StateArchive, Compactor
+from src.analytics import Analytics
+from src.storage.log_follower import LogFollower
+from src.storage.markdown_writer import MarkdownWriter
+from src.storage.relevance_index import RelevanceIndex
+from src.storage.search_index import SearchIndex
+from src.storage.sessions import SessionPool, session_dir, storage_roots
+
+# Replies for keywords and #e1–#e5 tags
+RESPONSES = {
+    "hello": "Hey there! How can I assist you today?",
+    "help": "I’m here to guide you—ask me anything about the project!",
+    "debug": "Let’s troubleshoot—what’s the issue?",
+    "summarize": "Summarizing recent history—check state.json!",
+    "#e1": "Debug info: Low relevance, focusing on setup or minor issues.",
+    "#e2": "Plan update: I’ll help outline the next steps for the project.",
+    "#e3": "Action required: Let’s execute a specific task or command.",
+    "#e4": "Command suggestion: I’ll provide a command to run.",
+    "#e5": "User interaction: I’ll respond directly to your query."
+}
+
+
+def new_matcher(responses=RESPONSES):
+    """Tags, keywords and #DT blocks are all found in one pass by a matcher built from the table."""
+    return TagMatcher(list(responses) + ["summarize"])
+
+
+def e3_capture(message, match):
+    """(summary, state value, #DT content or None) recorded for an #e3 message."""
+    if match.dt is not None:
+        dt_content = match.dt.strip()
+        summary = (f"Processed #e3 input: {message.split('#DT')[0].strip()}. "
+                   f"For #DT, planned: {dt_content}.")
+        return summary, "WIP, Short Term, DT", dt_content
+    return f"Processed #e3 input: {message}", "WIP, Short Term", None
+
+
+def recent_activity(entries):
+    """The auto-summary text for the last few log entries."""
+    if not entries:
+        return "No recent history to summarize."
+    weight_counts = {}
+    for e in entries:
+        w = f"#e{e['weight']}"
+        weight_counts[w] = weight_counts.get(w, 0) + 1
+    return "Recent activity: " + ", ".join(f"{v}x {k}" for k, v in weight_counts.items())
+
+
+def default_state():
+    return {
+        "history": [],
+        "chat_summaries": [],
+        "wip": {},
+        "related_data": {},
+        "progress": "",
+        "latest_input": "",
+        "input_count": 0
+    }
+
 
 class GroInstructor:
-    def __init__(self):
+    def __init__(self, flush_every=10, flush_interval_ms=1000, project_dir=None, history_size=None, backend=None,
+                 max_size_mb=None, durable=None, state_format=None, follow_log=False, async_markdown=True,
+                 session_id=None, storage_root=None, retrieval=None, search=None):
         # Use relative paths based on the project directory
-        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.state_file = os.path.join(project_dir, "data", "historical", "state.json")
-        self.log_file = os.path.join(project_dir, "data", "historical", "history_log.jsonl")
-        self.summaries_file = os.path.join(project_dir, "docs", "e3_summaries.md")
+        if project_dir is None:
+            project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        project_config = config_path(os.path.join(project_dir, "config"))
+        config = get_config(project_config).get() if os.path.exists(project_config) else {}
+        metrics.configure(config.get("metrics"), project_dir)
+        # Files live under storage.root, or in their own shard under storage.sessions_root for a session
+        root, sessions_root = storage_roots(config, project_dir)
+        self.session_id = session_id
+        if session_id is not None:
+            self.data_dir = session_dir(storage_root or sessions_root, session_id)
+            self.summaries_file = os.path.join(self.data_dir, "e3_summaries.md")
+        else:
+            self.data_dir = storage_root or root
+            self.summaries_file = os.path.join(project_dir, "docs", "e3_summaries.md")
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.state_file = os.path.join(self.data_dir, "state.json")
+        self.log_file = os.path.join(self.data_dir, "history_log.jsonl")
+        self.summaries_index = SummariesIndex(self.summaries_file)
+        # #e3/#DT markdown captures are queued and written in batches by a worker, off the reply path
+        self.markdown_writer = MarkdownWriter(self.summaries_index) if async_markdown else None
         # Define responses for keywords and #e1–#e5 tags
-        self.responses = {
-            "hello": "Hey there! How can I assist you today?",
-            "help": "I’m here to guide you—ask me anything about the project!",
-            "debug": "Let’s troubleshoot—what’s the issue?",
-            "summarize": "Summarizing recent history—check state.json!",
-            "#e1": "Debug info: Low relevance, focusing on setup or minor issues.",
-            "#e2": "Plan update: I’ll help outline the next steps for the project.",
-            "#e3": "Action required: Let’s execute a specific task or command.",
-            "#e4": "Command suggestion: I’ll provide a command to run.",
-            "#e5": "User interaction: I’ll respond directly to your query."
-        }
+        self.responses = dict(RESPONSES)
+        self.matcher = new_matcher(self.responses)
+        # Storage is pluggable: "json" (state.json + segmented log) or "sqlite" (see storage/migrate.py);
+        # durable=False keeps the journal but skips fsync, state_format picks json/pretty/msgpack (see codec.py).
+        # Unless given, all three come from the storage section, like the server's (utils/server.py)
+        storage = config.get("storage") or {}
+        if backend is None:
+            backend = storage.get("backend") or "json"
+        if durable is None:
+            durable = storage.get("durable", True)
+        if state_format is None:
+            state_format = storage.get("format")
+        self.backend = open_backend(backend, self.state_file, log_dir=os.path.splitext(self.log_file)[0],
+                                    durable=durable, state_format=state_format)
+        self.history_store = self.backend.log
+        # The JSON log lives in a segmented store next to the legacy file; the first run imports the old log
+        if backend == "json" and not len(self.history_store) and os.path.exists(self.log_file):
+            self.history_store.import_jsonl(self.log_file)
+        # State is loaded once and flushed write-behind (every N inputs, every T ms, and on exit)
+        self.engine = StateEngine(self.state_file, default_factory=self.default_state,
+                                  flush_every=flush_every, flush_interval_ms=flush_interval_ms,
+                                  backend=self.backend)
+        # Top-K history (data.history_size) stays resident as a heap and is written back to state["history"] on flush
+        if history_size is None:
+            history_size = (config.get("data") or {}).get("history_size", 5)
+        self.history = BoundedHistory(history_size, RECENT_FIRST, self.history_entries(self.engine.state))
+        self.engine.add_flush_hook(self.store_history)
+        # ...and takes in entries another process (GrokAgent, the server) merged into it
+        self.engine.add_merge_hook(self.merge_history)
+        # Enforce data.max_size_mb by moving old summaries/reflections into a compressed archive
+        if max_size_mb is None:
+            max_size_mb = config.get("data", {}).get("max_size_mb")
+        self.archive = StateArchive(os.path.join(self.data_dir, "archive"))
+        self.compactor = Compactor(self.engine, self.archive, max_size_mb).start() if max_size_mb else None
+        # With retrieval on, replies also carry the most relevant past inputs and summaries (see relevance_index.py)
+        retrieval_config = dict(config.get("retrieval") or {})
+        if retrieval is None:
+            retrieval = retrieval_config.get("enabled", False)
+        self.related_results = retrieval_config.get("results", 3)
+        self.relevance = None
+        if retrieval:
+            self.relevance = RelevanceIndex(os.path.join(self.data_dir, "relevance_index"), self.history_store,
+                                            max_postings=retrieval_config.get("max_postings", 2000))
+            if self.relevance.created:
+                self.relevance.add_summaries(self.engine.state.get("chat_summaries") or [])
+        # Full-text search over the #e3 summaries markdown, chat_summaries and e3_reflections (see search()).
+        # Opened by the first search, or here with search enabled; captures are indexed while it is open.
+        self.search_index = None
+        self._search_lock = threading.Lock()  # orders markdown captures against opening the index
+        if search is None:
+            search = (config.get("search") or {}).get("enabled", False)
+        if search:
+            self.open_search_index()
+        # With follow_log, summaries and #e3 captures happen on a thread tailing the log, off the respond() path
+        self.follower = None
+        if follow_log:
+            if backend != "json":
+                print(f"Warning: follow_log needs the json backend's log files—ignored for {backend}.")
+            else:
+                self.follower = LogFollower(self.history_store.directory, from_start=False)
+                self.follower.add_handler(self.process_logged)
+                self.follower.start()
 
-    def capture_e3_to_summaries_md(self, summary_text, state):
-        today = datetime.now().strftime("%Y-%m-%d")
-        summary_count = 0
-        try:
-            with open(self.summaries_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                summary_count = len(re.findall(f"Date\\*\\*: {today}", content))
-        except FileNotFoundError:
-            pass
-        summary_count += 1
+    def capture_e3_to_summaries_md(self, summary_text, state, today=None):
+        today = today or datetime.now().strftime("%Y-%m-%d")
+        summary_count = self.summaries_index.entry_count(today) + 1
         summary_label = f"Summary {summary_count}" if summary_count > 1 else "Summary"
         entry = (f"- **Date**: {today}\n"
                  f"- **{summary_label}**: {summary_text}\n"
                  f"- **Follow-Up**:\n"
                  f"- **State**: {state}\n\n")
-        with open(self.summaries_file, "a", encoding="utf-8") as f:
-            f.write(entry)
+        with self._search_lock:
+            self.summaries_index.append_summary(today, entry)
+            if self.search_index is not None:
+                self.search_index.add_markdown(entry)
 
     def capture_e3_to_state_json(self, state, summary_text, state_value):
         if "e3_reflections" not in state:
@@ -52,51 +183,63 @@ class GroInstructor:
         })
         return state
 
-    def capture_dt_to_summaries_md(self, dt_content):
-        today = datetime.now().strftime("%Y-%m-%d")
-        goal_count = 0
-        try:
-            with open(self.summaries_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                future_vision_section = re.search(r"## Future Vision \(#DT - Deep Thought\)(.*?)(?=\n## |\Z)", content, re.DOTALL)
-                if future_vision_section:
-                    section_content = future_vision_section.group(1)
-                    goal_count = len(re.findall(f"Date\\*\\*: {today}.*?Goal \\d+", section_content, re.DOTALL))
-        except FileNotFoundError:
-            pass
-        goal_count += 1
+    def capture_dt_to_summaries_md(self, dt_content, today=None):
+        today = today or datetime.now().strftime("%Y-%m-%d")
+        goal_count = self.summaries_index.goal_count(today) + 1
         goal_label = f"Goal {goal_count}" if goal_count > 1 else "Goal 1"
         entry = (f"- **Date**: {today}\n"
                  f"- **{goal_label}**: {dt_content}\n"
                  f"- **Purpose**: [To be defined]\n"
                  f"- **State**: Longer Term, DT\n\n")
-        with open(self.summaries_file, "r+", encoding="utf-8") as f:
-            content = f.read()
-            if "Future Vision (#DT - Deep Thought)" not in content:
-                content += "\n## Future Vision (#DT - Deep Thought)\n" + entry
-            else:
-                content = content.replace("## Future Vision (#DT - Deep Thought)", "## Future Vision (#DT - Deep Thought)\n" + entry)
-            f.seek(0)
-            f.write(content)
+        with self._search_lock:
+            self.summaries_index.insert_goal(today, entry)
+            if self.search_index is not None:
+                self.search_index.add_markdown(entry)
 
     def respond(self, message):
-        state = self.load_state()
+        with metrics.profiled("respond"), metrics.span("respond"):
+            with self.engine.lock:
+                pending = []
+                reply = self._respond(self.engine.state, message, pending)
+                with metrics.span("respond.log"):
+                    self.log_entries(pending)
+                self.engine.mark_dirty()
+        metrics.count("gro_entries_processed_total", stage="respond")
+        return reply
+
+    def respond_many(self, messages, batch_size=1000):
+        """Reply to many messages; each batch gets one log append and one state commit."""
+        return list(self.respond_iter(messages, batch_size))
+
+    def respond_iter(self, messages, batch_size=1000):
+        """Stream replies for an iterable of messages, committing every batch_size messages."""
+        messages = iter(messages)
+        while True:
+            batch = list(islice(messages, batch_size))
+            if not batch:
+                return
+            with metrics.span("respond_many.batch"):
+                with self.engine.lock:
+                    pending = []
+                    replies = [self._respond(self.engine.state, message, pending) for message in batch]
+                    with metrics.span("respond.log"):
+                        self.log_entries(pending)
+                    self.engine.mark_dirty(len(batch))
+                self.engine.flush()
+            metrics.count("gro_entries_processed_total", len(batch), stage="respond")
+            yield from replies
+
+    def _respond(self, state, message, pending):
+        """Apply one message to state; its log entry is queued on pending for the caller to write."""
         weight = 2  # Default #e2
-        valid_tags = [f"#e{i}" for i in range(1, 6)]
-        found_weight = None
         found_tag = None
 
-        # Check for #e1–#e5 tags
-        for i in range(5, 0, -1):
-            tag = f"#e{i}"
-            if tag in message:
-                found_weight = i
-                found_tag = tag
-                break
-
-        if found_weight is not None:
-            weight = found_weight
-        elif any(tag not in valid_tags and "#e" in tag for tag in message.split()):
+        # Check for #e1–#e5 tags (the highest one present wins)
+        match = self.matcher.match(message)
+        if match.weight is not None:
+            weight = match.weight
+            found_tag = f"#e{weight}"
+        elif match.invalid_tag:
             print("Warning: Invalid #e tag detected—using default #e2.")
 
         new_entry = {
@@ -106,113 +249,172 @@ class GroInstructor:
         }
 
         # Log every entry
-        self.log_entry(new_entry)
+        pending.append(new_entry)
 
         # Update history
-        if "history" not in state or not isinstance(state["history"], list):
-            state["history"] = []
-        state["history"].append(new_entry)
-        state["history"] = sorted(state["history"], key=lambda x: (x.get("timestamp", ""), x.get("weight", 2)), reverse=True)[:5]
+        self.history.push(new_entry)
 
         state["latest_input"] = message
         state["progress"] = f"Updated on {datetime.now().isoformat()}"
 
-        # Track input count and auto-summarize every 10 inputs
+        # Track input count
         if "input_count" not in state:
             state["input_count"] = 0
         state["input_count"] += 1
-        if state["input_count"] % 10 == 0 or "summarize" in message.lower():
-            self.summarize_history(state)
-
-        # Handle #e3 automation
-        if "#e3" in message:
-            state_value = "WIP, Short Term"
-            dt_match = re.search(r"#DT.*?‘deep thought’(.*?)#DTend", message, re.DOTALL)
-            if dt_match:
-                dt_content = dt_match.group(1).strip()
-                summary = (f"Processed #e3 input: {message.split('#DT')[0].strip()}. "
-                           f"For #DT, planned: {dt_content}.")
-                state_value = "WIP, Short Term, DT"
-                self.capture_dt_to_summaries_md(dt_content)
-            else:
-                summary = f"Processed #e3 input: {message}"
-            self.capture_e3_to_summaries_md(summary, state_value)
-            state = self.capture_e3_to_state_json(state, summary, state_value)
-
-        self.save_state(state)
+        # Summaries and #e3 captures run here, or on the log follower when there is one
+        if self.follower is None:
+            with metrics.span("respond.process"):
+                self.run_captures(self._process_entry(state, message, match, state["input_count"], pending))
 
         # Check for #e1–#e5 responses first
         if found_tag and found_tag in self.responses:
-            recent_history = self.get_recent_history(state)
+            recent_history = self.get_recent_history(state, message)
             response = f"{self.responses[found_tag]}\nRecent context: {recent_history}"
             return response
 
-        # Check for keyword responses
-        for key, value in self.responses.items():
-            if key.startswith("#e"):
-                continue  # Skip #e tags, already handled
-            if key in message.lower():
-                recent_history = self.get_recent_history(state)
-                return f"{value}\nRecent context: {recent_history}"
+        # Check for keyword responses (#e tags are already handled)
+        for key in match.keywords:
+            if key in self.responses:
+                recent_history = self.get_recent_history(state, message)
+                return f"{self.responses[key]}\nRecent context: {recent_history}"
         return "I’m not sure—can you clarify?"
 
-    def get_recent_history(self, state):
-        """Return a summary of recent history for context."""
-        if not state.get("history"):
+    def _process_entry(self, state, message, match, count, pending=(), logged=False):
+        """Auto-summaries and #e3 state capture for one logged message.
+
+        logged means the message is already entry count of the log (the
+        follower's case), so its summary covers the entries up to it rather
+        than the newest ones. The summaries.md writes are returned as
+        (function, *args) for the caller to hand to run_captures(), outside
+        the lock where it can.
+        """
+        captures = []
+        # Auto-summarize every 10 inputs
+        if count % 10 == 0 or "summarize" in match.keywords:
+            with metrics.span("respond.summarize_history"):
+                self.summarize_history(state, pending, end=count if logged else None)
+
+        # Handle #e3 automation
+        if 3 in match.tags:
+            today = datetime.now().strftime("%Y-%m-%d")
+            summary, state_value, dt_content = e3_capture(message, match)
+            if dt_content is not None:
+                captures.append((self.capture_dt_to_summaries_md, dt_content, today))
+            captures.append((self.capture_e3_to_summaries_md, summary, state_value, today))
+            self.capture_e3_to_state_json(state, summary, state_value)
+            if self.search_index is not None:
+                captures.append((self.search_index.add_state_items, "e3_reflections", state["e3_reflections"][-1:]))
+        return captures
+
+    def process_logged(self, entries):
+        """Log follower handler: the per-entry work respond() leaves to it when follow_log is on."""
+        captures = []
+        with self.engine.lock:
+            # Entries are numbered by log position, which survives restarts like respond()'s input_count.
+            # The follower has just read up to the end of this batch; under the lock, their index records
+            # (written after the lines) are complete too.
+            end = self.history_store.position(self.follower.segment, self.follower.offset)
+            for i, entry in enumerate(entries):
+                message = str(entry.get("input", ""))
+                captures += self._process_entry(self.engine.state, message, self.matcher.match(message),
+                                                end - len(entries) + i + 1, logged=True)
+            self.engine.mark_dirty(len(entries))
+        self.run_captures(captures)
+
+    def run_captures(self, captures):
+        """Queue summaries.md captures on the markdown writer, or write them now without one."""
+        for capture, *args in captures:
+            if self.markdown_writer is not None:
+                self.markdown_writer.submit(capture, *args)
+            else:
+                with metrics.span("markdown.write"):
+                    capture(*args)
+
+    def flush_captures(self):
+        """Wait until every queued summaries.md capture is on disk."""
+        if self.markdown_writer is not None:
+            self.markdown_writer.join()
+
+    def get_recent_history(self, state, message=None):
+        """Return a summary of recent history for context, plus the past inputs most relevant to message."""
+        if not len(self.history):
             return "No recent history available."
-        recent_inputs = [entry["input"] for entry in state["history"][:3]]  # Last 3 entries
-        return f"Recent inputs: {'; '.join(recent_inputs)}"
+        recent_inputs = [entry["input"] for entry in self.history.top(3)]  # Last 3 entries
+        context = f"Recent inputs: {'; '.join(recent_inputs)}"
+        if self.relevance is not None and message:
+            related = self.related_context(message, exclude=recent_inputs + [message])
+            if related:
+                context += f"\nRelated: {'; '.join(related)}"
+        return context
+
+    def related_context(self, message, exclude=()):
+        """The logged inputs and chat summaries most relevant to message, as display strings."""
+        with metrics.span("respond.retrieve"):
+            results = self.relevance.search(message, self.related_results, exclude)
+        return [document["input"] if source == "log" else f"{document.get('date')}: {document.get('summary')}"
+                for _, source, document in results]
+
+    def history_entries(self, state):
+        history = state.get("history")
+        return history if isinstance(history, list) else []
+
+    def store_history(self, state):
+        return self.history.store(state)
+
+    def merge_history(self, state, base, theirs):
+        return self.history.merge(state, base, theirs)
 
     def load_state(self):
-        try:
-            with open(self.state_file, "r", encoding="utf-8") as f:
-                data = f.read()
-                if not data.strip():
-                    return self.default_state()
-                return json.loads(data)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error loading state.json: {e}. Using default state.")
-            return self.default_state()
+        with self.engine.lock:
+            return self.store_history(self.engine.state)
 
     def default_state(self):
-        return {
-            "history": [],
-            "chat_summaries": [],
-            "wip": {},
-            "related_data": {},
-            "progress": "",
-            "latest_input": "",
-            "input_count": 0
-        }
+        return default_state()
 
     def save_state(self, state):
-        with open(self.state_file, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
+        """Replace the resident state and commit it to disk immediately."""
+        with self.engine.lock:
+            self.engine.replace(state)
+            self.history = BoundedHistory(self.history.k, RECENT_FIRST, self.history_entries(state))
+        self.engine.flush()
+
+    def close(self):
+        if self.follower is not None:
+            self.follower.stop()
+        if self.markdown_writer is not None:
+            self.markdown_writer.close()
+        if self.compactor is not None:
+            self.compactor.stop()
+        self.engine.close()
+        if self.relevance is not None:
+            self.relevance.close()
+        if self.search_index is not None:
+            self.search_index.close(self.summaries_index.synced_stat())
 
     def log_entry(self, entry):
-        try:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry) + "\n")
-        except Exception as e:
-            print(f"Error logging to {self.log_file}: {e}")
+        self.log_entries([entry])
 
-    def summarize_history(self, state):
+    def log_entries(self, entries):
+        start = len(self.history_store)
         try:
-            with open(self.log_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()[-10:]  # Last 10 entries
-                entries = [json.loads(line.strip()) for line in lines if line.strip()]
-        except FileNotFoundError:
-            entries = []
-            print("No history log found—nothing to summarize.")
+            self.history_store.append_many(entries)
+        except Exception as e:
+            print(f"Error logging to {self.backend.path}: {e}")
+            return
+        if self.relevance is not None:
+            self.relevance.add_entries(entries, start)
 
-        if not entries:
-            summary = "No recent history to summarize."
+    def summarize_history(self, state, pending=(), end=None):
+        # Last 10 entries, read via the offset index plus any entries not yet appended;
+        # with end, the 10 logged entries before that log position
+        if end is not None:
+            entries = self.history_store.slice(end - 10, end)
         else:
-            weight_counts = {}
-            for e in entries:
-                w = f"#e{e['weight']}"
-                weight_counts[w] = weight_counts.get(w, 0) + 1
-            summary = "Recent activity: " + ", ".join(f"{v}x {k}" for k, v in weight_counts.items())
+            pending = list(pending)[-10:]
+            entries = self.history_store.last(10 - len(pending)) + pending
+        if not entries:
+            print("No history log found—nothing to summarize.")
+        summary = recent_activity(entries)
 
         if "chat_summaries" not in state or not isinstance(state["chat_summaries"], list):
             state["chat_summaries"] = []
@@ -220,10 +422,93 @@ class GroInstructor:
             "date": datetime.now().strftime("%Y-%m-%d"),
             "summary": summary
         })
+        self.index_summary(state["chat_summaries"][-1])
+
+    def summarize_trends(self, days=7):
+        """Add a chat summary of the last `days` of the log (weight mix, priority trend, repeats) and return it.
+
+        This loads the log's weight and timestamp columns, so it runs on demand
+        (python src/gro_instructor.py --trends), never from respond().
+        """
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        summary = {
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "summary": f"Last {days} days: {Analytics.from_log(self.history_store).window(since).summary()}"
+        }
+        with self.engine.lock:
+            state = self.engine.state
+            if "chat_summaries" not in state or not isinstance(state["chat_summaries"], list):
+                state["chat_summaries"] = []
+            state["chat_summaries"].append(summary)
+            self.index_summary(summary)
+            self.engine.mark_dirty()
+        return summary
+
+    def index_summary(self, summary):
+        if self.relevance is not None:
+            self.relevance.add_summaries([summary])
+        if self.search_index is not None:
+            self.run_captures([(self.search_index.add_state_items, "chat_summaries", [summary])])
+
+    def open_search_index(self):
+        """Open (building it on first use) the search index of this data directory.
+
+        Whatever was added while it was closed is indexed now: the markdown
+        is re-synced if it changed, and chat_summaries / e3_reflections are
+        caught up from the state and the archive. Captures are indexed as they
+        happen from then on.
+        """
+        # The engine lock keeps state captures from being queued for items the catch-up has not seen
+        with self.engine.lock, self._search_lock:
+            if self.search_index is None:
+                index = SearchIndex(os.path.join(self.data_dir, "search_index"), self.summaries_file)
+                # A hand edit of the markdown is picked up by the next search, once queued captures are written
+                self.summaries_index.add_rebuild_hook(index.mark_markdown_stale)
+                for source in ("chat_summaries", "e3_reflections"):
+                    items = self.engine.state.get(source)
+                    index.catch_up_state(source, items if isinstance(items, list) else [], self.archive)
+                if self.markdown_writer is not None and self.markdown_writer.busy():
+                    # A batch of captures in flight may write the file after the sync above; the next search
+                    # re-syncs, which only adds what isn't indexed yet
+                    index.mark_markdown_stale()
+                self.search_index = index
+            return self.search_index
+
+    def search(self, query="", states=(), since=None, until=None, sources=None, limit=20):
+        """Search the #e3 summaries, chat_summaries and e3_reflections; see SearchIndex.search.
+
+        Returns the matching records (dicts with source, date, text and, where
+        there is one, state), best first, each with its score under "score".
+        """
+        index = self.open_search_index()
+        self.flush_captures()
+        with metrics.span("search"):
+            results = index.search(query, states, since, until, sources, limit)
+        return [dict(record, score=round(score, 4)) for score, record in results]
+
+def session_pool(project_dir=None, max_resident=None, **kwargs):
+    """A SessionPool of GroInstructors, one per session id, each with its own state shard.
+
+    max_resident defaults to storage.max_sessions from the config (64 if unset);
+    kwargs are passed on to every GroInstructor.
+    """
+    if max_resident is None:
+        project_config = config_path(os.path.join(project_dir or os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), "config"))
+        config = get_config(project_config).get() if os.path.exists(project_config) else {}
+        max_resident = config.get("storage", {}).get("max_sessions") or 64
+    return SessionPool(lambda session_id: GroInstructor(project_dir=project_dir, session_id=session_id, **kwargs),
+                       max_resident)
+
 
 if __name__ == "__main__":
-    agent = GroInstructor()
-    if sys.stdin.isatty():
+    # python gro_instructor.py [--session ID] chats in that session's shard instead of the default state;
+    # --trends adds a "Last 7 days" chat summary from the whole log instead of chatting
+    session_id = sys.argv[sys.argv.index("--session") + 1] if "--session" in sys.argv[1:-1] else None
+    agent = GroInstructor(session_id=session_id)
+    if "--trends" in sys.argv[1:]:
+        print(agent.summarize_trends()["summary"])
+    elif sys.stdin.isatty():
         while True:
             try:
                 message = input("You: ")
@@ -235,4 +520,5 @@ if __name__ == "__main__":
     else:
         message = input("You: ")
         reply = agent.respond(message)
-        print(f"gro_instructor: {reply}")
\ No newline at end of file
+        print(f"gro_instructor: {reply}")
+    agent.close()
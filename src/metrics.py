@@ -0,0 +1,179 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+
+# Stage latency buckets in seconds, from 50µs to 10s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0, 10.0)
+HELP = {
+    "gro_stage_seconds": ("histogram", "Time spent in each stage of the message pipeline."),
+    "gro_bytes_read_total": ("counter", "Bytes read from storage."),
+    "gro_bytes_written_total": ("counter", "Bytes written to storage."),
+    "gro_entries_processed_total": ("counter", "Entries handled by each stage."),
+    "gro_http_requests_total": ("counter", "HTTP requests served, by method and status."),
+    "gro_profiles_total": ("counter", "Requests captured with cProfile."),
+}
+
+
+class _NullSpan:
+    """What span() returns while metrics are off: entering and leaving it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _Profile:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.registry.save_profile(self.name, self.profile)
+        return False
+
+
+class Registry:
+    """Process-wide counters and stage-latency histograms, rendered in Prometheus text format.
+
+    Disabled by default: span() then returns a shared no-op context manager
+    and count() returns straight away, so instrumented code pays one
+    attribute check per call. Enable with configure(enabled=True), the
+    config's metrics section or GRO_METRICS=1.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.profile_rate = 0.0
+        self.profile_dir = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def configure(self, enabled=None, profile_rate=None, profile_dir=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if profile_rate is not None:
+            self.profile_rate = float(profile_rate)
+        if profile_dir is not None:
+            self.profile_dir = profile_dir
+        return self
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else NULL_SPAN
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = [[0] * (len(BUCKETS) + 1), 0.0]
+            histogram[0][bisect_left(BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def profiled(self, name):
+        """A cProfile capture for a profile_rate fraction of calls, written to profile_dir as .prof files."""
+        if not self.enabled or not self.profile_rate or random.random() >= self.profile_rate:
+            return NULL_SPAN
+        return _Profile(self, name)
+
+    def save_profile(self, name, profile):
+        self.count("gro_profiles_total", stage=name)
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.profile_dir, f"{name}-{stamp}-{threading.get_ident()}-{time.monotonic_ns()}.prof")
+            profile.dump_stats(path)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((stage, (list(buckets), total)) for stage, (buckets, total) in self.histograms.items())
+        lines = []
+        declared = set()
+
+        def declare(name):
+            if name not in declared:
+                declared.add(name)
+                kind, text = HELP.get(name, ("counter", name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for stage, (buckets, total) in histograms:
+            declare("gro_stage_seconds")
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), buckets):
+                cumulative += count
+                lines.append(f"gro_stage_seconds_bucket{_labels((('stage', stage), ('le', str(bound))))} {cumulative}")
+            lines.append(f"gro_stage_seconds_sum{_labels((('stage', stage),))} {total}")
+            lines.append(f"gro_stage_seconds_count{_labels((('stage', stage),))} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry(enabled=os.environ.get("GRO_METRICS", "") not in ("", "0"))
+span = REGISTRY.span
+count = REGISTRY.count
+profiled = REGISTRY.profiled
+render = REGISTRY.render
+
+
+def configure(section=None, project_dir=None, **kwargs):
+    """Apply a config's metrics section (enabled, profile_rate, profile_dir relative to project_dir)."""
+    section = dict(section or {}, **kwargs)
+    profile_dir = section.get("profile_dir")
+    if profile_dir and project_dir and not os.path.isabs(profile_dir):
+        profile_dir = os.path.join(project_dir, profile_dir)
+    # A config that leaves metrics off doesn't switch off what GRO_METRICS turned on
+    return REGISTRY.configure(enabled=section.get("enabled") or None, profile_rate=section.get("profile_rate"),
+                              profile_dir=profile_dir)
@@ -0,0 +1,206 @@
+import argparse
+import mmap
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.gro_instructor import default_state, e3_capture, new_matcher, recent_activity
+from src.storage.backends import open_backend
+from src.storage.bounded_history import BoundedHistory, RECENT_FIRST
+from src.storage.codec import dumps, loads
+from src.storage.history_store import HistoryStore
+
+SUMMARY_EVERY = 10  # GroInstructor auto-summarizes every 10 inputs, over the last 10 entries
+MIN_CHUNK = 1024 * 1024
+
+_matcher = None
+
+
+def log_extents(path):
+    """[(file, bytes)] of a history log in order: the indexed part of each segment of a store, or the .jsonl."""
+    if os.path.isdir(path):
+        return HistoryStore(path, readonly=True).segment_extents()
+    return [(path, os.path.getsize(path))]
+
+
+def log_files(path):
+    """The files of a history log in order: the segments of a store directory, or the .jsonl itself."""
+    return [file for file, _ in log_extents(path)]
+
+
+def _entries(data):
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            entry = loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            yield entry
+
+
+def plan_chunks(extents, chunk_bytes):
+    """[(file, start, stop, estimated entries)] cutting each file at line boundaries about chunk_bytes apart."""
+    chunks = []
+    for path, size in extents:
+        if not size:
+            continue
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                stop = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+                stop = size if stop < 0 else stop + 1
+                # Line count as an estimate; blank or broken lines are corrected for after the first pass
+                lines = mm[start:stop].count(b"\n") + (mm[stop - 1] != ord("\n"))
+                chunks.append((path, start, stop, lines))
+                start = stop
+    return chunks
+
+
+def preceding_entries(extents, chunk, n=SUMMARY_EVERY - 1):
+    """The up to n entries logged right before chunk, for the summaries its first entries close."""
+    found = []
+    files = [path for path, _ in extents]
+    position = files.index(chunk[0])
+    end = chunk[1]
+    while n and len(found) < n and position >= 0:
+        with open(files[position], "rb") as f:
+            if end is None:
+                end = extents[position][1]
+            # Read backwards in growing blocks until there are enough complete lines
+            span = 64 * 1024
+            while True:
+                begin = max(0, end - span)
+                f.seek(begin)
+                data = f.read(end - begin)
+                if begin:
+                    cut = data.find(b"\n")
+                    data = data[cut + 1:] if cut >= 0 else b""
+                entries = list(_entries(data))
+                if len(entries) >= n - len(found) or not begin:
+                    break
+                span *= 4
+        found[:0] = entries
+        position -= 1
+        end = None
+    return found[-n:] if n else []
+
+
+def replay_chunk(path, start, stop, index, context, history_size):
+    """Replay one byte range of the log, as entries index, index + 1, ... of the whole log.
+
+    Returns the partial aggregates to merge: the entry count, the chunk's
+    top-K history, its chat summaries and #e3 reflections in order, and its
+    last entry.
+    """
+    global _matcher
+    if _matcher is None:
+        _matcher = new_matcher()
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    history = BoundedHistory(history_size, RECENT_FIRST)
+    recent = deque(context, maxlen=SUMMARY_EVERY)
+    summaries = []
+    reflections = []
+    count = 0
+    entry = None
+    for entry in _entries(data):
+        count += 1
+        message = str(entry.get("input", ""))
+        date = str(entry.get("timestamp", ""))[:10]
+        recent.append(entry)
+        history.push(entry)
+        match = _matcher.match(message)
+        if (index + count) % SUMMARY_EVERY == 0 or "summarize" in match.keywords:
+            summaries.append({"date": date, "summary": recent_activity(list(recent))})
+        if 3 in match.tags:
+            summary, state_value, _ = e3_capture(message, match)
+            reflections.append({"date": date, "summary": summary, "state": state_value})
+    return {"index": index, "count": count, "history": history.top(), "summaries": summaries,
+            "reflections": reflections, "last": entry}
+
+
+def merge(results, history_size):
+    """Fold the chunk results, in log order, into one state."""
+    state = default_state()
+    history = BoundedHistory(history_size, RECENT_FIRST)
+    last = None
+    for result in results:
+        # A chunk's top entries are best first; ties keep log order, so pushing them in turn matches one pass
+        for entry in result["history"]:
+            history.push(entry)
+        state["chat_summaries"].extend(result["summaries"])
+        if result["reflections"]:
+            state.setdefault("e3_reflections", []).extend(result["reflections"])
+        state["input_count"] += result["count"]
+        last = result["last"] or last
+    history.store(state)
+    if last is not None:
+        state["latest_input"] = str(last.get("input", ""))
+        state["progress"] = f"Updated on {last.get('timestamp', '')}"
+    return state
+
+
+def replay(log, workers=None, history_size=5, chunk_bytes=None):
+    """Rebuild the state GroInstructor would hold after responding to every entry of log, in order.
+
+    The log is cut into byte ranges that are replayed across a process
+    pool and merged in order, so the result is the same for any number of
+    workers; workers=1 replays the whole log in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    extents = log_extents(log)
+    total = sum(size for _, size in extents)
+    chunk_bytes = chunk_bytes or (total if workers == 1 else max(MIN_CHUNK, total // (workers * 4) + 1))
+    chunks = plan_chunks(extents, chunk_bytes)
+    if not chunks:
+        return merge([], history_size)
+    contexts = [preceding_entries(extents, chunk) for chunk in chunks]
+    args = lambda i, start: (chunks[i][0], chunks[i][1], chunks[i][2], start, contexts[i], history_size)
+    if workers == 1:
+        results = []
+        index = 0
+        for i in range(len(chunks)):
+            results.append(replay_chunk(*args(i, index)))
+            index += results[-1]["count"]
+        return merge(results, history_size)
+    starts = []
+    index = 0
+    for chunk in chunks:
+        starts.append(index)
+        index += chunk[3]
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(replay_chunk, *zip(*(args(i, start) for i, start in enumerate(starts)))))
+        # Counts don't depend on the start, so after one pass every chunk's real start is known;
+        # redo the few whose summary phase was thrown off by blank or unreadable lines
+        index = 0
+        redo = {}
+        for i, result in enumerate(results):
+            if result["index"] % SUMMARY_EVERY != index % SUMMARY_EVERY:
+                redo[i] = pool.submit(replay_chunk, *args(i, index))
+            index += result["count"]
+        for i, future in redo.items():
+            results[i] = future.result()
+    return merge(results, history_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild state.json by replaying a history log in parallel.")
+    parser.add_argument("log", help="history_log store directory or history_log.jsonl")
+    parser.add_argument("state_file", help="state.json to write")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--history-size", type=int, default=5)
+    parser.add_argument("--format", default=None, help="state format: json, pretty or msgpack")
+    parser.add_argument("--verify", action="store_true", help="also replay in one process and compare")
+    args = parser.parse_args()
+    state = replay(args.log, args.workers, args.history_size)
+    if args.verify and dumps(state) != dumps(replay(args.log, 1, args.history_size)):
+        print("Error: parallel replay differs from sequential replay; state not written.")
+        sys.exit(1)
+    backend = open_backend("json", args.state_file, state_format=args.format)
+    backend.commit(backend.prepare(state))
+    backend.close()
+    print(f"Replayed {state['input_count']} entries into {args.state_file}")
@@ -0,0 +1,59 @@
+"""Full-text search over the #e3 summaries, chat_summaries and e3_reflections.
+
+    python src/search.py "release plan"
+    python src/search.py '"memory gap"' --state WIP --state DT --since 2025-03-01
+    python src/search.py --source markdown --until 2025-03-31 --limit 5 --json
+
+Every word and "quoted phrase" must match; without any, the newest records
+passing the filters are listed. Queries go to the running gro_daemon.py if
+there is one, else to an in-process GroInstructor. Either way they are
+answered from the search index in the data directory (built from
+e3_summaries.md and state.json on first use), not by rescanning the files.
+"""
+import argparse
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.gro_client import search
+from src.storage.search_index import SOURCES, STATES
+
+
+def format_record(record):
+    label = record.get("label") or record["source"]
+    state = f" [{record['state']}]" if record.get("state") else ""
+    line = f"{record.get('date') or '?'}  {label}{state}: {record.get('text') or ''}"
+    if record.get("notes"):
+        line += f"\n    {'Purpose' if record.get('kind') == 'goal' else 'Follow-Up'}: {record['notes']}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("query", nargs="*", help='words and "quoted phrases" that must all match')
+    parser.add_argument("--state", action="append", default=[], choices=STATES,
+                        help="only records whose State includes this (repeatable)")
+    parser.add_argument("--since", help="first date to include, YYYY-MM-DD")
+    parser.add_argument("--until", help="last date to include, YYYY-MM-DD")
+    parser.add_argument("--source", action="append", choices=SOURCES, help="only records from here (repeatable)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--session", help="search a session's shard instead of the default state")
+    parser.add_argument("--project", help="project directory (default: this checkout)")
+    parser.add_argument("--json", action="store_true", help="print the records as JSON")
+    args = parser.parse_args()
+    try:
+        results = search(" ".join(args.query), args.session, args.project, states=args.state, since=args.since,
+                         until=args.until, sources=args.source, limit=args.limit)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    for record in results:
+        print(format_record(record))
+    print(f"{len(results)} record(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,265 @@
-import shutil
+import gzip
+import hashlib
+import json
 import os
+import sys
 from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.config_service import config_path, get_config
+from src.storage.backends import open_backend
+from src.storage.codec import decode
 
-def backup_state_json(source_path="data/state.json", backup_dir="data/backups"):
-    """Backup state.json with a timestamped filename."""
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"{backup_dir}/state_{timestamp}.json"
-    shutil.copy2(source_path, backup_file)
-    print(f"Backed up state.json to {backup_file}")
-    return backup_file
\ No newline at end of file
+# Incremental backups: periodic full snapshots plus JSON-patch deltas.
+#
+# backup_dir/
+#   catalog.json          ordered list of restore points
+#   objects/<sha256>.gz   full snapshots, named by content hash (identical states share one file)
+#   deltas/<id>.gz        RFC 6902 patch from the previous restore point
+#   head.json             the latest state (uncompressed), kept so the next delta needs no replay
+
+def _escape(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(old, new, path=""):
+    """JSON patch (add/remove/replace) turning old into new; appended list items become "-" adds."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            elif old[key] != value:
+                ops.extend(make_patch(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(old, list):
+        if len(new) >= len(old) and new[:len(old)] == old:
+            return [{"op": "add", "path": f"{path}/-", "value": value} for value in new[len(old):]]
+        return [{"op": "replace", "path": path, "value": new}]
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def apply_patch(doc, ops):
+    for op in ops:
+        if op["path"] == "":
+            doc = op["value"]
+            continue
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if last == "-":
+                parent.append(op["value"])
+            elif op["op"] == "add":
+                parent.insert(int(last), op["value"])
+            elif op["op"] == "remove":
+                del parent[int(last)]
+            else:
+                parent[int(last)] = op["value"]
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = op["value"]
+    return doc
+
+
+def _write_gz(path, data):
+    _write_raw(path, gzip.compress(data, compresslevel=6))
+
+
+def _write_raw(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read_gz(path):
+    with gzip.open(path, "rb") as f:
+        return f.read()
+
+
+class IncrementalBackup:
+    """Snapshot-plus-delta backups of state.json with content-addressed dedup and retention.
+
+    Every snapshot_every-th restore point (or whenever a delta would be at
+    least half the size of a snapshot) is a full snapshot; the rest are
+    deltas against the previous point. Only the newest keep points are
+    retained; restoring replays deltas forward from the nearest snapshot.
+    """
+
+    def __init__(self, backup_dir="data/backups", snapshot_every=10, keep=50):
+        self.backup_dir = backup_dir
+        self.snapshot_every = snapshot_every
+        self.keep = keep
+        self.catalog_file = os.path.join(backup_dir, "catalog.json")
+        for sub in ("objects", "deltas"):
+            os.makedirs(os.path.join(backup_dir, sub), exist_ok=True)
+        try:
+            with open(self.catalog_file, "r", encoding="utf-8") as f:
+                self.catalog = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.catalog = []
+        self._head_state = None
+
+    def _object_path(self, digest):
+        return os.path.join(self.backup_dir, "objects", f"{digest}.gz")
+
+    def _delta_path(self, backup_id):
+        return os.path.join(self.backup_dir, "deltas", f"{backup_id}.gz")
+
+    def _save_catalog(self):
+        tmp = self.catalog_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.catalog, f, indent=2)
+        os.replace(tmp, self.catalog_file)
+
+    def _head(self):
+        if self._head_state is None:
+            path = os.path.join(self.backup_dir, "head.json")
+            if not self.catalog or not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                self._head_state = decode(f.read())
+        return self._head_state
+
+    def backup(self, source_path="data/state.json"):
+        """Record a restore point for source_path; returns its catalog entry."""
+        with open(source_path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        now = datetime.now()
+        entry = {"id": now.strftime("%Y%m%d_%H%M%S_%f"), "timestamp": now.isoformat(), "sha256": digest}
+        previous = self.catalog[-1] if self.catalog else None
+        deltas_since_snapshot = 0
+        for item in reversed(self.catalog):
+            if item["type"] == "snapshot":
+                break
+            deltas_since_snapshot += 1
+
+        if previous is not None and previous["sha256"] == digest:
+            # Unchanged since the last point: an empty delta, nothing new on disk
+            entry.update(type="delta", size=0)
+        else:
+            state = decode(data)
+            delta = None
+            head = self._head() if previous is not None else None
+            if head is not None and deltas_since_snapshot + 1 < self.snapshot_every:
+                delta = json.dumps(make_patch(head, state)).encode("utf-8")
+                if len(delta) * 2 >= len(data):
+                    delta = None
+            if delta is not None:
+                _write_gz(self._delta_path(entry["id"]), delta)
+                entry.update(type="delta", size=os.path.getsize(self._delta_path(entry["id"])))
+            else:
+                if not os.path.exists(self._object_path(digest)):
+                    _write_gz(self._object_path(digest), data)
+                entry.update(type="snapshot", object=digest, size=os.path.getsize(self._object_path(digest)))
+            _write_raw(os.path.join(self.backup_dir, "head.json"), data)
+            self._head_state = state
+
+        self.catalog.append(entry)
+        self.prune()
+        self._save_catalog()
+        return entry
+
+    def _find(self, at):
+        if not self.catalog:
+            raise ValueError(f"No backups in {self.backup_dir}")
+        if at is None:
+            return len(self.catalog) - 1
+        for i, item in enumerate(self.catalog):
+            if item["id"] == at:
+                return i
+        try:
+            datetime.fromisoformat(at)
+        except ValueError:
+            # An id no longer in the catalog (pruned) must not be compared as a timestamp
+            raise ValueError(f"No backup {at} in {self.backup_dir}") from None
+        for i in range(len(self.catalog) - 1, -1, -1):
+            if self.catalog[i]["timestamp"] <= at:
+                return i
+        raise ValueError(f"No backup at or before {at}")
+
+    def _materialize(self, index):
+        start = index
+        while self.catalog[start]["type"] != "snapshot":
+            start -= 1
+        state = decode(_read_gz(self._object_path(self.catalog[start]["object"])))
+        for item in self.catalog[start + 1:index + 1]:
+            if item["size"]:
+                state = apply_patch(state, json.loads(_read_gz(self._delta_path(item["id"]))))
+        return state
+
+    def state_at(self, at=None):
+        """The state as of backup id or ISO timestamp at (default: the latest backup)."""
+        return self._materialize(self._find(at))
+
+    def restore(self, target_path="data/state.json", at=None, state_format=None, durable=None):
+        """Write the state as of `at` to target_path, through the journal and lock like any other writer.
+
+        state_format and durable default to storage.format and storage.durable from the config.
+        """
+        index = self._find(at)
+        state = self._materialize(index)
+        storage = {}
+        if state_format is None or durable is None:
+            path = config_path()
+            storage = (get_config(path).get().get("storage") or {}) if os.path.exists(path) else {}
+        backend = open_backend("json", target_path,
+                               durable=storage.get("durable", True) if durable is None else durable,
+                               state_format=storage.get("format") if state_format is None else state_format)
+        backend.write_state(state)
+        return self.catalog[index]
+
+    def prune(self):
+        """Apply the retention policy, turning the oldest kept point into a snapshot if needed."""
+        if len(self.catalog) <= self.keep:
+            return
+        first = len(self.catalog) - self.keep
+        if self.catalog[first]["type"] != "snapshot":
+            data = json.dumps(self._materialize(first), indent=2).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            if not os.path.exists(self._object_path(digest)):
+                _write_gz(self._object_path(digest), data)
+            self.catalog[first] = dict(self.catalog[first], type="snapshot", object=digest,
+                                       size=os.path.getsize(self._object_path(digest)))
+        self.catalog = self.catalog[first:]
+        # Garbage-collect snapshots and deltas no restore point refers to any more
+        live = {
+            "objects": {item["object"] for item in self.catalog if item["type"] == "snapshot"},
+            "deltas": {item["id"] for item in self.catalog if item["type"] == "delta" and item["size"]},
+        }
+        for sub, names in live.items():
+            for name in os.listdir(os.path.join(self.backup_dir, sub)):
+                if name.endswith(".gz") and name[:-3] not in names:
+                    os.remove(os.path.join(self.backup_dir, sub, name))
+
+    def disk_usage(self):
+        total = 0
+        for root, _, files in os.walk(self.backup_dir):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+
+def backup_state_json(source_path="data/state.json", backup_dir="data/backups", snapshot_every=10, keep=50):
+    """Back up state.json as a restore point in backup_dir; returns its catalog entry.
+
+    Full copies are only made as the periodic snapshots the deltas build on
+    (see IncrementalBackup); restore with IncrementalBackup(backup_dir).restore().
+    """
+    entry = IncrementalBackup(backup_dir, snapshot_every, keep).backup(source_path)
+    print(f"Backed up state.json to {backup_dir} ({entry['type']}, {entry['size']} bytes)")
+    return entry
@@ -0,0 +1,174 @@
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.backends import atomic_write
+from src.storage.codec import dumps, loads
+
+# State lists that grow without bound and can be moved out of the hot state
+ARCHIVED_KEYS = ("chat_summaries", "e3_reflections")
+MONTH = re.compile(r"^\d{4}-\d{2}")
+
+
+def partition_for(entry):
+    """Month partition (YYYY-MM) of an entry's date, or "undated"."""
+    match = MONTH.match(str(entry.get("date", "")) if isinstance(entry, dict) else "")
+    return match.group(0) if match else "undated"
+
+
+class StateArchive:
+    """Cold tier for chat_summaries / e3_reflections: gzip'd JSONL, one file per kind and month.
+
+    A manifest lists the partitions and their entry counts, so queries only
+    open the partitions that overlap the requested date range, and entries
+    are decoded lazily as the caller iterates.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, "manifest.json")
+        self.lock = threading.Lock()
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+
+    def partition_path(self, kind, partition):
+        return os.path.join(self.directory, kind, f"{partition}.jsonl.gz")
+
+    def add(self, kind, entries):
+        """Append entries to their month partitions; each write is a new gzip member."""
+        by_partition = {}
+        for entry in entries:
+            by_partition.setdefault(partition_for(entry), []).append(entry)
+        with self.lock:
+            for partition, items in by_partition.items():
+                path = self.partition_path(kind, partition)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with gzip.open(path, "at", encoding="utf-8") as f:
+                    f.write("".join(dumps(item) + "\n" for item in items))
+                counts = self.manifest.setdefault(kind, {})
+                counts[partition] = counts.get(partition, 0) + len(items)
+            atomic_write(self.manifest_file, json.dumps(self.manifest, indent=2, sort_keys=True))
+
+    def partitions(self, kind):
+        return sorted(self.manifest.get(kind, {}))
+
+    def count(self, kind):
+        return sum(self.manifest.get(kind, {}).values())
+
+    def query(self, kind, since=None, until=None):
+        """Yield archived entries of kind, oldest partition first, optionally within [since, until] dates."""
+        for partition in self.partitions(kind):
+            if partition != "undated":
+                if since and partition < since[:7]:
+                    continue
+                if until and partition > until[:7]:
+                    continue
+            elif since or until:
+                continue
+            try:
+                with gzip.open(self.partition_path(kind, partition), "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = loads(line)
+                        date = str(entry.get("date", ""))[:10]
+                        if since and date < since[:10]:
+                            continue
+                        if until and date > until[:10]:
+                            continue
+                        yield entry
+            except (EOFError, gzip.BadGzipFile) as e:
+                # A crash mid-append leaves a truncated last member; everything before it is intact
+                print(f"Archive partition {kind}/{partition} is truncated: {e}")
+
+
+def compact_state(state, archive, bytes_to_free):
+    """Move the oldest archivable entries out of state until about bytes_to_free is released.
+
+    Entries are written to the archive before they leave the state, so a
+    crash in between can only duplicate an entry, never lose it.
+    """
+    lists = {key: state[key] for key in ARCHIVED_KEYS if isinstance(state.get(key), list)}
+    cut = {key: 0 for key in lists}
+    freed = 0
+    while freed < bytes_to_free:
+        # Take from whichever list has the older head entry
+        candidates = [key for key in lists if cut[key] < len(lists[key])]
+        if not candidates:
+            break
+        key = min(candidates, key=lambda k: str(lists[k][cut[k]].get("date", "")))
+        # Compact size is a lower bound for every state format, so this never frees too little
+        freed += len(dumps(lists[key][cut[key]]).encode("utf-8")) + 1
+        cut[key] += 1
+    moved = 0
+    for key, n in cut.items():
+        if n:
+            archive.add(key, lists[key][:n])
+            state[key] = lists[key][n:]
+            moved += n
+    return moved
+
+
+class Compactor:
+    """Background thread keeping the hot state under data.max_size_mb.
+
+    When the backend reports a hot state larger than the budget, the oldest
+    chat_summaries / e3_reflections are moved to the archive until the state
+    is back under target_ratio of the budget.
+    """
+
+    def __init__(self, engine, archive, max_size_mb, interval=60.0, target_ratio=0.8):
+        self.engine = engine
+        self.archive = archive
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.interval = interval
+        self.target_ratio = target_ratio
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="state-compactor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error compacting {self.engine.state_file}: {e}")
+
+    def run_once(self):
+        """Compact if over budget; returns the number of entries archived."""
+        size = self.engine.backend.state_size()
+        if size <= self.max_bytes:
+            return 0
+        with self.engine.lock:
+            moved = compact_state(self.engine.state, self.archive, size - int(self.max_bytes * self.target_ratio))
+            if moved:
+                self.engine.mark_dirty()
+        if moved:
+            self.engine.flush()
+        return moved
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python archive.py <state.json> <archive_dir> <max_size_mb>")
+        sys.exit(1)
+    from src.storage.state_engine import StateEngine
+    engine = StateEngine(sys.argv[1], flush_on_exit=False)
+    moved = Compactor(engine, StateArchive(sys.argv[2]), float(sys.argv[3])).run_once()
+    engine.close()
+    print(f"Archived {moved} entries from {sys.argv[1]} into {sys.argv[2]}")
@@ -0,0 +1,376 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+
+from src import metrics
+from src.storage.codec import decode, dumps, get_codec, loads
+from src.storage.history_store import HistoryStore, parse_timestamp
+from src.storage.journal import Journal, fsync_dir
+
+
+def atomic_write(path, data, fsync=True):
+    """Write data to path via a temp file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        fsync_dir(directory)
+
+
+class JsonBackend:
+    """The default backend: state.json rewritten whole, history in a segmented JSONL store.
+
+    Writes are two-phase so the engine can snapshot under its lock and do the
+    slow part outside it: ``prepare(state)`` returns a payload and
+    ``commit(payload)`` persists it. Commits go through the write-ahead
+    journal (see journal.py); durable=False skips the fsyncs.
+    state_format picks the codec for writes (compact "json" by default,
+    "pretty" or "msgpack"); reads detect whichever format is on disk.
+    """
+
+    name = "json"
+
+    def __init__(self, state_file, log_dir=None, durable=True, state_format=None):
+        self.path = state_file
+        self.log_dir = log_dir or os.path.join(os.path.dirname(os.path.abspath(state_file)), "history_log")
+        self.journal = Journal(state_file, durable)
+        self.codec = get_codec(state_format)
+        self._log = None
+
+    @property
+    def log(self):
+        if self._log is None:
+            self._log = HistoryStore(self.log_dir)
+        return self._log
+
+    def read_state(self, default_factory=dict):
+        with self.journal.lock, metrics.span("state.read"):
+            data = self.journal.read()
+            if data is not None:
+                metrics.count("gro_bytes_read_total", len(data), file="state")
+            if data is None:
+                print(f"Error loading state.json: {self.path} not found. Using default state.")
+                return default_factory()
+            if not data.strip():
+                return default_factory()
+            try:
+                return decode(data)
+            except ValueError as e:
+                # Keep the damaged file for inspection instead of silently overwriting it later
+                aside = f"{self.path}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                os.replace(self.path, aside)
+                print(f"Error loading state.json: {e}. Moved it to {aside}; using default state.")
+                return default_factory()
+
+    def prepare(self, state):
+        return self.codec.encode(state)
+
+    def commit(self, payload, merge=None):
+        with metrics.span("state.commit"):
+            self.journal.commit(payload, merge)
+        metrics.count("gro_bytes_written_total", len(payload), file="state")
+
+    def write_state(self, state):
+        self.commit(self.prepare(state))
+
+    @contextmanager
+    def transaction(self, default_factory=dict):
+        """Read-modify-write under the cross-process lock: other writers wait until it commits."""
+        with self.journal.lock:
+            state = self.read_state(default_factory)
+            yield state
+            self.write_state(state)
+
+    def state_size(self):
+        """Bytes the hot state occupies on disk."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def close(self):
+        pass
+
+
+# Top-level state keys kept as indexed tables instead of JSON blobs
+TABLES = {
+    "history": ("input", "timestamp", "weight"),
+    "chat_summaries": ("date", "summary"),
+    "e3_reflections": ("date", "summary", "state"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, is_table INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, input TEXT, timestamp TEXT, weight INTEGER, raw TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_summaries (id INTEGER PRIMARY KEY, date TEXT, summary TEXT, raw TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS chat_summaries_date ON chat_summaries(date);
+CREATE TABLE IF NOT EXISTS e3_reflections (id INTEGER PRIMARY KEY, date TEXT, summary TEXT, state TEXT, raw TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS e3_reflections_date ON e3_reflections(date);
+CREATE TABLE IF NOT EXISTS log (id INTEGER PRIMARY KEY, input TEXT, timestamp TEXT, ts REAL, weight INTEGER, raw TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS log_ts ON log(ts);
+CREATE INDEX IF NOT EXISTS log_weight ON log(weight, id);
+"""
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    # WAL lets readers keep going while the writer commits
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqliteBackend:
+    """State, history and #e3 reflections as rows in one SQLite database (WAL mode).
+
+    Commits only write what changed since the previous commit: new
+    chat_summaries / e3_reflections rows, the handful of history rows and the
+    scalar keys whose values differ. A table is rewritten only when its list
+    was replaced or shrank (e.g. by pruning).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path):
+        self.path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.write_lock = threading.RLock()
+        # What the database holds: json-encoded scalars, and (list id, length, first row) per table
+        self._kv = {}
+        self._tables = {}
+        self._log = None
+
+    @property
+    def log(self):
+        if self._log is None:
+            self._log = SqliteLog(self)
+        return self._log
+
+    def read_state(self, default_factory=dict):
+        rows = self.conn.execute("SELECT key, value, is_table FROM kv ORDER BY rowid").fetchall()
+        if not rows:
+            return default_factory()
+        state = {}
+        self._kv = {}
+        self._tables = {}
+        for key, value, is_table in rows:
+            if is_table:
+                items = [loads(raw) for (raw,) in self.conn.execute(f"SELECT raw FROM {key} ORDER BY id")]
+                state[key] = items
+                self._tables[key] = (id(items), len(items), items[0] if items else None)
+            else:
+                state[key] = loads(value)
+            self._kv[key] = value if not is_table else None
+        return state
+
+    def prepare(self, state):
+        """Work out the row changes since the last commit; runs under the engine lock."""
+        kv = []
+        tables = {}
+        for key, value in state.items():
+            if key in TABLES and isinstance(value, list):
+                if not (key in self._kv and self._kv[key] is None):
+                    kv.append((key, None, 1))
+                tables[key] = self._table_changes(key, value)
+            else:
+                encoded = dumps(value)
+                if self._kv.get(key, "") != encoded:
+                    kv.append((key, encoded, 0))
+        removed = [key for key in self._kv if key not in state]
+        return kv, tables, removed
+
+    def _table_changes(self, key, items):
+        written = self._tables.get(key)
+        marker = (id(items), len(items), items[0] if items else None)
+        columns = TABLES[key]
+        if key == "history" or written is None or written[0] != id(items) or written[1] > len(items) \
+                or (written[2] is not None and items and written[2] != items[0]):
+            # Small or replaced lists are rewritten whole
+            start, rewrite = 0, True
+        else:
+            start, rewrite = written[1], False
+        rows = [tuple(item.get(c) if isinstance(item, dict) else None for c in columns) + (dumps(item),)
+                for item in items[start:]]
+        return rewrite, rows, marker
+
+    def commit(self, payload, merge=None):
+        # Only the keys and rows changed here are written, so other writers' changes survive without a merge
+        kv, tables, removed = payload
+        with self.write_lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key in removed:
+                    self.conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+                    if key in TABLES:
+                        self.conn.execute(f"DELETE FROM {key}")
+                for key, _, is_table in kv:
+                    if key in TABLES and not is_table:
+                        self.conn.execute(f"DELETE FROM {key}")
+                self.conn.executemany(
+                    "INSERT INTO kv (key, value, is_table) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, is_table = excluded.is_table", kv)
+                for key, (rewrite, rows, _) in tables.items():
+                    columns = TABLES[key] + ("raw",)
+                    if rewrite:
+                        self.conn.execute(f"DELETE FROM {key}")
+                    self.conn.executemany(
+                        f"INSERT INTO {key} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            for key in removed:
+                self._kv.pop(key, None)
+                self._tables.pop(key, None)
+            for key, value, is_table in kv:
+                self._kv[key] = None if is_table else value
+            for key, (_, _, marker) in tables.items():
+                self._tables[key] = marker
+
+    def write_state(self, state):
+        self.commit(self.prepare(state))
+
+    @contextmanager
+    def transaction(self, default_factory=dict):
+        """Read-modify-write holding the writer lock; SQLite's own locking covers other processes."""
+        with self.write_lock:
+            state = self.read_state(default_factory)
+            yield state
+            self.write_state(state)
+
+    def state_size(self):
+        """Bytes of state data held in the tables (the raw log is not part of the hot state)."""
+        total = 0
+        for table in TABLES:
+            (size,) = self.conn.execute(f"SELECT COALESCE(SUM(LENGTH(raw)), 0) FROM {table}").fetchone()
+            total += size
+        (size,) = self.conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM kv").fetchone()
+        return total + size
+
+    def close(self):
+        self.conn.close()
+
+
+class SqliteLog:
+    """The raw input log as an indexed table; same read API as HistoryStore."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._local = threading.local()
+        (self._count,) = backend.conn.execute("SELECT COUNT(*) FROM log").fetchone()
+
+    def _reader(self):
+        # One connection per reading thread, so readers never wait on the writer's connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.backend.path)
+        return conn
+
+    def __len__(self):
+        return self._count
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        rows = [(e.get("input"), e.get("timestamp"), parse_timestamp(e.get("timestamp", 0)),
+                 int(e.get("weight", 2)), dumps(e)) for e in entries]
+        if not rows:
+            return
+        with self.backend.write_lock:
+            conn = self.backend.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT INTO log (input, timestamp, ts, weight, raw) VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._count += len(rows)
+
+    def _query(self, sql, params=()):
+        return [loads(raw) for (raw,) in self._reader().execute(sql, params)]
+
+    def last(self, n):
+        if n <= 0:
+            return []
+        return self._query("SELECT raw FROM (SELECT id, raw FROM log ORDER BY id DESC LIMIT ?) ORDER BY id", (n,))
+
+    def since(self, timestamp):
+        return self._query("SELECT raw FROM log INDEXED BY log_ts WHERE ts >= ? ORDER BY id", (parse_timestamp(timestamp),))
+
+    def with_weight(self, weight, limit=None):
+        if limit is None:
+            return self._query("SELECT raw FROM log WHERE weight = ? ORDER BY id", (weight,))
+        return self._query("SELECT raw FROM (SELECT id, raw FROM log WHERE weight = ? ORDER BY id DESC LIMIT ?) "
+                           "ORDER BY id", (weight, limit))
+
+    def slice(self, start, stop):
+        # The log is append-only, so row ids are positions + 1
+        return self._query("SELECT raw FROM log WHERE id > ? AND id <= ? ORDER BY id", (max(0, start), stop))
+
+    def weights(self):
+        return array("b", (w for (w,) in self._reader().execute("SELECT weight FROM log ORDER BY id")))
+
+    def timestamps(self):
+        return array("d", (ts for (ts,) in self._reader().execute("SELECT ts FROM log ORDER BY id")))
+
+    def inputs(self, start=0, stop=None):
+        """The input text of entries start..stop-1, without decoding the raw JSON."""
+        limit = -1 if stop is None else max(0, stop - start)
+        for (text,) in self._reader().execute("SELECT input FROM log ORDER BY id LIMIT ? OFFSET ?", (limit, start)):
+            yield text if text is not None else ""
+
+    def import_jsonl(self, path, batch_size=10000):
+        imported = 0
+        batch = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Skipping invalid line in {path}: {e}")
+                    continue
+                if len(batch) >= batch_size:
+                    self.append_many(batch)
+                    imported += len(batch)
+                    batch = []
+        self.append_many(batch)
+        return imported + len(batch)
+
+    def export_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as out:
+            for (raw,) in self._reader().execute("SELECT raw FROM log ORDER BY id"):
+                out.write(raw + "\n")
+        return self._count
+
+
+def open_backend(kind, state_file, log_dir=None, db_path=None, durable=True, state_format=None):
+    """Build the storage backend named in config (storage.backend): "json" (default) or "sqlite"."""
+    if kind in (None, "json"):
+        return JsonBackend(state_file, log_dir, durable, state_format)
+    if kind == "sqlite":
+        return SqliteBackend(db_path or os.path.splitext(state_file)[0] + ".db")
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,65 @@
+import heapq
+
+# Ordering policies for state["history"], best entry first
+RECENT_FIRST = "recent"      # newest timestamp wins, weight breaks ties (GroInstructor)
+PRIORITY_FIRST = "priority"  # highest #e weight wins, timestamp breaks ties (server.py)
+
+ORDERINGS = {
+    RECENT_FIRST: lambda entry: (entry.get("timestamp", ""), entry.get("weight", 2)),
+    PRIORITY_FIRST: lambda entry: (entry.get("weight", 2), entry.get("timestamp", "")),
+}
+
+
+class BoundedHistory:
+    """Keeps the best k history entries under an ordering policy.
+
+    Entries live in a min-heap whose root is the entry next in line for
+    eviction, so a push costs O(log k) and never rebuilds the list. Ties are
+    resolved like a stable sort: the earlier entry ranks higher and the later
+    one is evicted first.
+    """
+
+    def __init__(self, k=5, ordering=RECENT_FIRST, entries=()):
+        if ordering not in ORDERINGS:
+            raise ValueError(f"Unknown history ordering: {ordering}")
+        self.k = k
+        self.ordering = ordering
+        self.key = ORDERINGS[ordering]
+        self.heap = []
+        self._seq = 0
+        for entry in entries or ():
+            self.push(entry)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, entry):
+        self._seq += 1
+        item = (self.key(entry), -self._seq, entry)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def top(self, n=None):
+        """The best n entries (all of them if n is None), best first."""
+        if n is None or n >= len(self.heap):
+            return [item[2] for item in sorted(self.heap, reverse=True)]
+        return [item[2] for item in heapq.nlargest(n, self.heap)]
+
+    def store(self, state):
+        """Materialize the entries into state["history"] as the sorted list state.json expects."""
+        state["history"] = self.top()
+        return state
+
+    def merge(self, state, base, theirs):
+        """StateEngine merge hook: take in the entries another writer added to its history, then re-store."""
+        old, new = base.get("history"), theirs.get("history")
+        if not isinstance(new, list) or new == old:
+            return ()
+        seen = (old if isinstance(old, list) else []) + self.top()
+        for entry in new:
+            if isinstance(entry, dict) and entry not in seen:
+                self.push(entry)
+        self.store(state)
+        return ("history",)
@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Both are optional: orjson speeds up the JSON formats, msgpack enables the binary one
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def dumps(obj):
+    """Compact JSON text for machine-written records (log lines, SQLite raw columns)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # e.g. integers over 64 bits or non-string keys; the stdlib handles those
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def loads(data):
+    """Parse JSON text or UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonCodec:
+    """Compact JSON, the default for state written by the program."""
+
+    name = "json"
+
+    def encode(self, obj):
+        return dumps(obj).encode("utf-8")
+
+    def decode(self, data):
+        return loads(data)
+
+
+class PrettyCodec(JsonCodec):
+    """Indented JSON, the old state.json layout; for files people read and edit."""
+
+    name = "pretty"
+
+    def encode(self, obj):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+            except TypeError:
+                pass
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+
+class MsgpackCodec:
+    """Binary MessagePack: smallest and fastest, but not human-readable."""
+
+    name = "msgpack"
+
+    def encode(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), PrettyCodec(), MsgpackCodec())}
+
+
+def get_codec(name=None):
+    """The codec for a storage.format value; "msgpack" falls back to JSON when msgpack isn't installed."""
+    name = name or "json"
+    if name not in CODECS:
+        raise ValueError(f"Unknown storage format '{name}' (expected one of: {', '.join(CODECS)})")
+    if name == "msgpack" and msgpack is None:
+        print("Warning: msgpack is not installed—writing state as JSON instead.")
+        name = "json"
+    return CODECS[name]
+
+
+def detect(data):
+    """The codec that wrote data: JSON documents start with '{' or '[', anything else is msgpack."""
+    head = data.lstrip()[:1]
+    if head in (b"{", b"[") or data.startswith(b"\xef\xbb\xbf"):
+        return CODECS["json"]
+    if msgpack is None:
+        raise ValueError("Data is not JSON and msgpack is not installed to read it")
+    return CODECS["msgpack"]
+
+
+def decode(data):
+    """Parse a state document in any supported format."""
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    return detect(data).decode(data)
+
+
+def convert(source, target, name):
+    """Rewrite a state file in another format, e.g. a pretty copy of state.json for reading."""
+    with open(source, "rb") as f:
+        state = decode(f.read())
+    with open(target, "wb") as f:
+        f.write(get_codec(name).encode(state))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[3] not in CODECS:
+        print(f"Usage: python codec.py <state_file> <output_file> {'|'.join(CODECS)}")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2], sys.argv[3])
+    print(f"Wrote {sys.argv[2]} as {sys.argv[3]}")
@@ -0,0 +1,322 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src import metrics
+from src.storage.codec import dumps, loads
+from src.storage.journal import FileLock
+
+# One index record per entry: timestamp (epoch), segment number, byte offset, line length, weight
+RECORD = struct.Struct("<dIQIb")
+# Per-weight indexes hold record numbers into the main index
+POSITION = struct.Struct("<Q")
+
+
+def segment_name(segment):
+    return f"segment-{segment:06d}.jsonl"
+
+
+def parse_timestamp(value):
+    """Convert an ISO timestamp (or epoch number) to epoch seconds; 0.0 if unparseable."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class HistoryStore:
+    """Append-only history log split into rolling JSONL segments.
+
+    Every line written to a segment is one compact JSON entry, so the
+    segments concatenate back into a plain history_log.jsonl. Alongside the
+    segments sit fixed-width sidecar indexes (index.bin plus one
+    weight-<w>.bin per weight) so "last N", "since T" and "weight w" lookups
+    seek straight to the records they need instead of reading the whole log.
+
+    Appends (and the recovery of a crashed one) happen under a cross-process
+    writer lock, so several writers can share a store. readonly=True opens
+    it for reading only: it takes no lock, never changes a file, and sees the
+    entries indexed when it was opened, ignoring lines a writer has not
+    indexed yet.
+    """
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, readonly=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.readonly = readonly
+        self.index_file = os.path.join(directory, "index.bin")
+        if readonly:
+            self.lock = None
+            self._load()
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self.lock = FileLock(os.path.join(directory, "writer.lock"))
+            with self.lock:
+                self._recover()
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, segment_name(segment))
+
+    def weight_path(self, weight):
+        return os.path.join(self.directory, f"weight-{weight}.bin")
+
+    def segment_paths(self):
+        """All segment files, oldest first."""
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith("segment-") and n.endswith(".jsonl"))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _indexed(self):
+        """Index records whose lines are all in their segments; a crash can leave a torn one at the end."""
+        size = os.path.getsize(self.index_file) if os.path.exists(self.index_file) else 0
+        count = size // RECORD.size
+        while count:
+            record = self.record(count - 1)
+            path = self.segment_path(record[1])
+            if os.path.exists(path) and os.path.getsize(path) >= record[2] + record[3]:
+                break
+            count -= 1
+        return size, count
+
+    def _load(self):
+        _, self._count = self._indexed()
+        self._segment = self.record(self._count - 1)[1] if self._count else 0
+
+    def _recover(self):
+        """Drop whatever a crashed append left behind and pick up other writers' appends. Needs the lock."""
+        size, count = self._indexed()
+        if count * RECORD.size != size:
+            with open(self.index_file, "r+b") as f:
+                f.truncate(count * RECORD.size)
+        self._count = count
+        end = 0
+        self._segment = 0
+        if count:
+            _, self._segment, offset, length, _ = self.record(count - 1)
+            end = offset + length
+        # Likewise trim lines that reached a segment but never made it into the index
+        path = self.segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        for path in self.segment_paths():
+            if path > self.segment_path(self._segment):
+                os.remove(path)  # a segment started by the crashed batch
+
+    def __len__(self):
+        return self._count
+
+    def segment_extents(self):
+        """[(segment path, bytes)] holding the indexed entries, oldest first; unindexed tails are left out."""
+        extents = []
+        start = 0
+        while start < self._count:
+            segment = self.record(start)[1]
+            # The segment's last record is the one before the first record of any later segment
+            stop = self.position(segment + 1, 0)
+            _, _, offset, length, _ = self.record(stop - 1)
+            extents.append((self.segment_path(segment), offset + length))
+            start = stop
+        return extents
+
+    def record(self, position):
+        with open(self.index_file, "rb") as f:
+            f.seek(position * RECORD.size)
+            return RECORD.unpack(f.read(RECORD.size))
+
+    def position(self, segment, offset):
+        """How many entries lie before byte offset of segment (a LogFollower's position, say)."""
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self.record(mid)[1:3] < (segment, offset):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _records(self, start, stop):
+        if start >= stop:
+            return []
+        with open(self.index_file, "rb") as f:
+            f.seek(start * RECORD.size)
+            data = f.read((stop - start) * RECORD.size)
+        return list(RECORD.iter_unpack(data))
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """Append entries with one open of the segment and index files per batch."""
+        entries = list(entries)
+        if not entries:
+            return
+        if self.readonly:
+            raise ValueError(f"{self.directory} is open read-only")
+        with self.lock:
+            # Another writer may have appended since; carry on from the end of the store as it is now
+            self._recover()
+            self._append(entries)
+
+    def _append(self, entries):
+        segment_path = self.segment_path(self._segment)
+        offset = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+        records = []
+        by_weight = {}
+        written = 0
+        seg = open(segment_path, "ab")
+        try:
+            for entry in entries:
+                if offset >= self.segment_bytes:
+                    seg.close()
+                    self._segment += 1
+                    offset = 0
+                    seg = open(self.segment_path(self._segment), "ab")
+                line = (dumps(entry) + "\n").encode("utf-8")
+                seg.write(line)
+                written += len(line)
+                weight = int(entry.get("weight", 2))
+                records.append(RECORD.pack(parse_timestamp(entry.get("timestamp", 0)), self._segment,
+                                           offset, len(line), weight))
+                by_weight.setdefault(weight, []).append(POSITION.pack(self._count + len(records) - 1))
+                offset += len(line)
+        finally:
+            seg.close()
+        # Segments are written before the index, so a crash can only leave unindexed lines behind
+        with open(self.index_file, "ab") as f:
+            f.write(b"".join(records))
+        for weight, positions in by_weight.items():
+            with open(self.weight_path(weight), "ab") as f:
+                f.write(b"".join(positions))
+        self._count += len(records)
+        metrics.count("gro_bytes_written_total", written, file="log")
+        metrics.count("gro_entries_processed_total", len(records), stage="log.append")
+
+    def read(self, records):
+        """Load the entries behind a list of index records, opening each segment once."""
+        entries = []
+        handles = {}
+        try:
+            for _, segment, offset, length, _ in records:
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self.segment_path(segment), "rb")
+                f.seek(offset)
+                entries.append(loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+        return entries
+
+    def slice(self, start, stop):
+        """Entries start..stop-1 in log order."""
+        return self.read(self._records(max(0, start), min(stop, self._count)))
+
+    def last(self, n):
+        """The newest n entries, oldest first."""
+        return self.read(self._records(max(0, self._count - n), self._count))
+
+    def since(self, timestamp):
+        """Entries logged at or after timestamp (ISO string or epoch), found by binary search."""
+        target = parse_timestamp(timestamp)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.read(self._records(lo, self._count))
+
+    def with_weight(self, weight, limit=None):
+        """Entries tagged #e<weight>, oldest first; limit keeps only the newest ones."""
+        path = self.weight_path(weight)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            if limit is not None:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - limit * POSITION.size))
+            data = f.read()
+        with open(self.index_file, "rb") as f:
+            records = []
+            for (position,) in POSITION.iter_unpack(data):
+                f.seek(position * RECORD.size)
+                records.append(RECORD.unpack(f.read(RECORD.size)))
+        return self.read(records)
+
+    def _column(self, offset, itemsize):
+        """One fixed-width field of every index record, gathered with strided copies instead of unpacking."""
+        if not self._count:
+            return bytearray()
+        with open(self.index_file, "rb") as f:
+            with mmap.mmap(f.fileno(), self._count * RECORD.size, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    column = bytearray(self._count * itemsize)
+                    for byte in range(itemsize):
+                        column[byte::itemsize] = view[offset + byte::RECORD.size]
+                finally:
+                    view.release()
+        return column
+
+    def weights(self):
+        """Every entry's weight as an array('b'), read from the index without touching the segments."""
+        return array("b", bytes(self._column(RECORD.size - 1, 1)))
+
+    def timestamps(self):
+        """Every entry's timestamp as an array('d') of epoch seconds, read from the index."""
+        column = array("d", bytes(self._column(0, 8)))
+        if sys.byteorder != "little":
+            column.byteswap()
+        return column
+
+    def import_jsonl(self, path, batch_size=10000):
+        """Append every entry of a history_log.jsonl file; returns the number imported."""
+        imported = 0
+        batch = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Skipping invalid line in {path}: {e}")
+                    continue
+                if len(batch) >= batch_size:
+                    self.append_many(batch)
+                    imported += len(batch)
+                    batch = []
+        self.append_many(batch)
+        return imported + len(batch)
+
+    def export_jsonl(self, path):
+        """Write the whole store back out as a single history_log.jsonl file."""
+        with open(path, "wb") as out:
+            for segment, size in self.segment_extents():
+                with open(segment, "rb") as f:
+                    while size:
+                        chunk = f.read(min(size, 1024 * 1024))
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        size -= len(chunk)
+        return self._count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python history_store.py import|export <store_dir> <history_log.jsonl>")
+        sys.exit(1)
+    store = HistoryStore(sys.argv[2], readonly=sys.argv[1] == "export")
+    if sys.argv[1] == "import":
+        print(f"Imported {store.import_jsonl(sys.argv[3])} entries into {sys.argv[2]}")
+    else:
+        print(f"Exported {store.export_jsonl(sys.argv[3])} entries to {sys.argv[3]}")
@@ -0,0 +1,272 @@
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+from array import array
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src import metrics
+from src.storage.backends import atomic_write
+from src.storage.codec import dumps, loads
+
+TOKEN = re.compile(r"#?\w+")
+
+
+def tokenize(text):
+    """Lower-cased words, with #e1–#e5 and #DT tags kept as tokens of their own."""
+    return TOKEN.findall(text.lower())
+
+
+def _from_bytes(typecode, data):
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder != "little" and column.itemsize > 1:
+        column.byteswap()  # the files are little-endian, like the history store index
+    return column
+
+
+def _to_bytes(column):
+    if sys.byteorder != "little" and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+class Segment:
+    """One immutable run of postings: a term dictionary and a memory-mapped postings file.
+
+    A term's postings are its doc ids (uint32, ascending) followed by its
+    term frequencies (uint8), stored at the offset the dictionary gives.
+    """
+
+    def __init__(self, directory, name, docs):
+        self.name = name
+        self.docs = docs
+        self.post_file = os.path.join(directory, name + ".post")
+        self.terms_file = os.path.join(directory, name + ".terms")
+        with open(self.terms_file, "rb") as f:
+            self.terms = loads(f.read())
+        self._file = open(self.post_file, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @classmethod
+    def write(cls, directory, name, postings):
+        """Write {term: (doc ids, term frequencies)} as the files of segment name."""
+        terms = {}
+        offset = 0
+        with open(os.path.join(directory, name + ".post"), "wb") as f:
+            for term in sorted(postings):
+                ids, tfs = postings[term]
+                terms[term] = [offset, len(ids)]
+                f.write(_to_bytes(ids))
+                f.write(bytes(tfs))
+                offset += 5 * len(ids)
+        with open(os.path.join(directory, name + ".terms"), "w", encoding="utf-8") as f:
+            f.write(dumps(terms))
+
+    def df(self, term):
+        posting = self.terms.get(term)
+        return posting[1] if posting else 0
+
+    def postings(self, term, limit=None):
+        """(doc ids, term frequencies) of a term, only the newest limit of them if given."""
+        posting = self.terms.get(term)
+        if not posting:
+            return array("I"), b""
+        offset, count = posting
+        start = 0 if limit is None else max(0, count - limit)
+        ids = _from_bytes("I", self.mm[offset + 4 * start:offset + 4 * count])
+        tfs = self.mm[offset + 4 * count + start:offset + 5 * count]
+        return ids, tfs
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self._file.close()
+
+    def remove(self):
+        self.close()
+        for path in (self.post_file, self.terms_file):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class InvertedIndex:
+    """Incremental inverted index on disk, the base of RelevanceIndex and SearchIndex.
+
+    New documents go into an in-memory delta (a dict of posting arrays), so
+    indexing one costs O(its tokens). Every flush_docs documents, and on
+    close(), the delta is written out as an immutable Segment whose
+    postings are memory-mapped; segments are merged pairwise whenever the
+    older of the last two is no bigger than the newer, which keeps their
+    number logarithmic. Per-document values live in fixed-width column
+    files (COLUMNS: name -> array typecode), loaded whole on open.
+    meta.json, replaced atomically after each flush, records what the
+    segments and columns cover; subclasses keep their own positions in it
+    and re-index whatever came after the last flush when they open.
+    """
+    COLUMNS = {"lengths": "H", "refs": "Q"}
+    NAME = "index"
+
+    def __init__(self, directory, flush_docs=10000, k1=1.2, b=0.75):
+        self.directory = directory
+        self.flush_docs = flush_docs
+        self.k1 = k1
+        self.b = b
+        self.meta_file = os.path.join(directory, "meta.json")
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def default_meta(self):
+        """Subclasses add their own positions (how far each source is indexed) to this."""
+        return {"docs": 0, "total_length": 0, "next_segment": 1, "segments": []}
+
+    def column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _load(self):
+        self.segments = []
+        try:
+            with open(self.meta_file, "rb") as f:
+                self.meta = loads(f.read())
+            for s in self.meta["segments"]:
+                self.segments.append(Segment(self.directory, s["name"], s["docs"]))
+            docs = self.meta["docs"]
+            self.columns = {}
+            for name, typecode in self.COLUMNS.items():
+                with open(self.column_path(name), "rb") as f:
+                    data = f.read(docs * array(typecode).itemsize)
+                self.columns[name] = _from_bytes(typecode, data)
+                if len(self.columns[name]) != docs:
+                    raise ValueError(f"{name}.bin is shorter than meta.json says")
+        except FileNotFoundError:
+            self._reset()
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Rebuilding {self.NAME} in {self.directory}: {e}")
+            self._reset()
+        # Columns of documents flushed after the last meta.json are dropped and re-indexed
+        for name in self.COLUMNS:
+            path = self.column_path(name)
+            size = self.meta["docs"] * self.columns[name].itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        self.delta = {}
+        self.total_length = self.meta["total_length"]
+
+    def _reset(self):
+        for segment in self.segments:
+            segment.close()
+        # Only the index's own files go; copies of source documents kept alongside are re-indexed from the start
+        for name in os.listdir(self.directory):
+            if name.endswith((".post", ".terms", ".bin")):
+                os.remove(os.path.join(self.directory, name))
+        self.meta = self.default_meta()
+        self.segments = []
+        self.columns = {name: array(typecode) for name, typecode in self.COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.columns["lengths"])
+
+    def _add(self, text, **values):
+        """Index text as a new document with the given column values; returns its doc id."""
+        doc = len(self.columns["lengths"])
+        counts = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        delta = self.delta
+        for term, tf in counts.items():
+            postings = delta.get(term)
+            if postings is None:
+                postings = delta[term] = (array("I"), array("B"))
+            postings[0].append(doc)
+            postings[1].append(min(tf, 255))
+        self.columns["lengths"].append(min(len(tokens), 65535))
+        for name, value in values.items():
+            self.columns[name].append(value)
+        self.total_length += len(tokens)
+        return doc
+
+    def _maybe_flush(self):
+        if len(self) - self.meta["docs"] >= self.flush_docs:
+            self.flush()
+
+    def flush(self):
+        """Write the in-memory delta out as a segment and merge segments down."""
+        with self.lock:
+            docs = self.meta["docs"]
+            if len(self) == docs:
+                return
+            with metrics.span(f"{self.NAME}.flush"):
+                self.segments.append(self._write_segment(self.delta, len(self) - docs))
+                self.delta = {}
+                for name, column in self.columns.items():
+                    with open(self.column_path(name), "ab") as f:
+                        f.write(_to_bytes(column[docs:]))
+                obsolete = []
+                while len(self.segments) >= 2 and self.segments[-2].docs <= self.segments[-1].docs:
+                    older, newer = self.segments[-2:]
+                    merged = {}
+                    for term in set(older.terms) | set(newer.terms):
+                        ids, tfs = older.postings(term)
+                        newer_ids, newer_tfs = newer.postings(term)
+                        ids.extend(newer_ids)
+                        merged[term] = (ids, bytes(tfs) + bytes(newer_tfs))
+                    self.segments[-2:] = [self._write_segment(merged, older.docs + newer.docs)]
+                    obsolete += [older, newer]
+                self.meta.update(docs=len(self), total_length=self.total_length,
+                                 segments=[{"name": s.name, "docs": s.docs} for s in self.segments])
+                self._write_meta()
+                for segment in obsolete:
+                    if segment not in self.segments:
+                        segment.remove()
+
+    def _write_meta(self):
+        # Derived data that is rebuilt if it goes missing, so no fsync
+        atomic_write(self.meta_file, dumps(self.meta), fsync=False)
+
+    def _write_segment(self, postings, docs):
+        name = f"seg-{self.meta['next_segment']:06d}"
+        self.meta["next_segment"] += 1
+        Segment.write(self.directory, name, postings)
+        return Segment(self.directory, name, docs)
+
+    def postings(self, term, limit=None):
+        """Each part's (doc ids, term frequencies) for term, newest part first, and the term's df.
+
+        With limit, only the newest limit postings are returned across all parts.
+        """
+        parts = []
+        budget = limit
+        delta = self.delta.get(term)
+        df = len(delta[0]) if delta else 0
+        if delta:
+            parts.append(delta if budget is None else (delta[0][-budget:], delta[1][-budget:]))
+            if budget is not None:
+                budget -= len(parts[-1][0])
+        for segment in reversed(self.segments):
+            count = segment.df(term)
+            df += count
+            if count and (budget is None or budget > 0):
+                parts.append(segment.postings(term, budget))
+                if budget is not None:
+                    budget -= len(parts[-1][0])
+        return parts, df
+
+    def idf(self, df):
+        n = len(self)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_UNREAD = object()
+
+# Test hook: called with the name of each commit stage so crashes can be injected between them
+crash_hook = None
+
+
+def _stage(name):
+    if crash_hook is not None:
+        crash_hook(name)
+
+
+def fsync_dir(directory):
+    """Persist renames in directory; directories can't be opened on Windows, so skip there."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class FileLock:
+    """Exclusive lock shared across threads and processes (flock on POSIX, msvcrt on Windows).
+
+    Re-entrant within a thread, so a transaction can call commit() while holding it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    while True:
+                        try:
+                            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class Journal:
+    """Write-ahead journal guarding every commit of a state file.
+
+    A commit writes the new document to ``<state>.tmp``, records its SHA-256
+    in ``<state>.journal``, renames the temp file over the state file and
+    then empties the journal. Whatever point a crash interrupts, recover()
+    either rolls the commit forward (journaled and the temp file intact) or
+    back (the temp file is discarded), so readers see the old or the new
+    state and never a truncated one. All of it happens under a
+    cross-process lock. With durable=False the fsyncs are skipped: commits
+    are still atomic, but the last ones may be lost on power failure.
+
+    A commit that finds the file changed by another process since this
+    journal last read or wrote it hands both versions to its merge hook, if
+    it was given one, and writes what that returns. Without a hook, the
+    other process's changes are overwritten, with a warning.
+    """
+
+    def __init__(self, state_file, durable=True):
+        self.state_file = state_file
+        self.durable = durable
+        self.tmp_file = state_file + ".tmp"
+        self.journal_file = state_file + ".journal"
+        self.lock = FileLock(state_file + ".lock")
+        self._seen = _UNREAD
+        self._base = None  # the document as last read or committed, for merges
+
+    def _stat(self):
+        try:
+            st = os.stat(self.state_file)
+        except FileNotFoundError:
+            return None
+        # Every commit renames a new file into place, so the inode changes even when size and mtime don't
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _write(self, path, data, mode="wb"):
+        with open(path, mode) as f:
+            f.write(data)
+            f.flush()
+            if self.durable:
+                os.fsync(f.fileno())
+
+    def recover(self):
+        """Finish or undo a commit interrupted by a crash. Call with the lock held."""
+        record = None
+        try:
+            with open(self.journal_file, "rb") as f:
+                data = f.read()
+            if data.strip():
+                record = json.loads(data.splitlines()[0])
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            record = None  # a half-written journal entry means the rename never happened
+        if record is not None and os.path.exists(self.tmp_file):
+            with open(self.tmp_file, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() == record["sha256"]:
+                    os.replace(self.tmp_file, self.state_file)
+                    if self.durable:
+                        fsync_dir(os.path.dirname(os.path.abspath(self.state_file)))
+                    print(f"Recovered an interrupted commit of {self.state_file}")
+        if os.path.exists(self.tmp_file):
+            os.remove(self.tmp_file)
+        if record is not None or os.path.exists(self.journal_file) and os.path.getsize(self.journal_file):
+            open(self.journal_file, "wb").close()
+
+    def read(self):
+        """The committed document as bytes, or None if there is none yet."""
+        with self.lock:
+            self.recover()
+            try:
+                with open(self.state_file, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = None
+            self._seen = self._stat()
+            self._base = data
+            return data
+
+    def commit(self, data, merge=None):
+        """Atomically replace the state file with data.
+
+        merge(base, theirs), if given, is called when another process changed
+        the file since it was last read or committed here: base is the
+        document as it was then, theirs as it is now, and the bytes it
+        returns are committed instead (None commits data as it is).
+        """
+        encoded = data.encode("utf-8") if isinstance(data, str) else data
+        with self.lock:
+            self.recover()
+            if self._seen is not _UNREAD and self._stat() != self._seen:
+                merged = None
+                if merge is not None:
+                    try:
+                        with open(self.state_file, "rb") as f:
+                            theirs = f.read()
+                    except FileNotFoundError:
+                        theirs = b""
+                    merged = merge(self._base, theirs)
+                if merged is not None:
+                    encoded = merged.encode("utf-8") if isinstance(merged, str) else merged
+                else:
+                    print(f"Warning: {self.state_file} was changed by another writer since it was read; overwriting.")
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+            self._write(self.tmp_file, encoded)
+            _stage("tmp_written")
+            record = {"sha256": hashlib.sha256(encoded).hexdigest(), "time": datetime.now().isoformat()}
+            self._write(self.journal_file, (json.dumps(record) + "\n").encode("utf-8"))
+            _stage("journaled")
+            os.replace(self.tmp_file, self.state_file)
+            if self.durable:
+                fsync_dir(os.path.dirname(os.path.abspath(self.state_file)))
+            _stage("renamed")
+            # Once the rename is durable the journal entry is spent; emptying it needs no fsync
+            open(self.journal_file, "wb").close()
+            self._seen = self._stat()
+            self._base = encoded
@@ -0,0 +1,230 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.backends import atomic_write
+from src.storage.codec import dumps, loads
+from src.storage.history_store import segment_name
+
+# inotify event mask: anything that can mean "new lines" or "the file was rotated"
+IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE, IN_DELETE_SELF, IN_MOVE_SELF = \
+    0x2, 0x8, 0x80, 0x100, 0x400, 0x800
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+READ_CHUNK = 1024 * 1024
+
+
+class Inotify:
+    """Minimal Linux inotify watch on one directory, via libc (the stdlib has no binding)."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout):
+        """Block until something changes in the directory or timeout seconds pass."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+        return bool(ready)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogFollower:
+    """``tail -f`` for the history log, dispatching new entries to handlers.
+
+    path is a HistoryStore directory (segments are followed in order, moving
+    to the next one once it appears) or a single .jsonl file (rotation by
+    rename or truncation is detected, and the old file is drained first).
+    Only complete lines are consumed. After every dispatched batch the
+    position is checkpointed, so a restarted follower resumes where it
+    stopped instead of rereading the log; delivery is at-least-once.
+    Changes are picked up through inotify where available, otherwise by
+    polling every poll_interval seconds.
+    """
+
+    def __init__(self, path, checkpoint_file=None, poll_interval=0.5, from_start=True):
+        self.path = path
+        self.is_store = os.path.isdir(path)
+        self.checkpoint_file = checkpoint_file or (os.path.join(path, "follower.checkpoint.json") if self.is_store
+                                                   else path + ".checkpoint.json")
+        self.poll_interval = poll_interval
+        self.handlers = []
+        self._file = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.segment, self.offset, self.inode = 0, 0, None
+        if not self._load_checkpoint() and not from_start:
+            self._seek_end()
+
+    def add_handler(self, handler):
+        """Register handler(entries); it is called with each batch of new entries, in log order."""
+        self.handlers.append(handler)
+        return handler
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, "rb") as f:
+                data = loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return False
+        self.segment, self.offset, self.inode = data.get("segment", 0), data.get("offset", 0), data.get("inode")
+        return True
+
+    def _save_checkpoint(self):
+        atomic_write(self.checkpoint_file, dumps({"segment": self.segment, "offset": self.offset, "inode": self.inode}),
+                     fsync=False)
+
+    def _seek_end(self):
+        if self.is_store:
+            while os.path.exists(self._segment_path(self.segment + 1)):
+                self.segment += 1
+            path = self._segment_path(self.segment)
+        else:
+            path = self.path
+        if os.path.exists(path):
+            self.offset = os.path.getsize(path)
+            self.inode = os.stat(path).st_ino
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, segment_name(segment))
+
+    def _read_lines(self, f):
+        """Entries from f's position up to its last complete line; advances self.offset past them."""
+        entries = []
+        f.seek(self.offset)
+        tail = b""
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                self.offset += len(line) + 1
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(loads(line))
+                except ValueError as e:
+                    print(f"Skipping invalid log line at {self.offset - len(line) - 1}: {e}")
+        return entries
+
+    def _poll_store(self):
+        entries = []
+        while True:
+            # Check for the next segment first: once it exists the writer has finished with this one
+            has_next = os.path.exists(self._segment_path(self.segment + 1))
+            try:
+                with open(self._segment_path(self.segment), "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size < self.offset:
+                        self.offset = size  # the store trimmed a tail left by a crash
+                    entries += self._read_lines(f)
+            except FileNotFoundError:
+                pass
+            if not has_next:
+                return entries
+            self.segment, self.offset = self.segment + 1, 0
+
+    def _poll_file(self):
+        entries = []
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if self._file is None:
+            if st is None:
+                return entries
+            self._file = open(self.path, "rb")
+            if self.inode is not None and self.inode != os.fstat(self._file.fileno()).st_ino:
+                self.offset = 0  # rotated while we weren't running
+            self.inode = os.fstat(self._file.fileno()).st_ino
+        entries += self._read_lines(self._file)
+        if st is not None and st.st_ino != self.inode:
+            # Rotated by rename: the old file is drained above, continue from the top of the new one
+            self._file.close()
+            self._file = None
+            self.offset, self.inode = 0, None
+            entries += self._poll_file()
+        elif st is not None and st.st_size < self.offset:
+            # Truncated in place (copytruncate)
+            self.offset = 0
+            entries += self._read_lines(self._file)
+        return entries
+
+    def poll(self):
+        """Dispatch everything appended since the last poll; returns how many entries were dispatched."""
+        entries = self._poll_store() if self.is_store else self._poll_file()
+        if not entries:
+            return 0
+        for handler in self.handlers:
+            try:
+                handler(entries)
+            except Exception as e:
+                print(f"Error in log handler {getattr(handler, '__name__', handler)}: {e}")
+        self._save_checkpoint()
+        return len(entries)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-follower", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop following; entries already in the log are dispatched first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.poll()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        watch = None
+        try:
+            watch = Inotify(self.path if self.is_store else os.path.dirname(os.path.abspath(self.path)))
+        except (OSError, AttributeError):
+            pass  # not Linux (or no inotify): fall back to polling
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Error following {self.path}: {e}")
+                if watch is not None:
+                    watch.wait(self.poll_interval)
+                else:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            if watch is not None:
+                watch.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python log_follower.py <history_log dir | history_log.jsonl> [--from-end]")
+        sys.exit(1)
+    # Print new entries as JSON lines, e.g. to pipe into SummarizerAgent.py --stream
+    follower = LogFollower(sys.argv[1], from_start="--from-end" not in sys.argv[2:])
+    follower.add_handler(lambda entries: print("\n".join(dumps(e) for e in entries), flush=True))
+    follower.start()
+    try:
+        follower._thread.join()
+    except KeyboardInterrupt:
+        follower.stop()
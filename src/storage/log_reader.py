@@ -0,0 +1,131 @@
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.codec import loads
+from src.storage.history_store import HistoryStore, parse_timestamp
+
+
+class LogReader:
+    """Read-only, memory-mapped scan of a JSONL history log.
+
+    path is a history_log.jsonl file or a HistoryStore directory (its
+    segments are read in order). Nothing is loaded into RAM up front: lines()
+    yields memoryview slices of the mapping, and field()/project() decode just
+    the requested top-level fields of each line, never building a dict per
+    record. weights() and timestamps() project whole columns for
+    aggregations; for a store they come from its index without reading the
+    segments at all. A store is only read, never recovered: entries a writer
+    has not indexed yet are left out. Views from lines() are only valid
+    until close().
+    """
+
+    def __init__(self, path):
+        self.store = None
+        if os.path.isdir(path):
+            # Columns of a segmented store come straight from its fixed-width index
+            self.store = HistoryStore(path, readonly=True)
+            extents = self.store.segment_extents()
+        else:
+            extents = [(path, os.path.getsize(path))]
+        self.paths = [p for p, _ in extents]
+        self._maps = []
+        for p, size in extents:
+            if size == 0:
+                continue  # an empty file can't be mapped
+            with open(p, "rb") as f:
+                self._maps.append(mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for mm in self._maps:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a caller still holds a line view; the mapping goes when it does
+        self._maps = []
+
+    def _spans(self):
+        for mm in self._maps:
+            pos, size = 0, len(mm)
+            while pos < size:
+                end = mm.find(b"\n", pos)
+                if end < 0:
+                    end = size
+                # Only lines that start with whitespace are copied to check for blank ones
+                if end > pos and (mm[pos] not in b" \t\r" or not mm[pos:end].isspace()):
+                    yield mm, pos, end
+                pos = end + 1
+
+    def lines(self):
+        """Each non-empty line as a zero-copy memoryview (without the newline)."""
+        for mm, start, end in self._spans():
+            yield memoryview(mm)[start:end]
+
+    __iter__ = lines
+
+    def records(self):
+        """Each line fully parsed, for callers that really need the whole entry."""
+        for mm, start, end in self._spans():
+            yield loads(mm[start:end])
+
+    def field(self, name, default=None):
+        """The value of one top-level field on every line."""
+        key = _pattern(name)
+        search = key.search
+        for mm, start, end in self._spans():
+            match = search(mm, start, end)
+            # Plain integers (weights) and unescaped strings (timestamps) skip the general path
+            if match is not None and match.lastindex == 2:
+                yield int(match.group(2))
+            elif match is not None and match.lastindex == 1 and mm.find(b"\\", *match.span(1)) < 0:
+                yield match.group(1).decode("utf-8")
+            else:
+                yield _value(mm, start, end, match, name, default)
+
+    def project(self, *names, default=None):
+        """Tuples of the named top-level fields, one per line."""
+        keys = [(_pattern(n), n) for n in names]
+        for mm, start, end in self._spans():
+            yield tuple(_value(mm, start, end, key.search(mm, start, end), n, default) for key, n in keys)
+
+    def weights(self, default=2):
+        """Every entry's weight as a signed-byte array (entries without one count as #e<default>)."""
+        if self.store is not None:
+            return self.store.weights()
+        return array("b", map(int, self.field("weight", default)))
+
+    def timestamps(self):
+        """Every entry's timestamp as epoch seconds (0.0 where missing or unparseable)."""
+        if self.store is not None:
+            return self.store.timestamps()
+        return array("d", map(parse_timestamp, self.field("timestamp", 0.0)))
+
+
+def _pattern(name):
+    """Regex for '"name": <scalar>'. Inside a JSON string every quote is escaped, so this only matches keys."""
+    return re.compile(rb'"' + re.escape(name.encode("utf-8")) + rb'"[ \t]*:[ \t]*'
+                      rb'(?:"([^"\\]*(?:\\.[^"\\]*)*)"|(-?\d+)(?![\d.eE])|(true|false|null|-?[\d.eE+-]+))')
+
+
+def _value(mm, start, end, match, name, default):
+    if match is None:
+        if mm.find(b'"' + name.encode("utf-8") + b'"', start, end) < 0:
+            return default
+        # A nested value (or something unusual): parse the whole line once
+        return loads(mm[start:end]).get(name, default)
+    text, integer, literal = match.groups()
+    if integer is not None:
+        return int(integer)
+    if text is not None:
+        return json.loads(b'"' + text + b'"') if b"\\" in text else text.decode("utf-8")
+    return json.loads(literal)
@@ -0,0 +1,78 @@
+import atexit
+import queue
+import threading
+
+from src import metrics
+
+
+class MarkdownWriter:
+    """Background writer for the e3_summaries.md captures.
+
+    ``submit(fn, *args)`` queues a capture and returns at once; a worker
+    thread runs queued captures in submission order, coalescing everything
+    waiting in the queue into one batch so the file is written once per
+    batch (see SummariesIndex.batch). The queue is bounded, so a caller
+    outrunning the disk blocks instead of growing memory. ``join()`` waits
+    until everything submitted so far is on disk, and ``close()``
+    (registered with atexit) drains the queue before stopping.
+    """
+
+    def __init__(self, summaries_index, maxsize=1000, max_batch=500):
+        self.summaries_index = summaries_index
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize)
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="markdown-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def submit(self, capture, *args):
+        if self._closed:
+            capture(*args)  # nothing left to hand it to: write it inline
+            return
+        self.queue.put((capture, args))
+
+    def busy(self):
+        """True while captures are queued or being written (a task is done once its batch is on disk)."""
+        with self.queue.mutex:
+            return self.queue.unfinished_tasks > 0
+
+    def join(self):
+        """Block until every capture submitted so far has been written."""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            jobs = [self.queue.get()]
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with metrics.span("markdown.write"), self.summaries_index.batch():
+                    for job in jobs:
+                        if job is None:
+                            continue
+                        capture, args = job
+                        try:
+                            capture(*args)
+                        except Exception as e:
+                            print(f"Error capturing to {self.summaries_index.summaries_file}: {e}")
+            except Exception as e:
+                print(f"Error writing {self.summaries_index.summaries_file}: {e}")
+            finally:
+                metrics.count("gro_entries_processed_total", len(jobs), stage="markdown.write")
+                for _ in jobs:
+                    self.queue.task_done()
+            if None in jobs:
+                return
+
+    def close(self):
+        """Write everything still queued, then stop the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(None)
+        self._worker.join()
+        atexit.unregister(self.close)
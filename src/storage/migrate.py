@@ -0,0 +1,39 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.backends import JsonBackend, SqliteBackend
+from src.storage.history_store import HistoryStore
+
+
+def migrate_to_sqlite(state_file, log_path, db_path):
+    """Copy state.json and the history log (a .jsonl file or a segmented store) into a new SQLite database."""
+    target = SqliteBackend(db_path)
+    try:
+        if len(target.log) or target.conn.execute("SELECT 1 FROM kv LIMIT 1").fetchone():
+            raise ValueError(f"{db_path} already holds data; refusing to migrate into it twice.")
+        state = JsonBackend(state_file).read_state(dict)
+        target.write_state(state)
+        if os.path.isdir(log_path):
+            store = HistoryStore(log_path, readonly=True)
+            entries = len(store)
+            for start in range(0, entries, 10000):
+                target.log.append_many(store.slice(start, start + 10000))
+        elif os.path.exists(log_path):
+            entries = target.log.import_jsonl(log_path)
+        else:
+            entries = 0
+        return len(state), entries
+    finally:
+        target.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python migrate.py <state.json> <history_log.jsonl | history_log dir> <state.db>")
+        sys.exit(1)
+    try:
+        keys, entries = migrate_to_sqlite(*sys.argv[1:])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Migrated {keys} state keys and {entries} log entries into {sys.argv[3]}")
@@ -0,0 +1,188 @@
+import heapq
+import math
+import os
+import sys
+import time
+from operator import itemgetter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.codec import dumps, loads
+from src.storage.history_store import parse_timestamp
+from src.storage.inverted_index import InvertedIndex, tokenize
+
+# Where a document came from: its ref is a log position or a byte offset into summaries.jsonl
+LOG, SUMMARY = 0, 1
+
+
+class RelevanceIndex(InvertedIndex):
+    """Incremental BM25 index over the history log and the chat summaries.
+
+    Log entries live in the log and are read back by position; summaries
+    are copied into summaries.jsonl here, so they outlive compaction of
+    state["chat_summaries"]. Anything logged after the last flush is
+    re-indexed from those two sources on open (see InvertedIndex for the
+    delta, segments and columns).
+
+    Scores are BM25 times a weight boost (1 + weight_boost * #e weight) and
+    a recency boost that halves every half_life_days. Only the newest
+    max_postings postings of each term are scored, which bounds a query on
+    a million-entry log; terms that common carry little IDF anyway.
+    """
+    COLUMNS = dict(InvertedIndex.COLUMNS, weights="b", times="d")
+    NAME = "relevance"
+
+    def __init__(self, directory, log, flush_docs=10000, max_postings=2000, k1=1.2, b=0.75, weight_boost=0.1,
+                 recency_boost=1.0, half_life_days=7.0):
+        self.log = log
+        self.max_postings = max_postings
+        self.weight_boost = weight_boost
+        self.recency_boost = recency_boost
+        self.decay = math.log(2) / (half_life_days * 86400)
+        self.summaries_file = os.path.join(directory, "summaries.jsonl")
+        self.created = not os.path.exists(os.path.join(directory, "meta.json")) and \
+            not os.path.exists(self.summaries_file)
+        super().__init__(directory, flush_docs, k1, b)
+        self.max_weight = max(self.columns["weights"], default=0)
+        self.catch_up()
+
+    def default_meta(self):
+        return dict(super().default_meta(), log=0, summaries=0)
+
+    def _add_entry(self, entry):
+        try:
+            weight = int(entry.get("weight", 2))
+        except (TypeError, ValueError):
+            weight = 2
+        weight = max(-128, min(weight, 127))
+        self._add(str(entry.get("input", "")), refs=self.meta["log"] << 1 | LOG, weights=weight,
+                  times=parse_timestamp(entry.get("timestamp", 0)))
+        self.max_weight = max(self.max_weight, weight)
+        self.meta["log"] += 1
+
+    def _add_summary(self, summary, offset):
+        self._add(str(summary.get("summary", "")), refs=offset << 1 | SUMMARY, weights=0,
+                  times=parse_timestamp(summary.get("date", 0)))
+
+    def add_entries(self, entries, start):
+        """Index log entries that were just appended at positions start, start+1, ..."""
+        with self.lock:
+            if start != self.meta["log"]:
+                self.catch_up()  # something was logged without us; read it back from the log
+                return
+            for entry in entries:
+                self._add_entry(entry)
+            self._maybe_flush()
+
+    def add_summaries(self, summaries):
+        """Copy chat summaries into summaries.jsonl and index them."""
+        summaries = list(summaries)
+        if not summaries:
+            return
+        with self.lock:
+            self.catch_up()
+            lines = [(dumps(s) + "\n").encode("utf-8") for s in summaries]
+            with open(self.summaries_file, "ab") as f:
+                offset = f.tell()
+                f.write(b"".join(lines))
+            for summary, line in zip(summaries, lines):
+                self._add_summary(summary, offset)
+                offset += len(line)
+            self.meta["summaries"] = offset
+            self._maybe_flush()
+
+    def catch_up(self, batch_size=10000):
+        """Index whatever the log and summaries.jsonl hold beyond what is indexed already."""
+        with self.lock:
+            for start in range(self.meta["log"], len(self.log), batch_size):
+                for entry in self.log.slice(start, start + batch_size):
+                    self._add_entry(entry)
+                self._maybe_flush()
+            if os.path.exists(self.summaries_file) and os.path.getsize(self.summaries_file) > self.meta["summaries"]:
+                with open(self.summaries_file, "rb") as f:
+                    f.seek(self.meta["summaries"])
+                    offset = self.meta["summaries"]
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        if line.strip():
+                            self._add_summary(loads(line), offset)
+                        offset += len(line)
+                if os.path.getsize(self.summaries_file) > offset:
+                    # A torn write at the end: drop it so the next append starts on a fresh line
+                    with open(self.summaries_file, "r+b") as f:
+                        f.truncate(offset)
+                self.meta["summaries"] = offset
+            self._maybe_flush()
+
+    def search(self, query, k=3, exclude=(), now=None):
+        """The k best matches for query as (score, source, document) tuples, best first.
+
+        source is "log" (document is the log entry) or "summary" (the chat
+        summary). Documents whose text is in exclude, and repeats of a text
+        already returned, are skipped.
+        """
+        terms = set(tokenize(query))
+        now = time.time() if now is None else now
+        with self.lock:
+            n = len(self)
+            if not n or not terms:
+                return []
+            lengths = self.columns["lengths"]
+            k1, b = self.k1, self.b
+            norm = k1 * b / (self.total_length / n or 1.0)
+            base = k1 * (1 - b)
+            scores = {}
+            get = scores.get
+            for term in terms:
+                parts, df = self.postings(term, self.max_postings)
+                if not df:
+                    continue
+                scale = self.idf(df) * (k1 + 1)
+                for ids, tfs in parts:
+                    for doc, tf in zip(ids, tfs):
+                        scores[doc] = get(doc, 0.0) + scale * tf / (tf + base + norm * lengths[doc])
+            ranked = self._boost(scores, 4 * k + len(exclude) + 8, now)
+            refs = self.columns["refs"]
+            results = []
+            seen = set(exclude)
+            for score, doc in ranked:
+                source, document = self.document(refs[doc])
+                text = document.get("input") if source == "log" else document.get("summary")
+                if text in seen:
+                    continue
+                seen.add(text)
+                results.append((score, source, document))
+                if len(results) == k:
+                    break
+            return results
+
+    def _boost(self, scores, m, now):
+        """The m best (boosted score, doc) pairs, best first.
+
+        Candidates are visited in BM25 order and the walk stops once even
+        the largest possible boost can't lift one into the top m, so most
+        candidates are never boosted at all.
+        """
+        weights, times = self.columns["weights"], self.columns["times"]
+        weight_boost, recency_boost, decay = self.weight_boost, self.recency_boost, self.decay
+        max_boost = (1 + weight_boost * max(self.max_weight, 0)) * (1 + recency_boost)
+        top = []
+        for doc, score in sorted(scores.items(), key=itemgetter(1), reverse=True):
+            if len(top) == m and score * max_boost <= top[0][0]:
+                break
+            boosted = (score * (1 + weight_boost * weights[doc])
+                       * (1 + recency_boost * math.exp(-decay * max(0.0, now - times[doc]))))
+            if len(top) < m:
+                heapq.heappush(top, (boosted, doc))
+            elif boosted > top[0][0]:
+                heapq.heapreplace(top, (boosted, doc))
+        return sorted(top, reverse=True)
+
+    def document(self, ref):
+        """(source, document) behind a ref from the refs column."""
+        position = ref >> 1
+        if ref & 1 == LOG:
+            return "log", self.log.slice(position, position + 1)[0]
+        with open(self.summaries_file, "rb") as f:
+            f.seek(position)
+            return "summary", loads(f.readline())
@@ -0,0 +1,364 @@
+import heapq
+import os
+import re
+import sys
+from datetime import datetime
+from itertools import islice
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.codec import dumps, loads
+from src.storage.inverted_index import InvertedIndex, tokenize
+
+# Values of the State field, one bit each in the states column
+STATES = ("WIP", "Completed", "Short Term", "Longer Term", "DT")
+# Where a record came from; the sources column holds the position in this tuple
+SOURCES = ("markdown", "chat_summaries", "e3_reflections")
+MARKDOWN = 0
+DEAD = 255  # a markdown record that was edited out of the file
+FIELD = re.compile(r"- \*\*([^*\n]+)\*\*:[ \t]*")
+PHRASE = re.compile(r'"([^"]*)"')
+DATE_FORMATS = ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y")
+
+
+def parse_date(value):
+    """A Date field ("2025-03-26" or "March 26, 2025") as an int YYYYMMDD; 0 if unparseable."""
+    value = str(value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            date = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return date.year * 10000 + date.month * 100 + date.day
+    return 0
+
+
+def state_flags(value):
+    """The STATES named in a State field ("WIP, Short Term, DT"), as a bitmask."""
+    names = {part.strip().lower() for part in str(value or "").split(",")}
+    return sum(1 << i for i, state in enumerate(STATES) if state.lower() in names)
+
+
+def parse_markdown(text):
+    """The Date/Summary/Follow-Up/State (and Date/Goal/Purpose/State) records of e3_summaries.md text.
+
+    A record starts at each top-level "- **Date**:" field; indented fields
+    (the format template) and fields before the first Date are ignored.
+    Fields glued onto the end of the previous line are split off.
+    """
+    record = None
+    for line in text.splitlines():
+        if line.startswith("## "):
+            if record:
+                yield record
+            record = None
+            continue
+        if not line.startswith("- **"):
+            continue
+        fields = list(FIELD.finditer(line))
+        for i, match in enumerate(fields):
+            name = match.group(1).strip()
+            value = line[match.end():fields[i + 1].start() if i + 1 < len(fields) else len(line)].strip()
+            if name == "Date":
+                if record:
+                    yield record
+                record = {"source": "markdown", "date": value}
+            elif record is None:
+                continue
+            elif name.startswith(("Summary", "Goal")):
+                record["kind"] = "goal" if name.startswith("Goal") else "summary"
+                record["label"] = name
+                record["text"] = value
+            elif name in ("Follow-Up", "Purpose"):
+                record["notes"] = value
+            elif name == "State":
+                record["state"] = value
+    if record:
+        yield record
+
+
+class SearchIndex(InvertedIndex):
+    """Full-text search over the e3_summaries.md records, chat_summaries and e3_reflections.
+
+    Every record is copied into records.jsonl as it is indexed, so queries
+    read neither the markdown nor state.json. Captures add their records as
+    they are written while the index is open; whatever was added while it
+    was closed is caught up when it next opens. The markdown is only
+    re-parsed when it changed behind our back: on open if its size/mtime
+    differ from what was recorded at the last close, or when SummariesIndex
+    notices a hand edit. Records that disappeared from it are marked dead in
+    the sources column and new ones indexed. For chat_summaries and
+    e3_reflections, meta.json counts the items indexed so far, archived ones
+    included (see catch_up_state). Queries match every word and "quoted phrase" and can filter by
+    State flags, date range and source.
+    """
+    COLUMNS = dict(InvertedIndex.COLUMNS, dates="I", states="B", sources="B")
+    NAME = "search"
+
+    def __init__(self, directory, summaries_file, flush_docs=10000):
+        self.summaries_file = summaries_file
+        self.records_file = os.path.join(directory, "records.jsonl")
+        super().__init__(directory, flush_docs)
+        self._markdown_stale = False
+        self._records = None  # append handle, opened on the first add
+        self.catch_up()
+        self.sync_markdown()
+
+    def default_meta(self):
+        return dict(super().default_meta(), records=0, markdown_stat=None, state_items={})
+
+    def save_meta(self):
+        with self.lock:
+            if len(self) != self.meta["docs"]:
+                self.flush()  # writes meta.json too
+            else:
+                self._write_meta()
+
+    def _add_record(self, record, offset):
+        text = " ".join(str(record.get(field) or "") for field in ("label", "text", "notes"))
+        self._add(text, refs=offset, dates=parse_date(record.get("date")), states=state_flags(record.get("state")),
+                  sources=SOURCES.index(record["source"]))
+        if record["source"] != "markdown":
+            # Counted with the record, so replaying records.jsonl on open restores the count too
+            counts = self.meta.setdefault("state_items", {})
+            counts[record["source"]] = counts.get(record["source"], 0) + 1
+
+    def add(self, records):
+        """Copy records into records.jsonl and index them."""
+        records = list(records)
+        if not records:
+            return
+        with self.lock:
+            self.catch_up()
+            lines = [(dumps(r) + "\n").encode("utf-8") for r in records]
+            if self._records is None:
+                self._records = open(self.records_file, "ab")
+            offset = self._records.tell()
+            self._records.write(b"".join(lines))
+            self._records.flush()
+            for record, line in zip(records, lines):
+                self._add_record(record, offset)
+                offset += len(line)
+            self.meta["records"] = offset
+            self._maybe_flush()
+
+    def add_markdown(self, text):
+        """Index the records of markdown just written to e3_summaries.md."""
+        self.add(parse_markdown(text))
+
+    def add_state_items(self, source, items):
+        """Index the chat_summaries or e3_reflections items next in line (dicts with date, summary and maybe state)."""
+        items = (item if isinstance(item, dict) else {"summary": str(item)} for item in items)
+        self.add({"source": source, "date": item.get("date"), "text": item.get("summary"), "state": item.get("state")}
+                 for item in items)
+
+    def catch_up_state(self, source, items, archive):
+        """Index the source's items added since the index last saw it: newly archived ones, then those in state.
+
+        items is the state's list and archive its StateArchive, which holds
+        the older items in order; together they number every item ever added.
+        """
+        with self.lock:
+            done = self.meta.setdefault("state_items", {}).get(source, 0)
+            archived = archive.count(source)
+            if done < archived:
+                self.add_state_items(source, islice(archive.query(source), done, archived))
+                done = archived
+            self.add_state_items(source, items[done - archived:])
+
+    def catch_up(self):
+        """Index whatever records.jsonl holds beyond what is indexed already."""
+        with self.lock:
+            if not os.path.exists(self.records_file) or os.path.getsize(self.records_file) <= self.meta["records"]:
+                return
+            with open(self.records_file, "rb") as f:
+                f.seek(self.meta["records"])
+                offset = self.meta["records"]
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    if line.strip():
+                        self._add_record(loads(line), offset)
+                    offset += len(line)
+            if os.path.getsize(self.records_file) > offset:
+                # A torn write at the end: drop it so the next append starts on a fresh line
+                with open(self.records_file, "r+b") as f:
+                    f.truncate(offset)
+            self.meta["records"] = offset
+            self._maybe_flush()
+
+    def markdown_stat(self):
+        try:
+            st = os.stat(self.summaries_file)
+        except FileNotFoundError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def mark_markdown_stale(self):
+        """The markdown was edited by hand: re-parse it before the next query (a SummariesIndex rebuild hook)."""
+        self._markdown_stale = True
+
+    def sync_markdown(self, force=False):
+        """Re-parse e3_summaries.md if it changed since the last sync, indexing what's new and dropping what's gone."""
+        with self.lock:
+            stat = self.markdown_stat()
+            if stat == self.meta["markdown_stat"] and not force:
+                return
+            try:
+                with open(self.summaries_file, "r", encoding="utf-8", errors="replace") as f:
+                    parsed = list(parse_markdown(f.read()))
+            except FileNotFoundError:
+                parsed = []
+            indexed = {}
+            sources, refs = self.columns["sources"], self.columns["refs"]
+            docs = [doc for doc in range(len(self)) if sources[doc] == MARKDOWN]
+            for doc, record in zip(docs, self.records(refs[doc] for doc in docs)):
+                indexed.setdefault(dumps(record), []).append(doc)
+            new = []
+            for record in parsed:
+                docs = indexed.get(dumps(record))
+                if docs:
+                    docs.pop()
+                else:
+                    new.append(record)
+            for docs in indexed.values():
+                for doc in docs:
+                    self._kill(doc)
+            self.add(new)
+            self.meta["markdown_stat"] = stat
+            self._markdown_stale = False
+            self.save_meta()
+
+    def _kill(self, doc):
+        self.columns["sources"][doc] = DEAD
+        if doc < self.meta["docs"]:
+            # Columns are fixed width, so a flushed record is marked dead in place
+            with open(self.column_path("sources"), "r+b") as f:
+                f.seek(doc)
+                f.write(bytes([DEAD]))
+
+    def record(self, offset):
+        return self.records([offset])[0]
+
+    def records(self, offsets):
+        """The records at offsets of records.jsonl, read with one open of the file."""
+        offsets = list(offsets)
+        if not offsets:
+            return []
+        with open(self.records_file, "rb") as f:
+            records = []
+            for offset in offsets:
+                f.seek(offset)
+                records.append(loads(f.readline()))
+            return records
+
+    def search(self, query="", states=(), since=None, until=None, sources=None, limit=20):
+        """Records matching every word and "quoted phrase" in query, as (score, record) pairs, best first.
+
+        states are STATES names a record must all carry; since/until bound
+        its date (inclusive, "YYYY-MM-DD"); sources restricts it to some of
+        SOURCES. Without words the newest matching records come first.
+        """
+        phrases = [tokenize(p) for p in PHRASE.findall(query)]
+        phrases = [p for p in phrases if len(p) > 1]  # a one-word phrase is just a word
+        terms = set(tokenize(PHRASE.sub(" ", query)))
+        for phrase in phrases:
+            terms.update(phrase)
+        mask = state_flags(", ".join(states))
+        unknown = [s for s in states if not state_flags(s)]
+        if unknown:
+            raise ValueError(f"Unknown state {unknown[0]!r}; expected one of {', '.join(STATES)}")
+        low = parse_date(since) if since else 0
+        high = parse_date(until) if until else 99999999
+        if (since and not low) or (until and high == 0):
+            raise ValueError("Dates must look like 2025-03-26")
+        wanted = {SOURCES.index(s) for s in sources} if sources else set(range(len(SOURCES)))
+        with self.lock:
+            if self._markdown_stale:
+                self.sync_markdown(force=True)
+            if not len(self):
+                return []
+            dates, flags, kinds = self.columns["dates"], self.columns["states"], self.columns["sources"]
+
+            def keep(doc):
+                return kinds[doc] in wanted and flags[doc] & mask == mask and low <= dates[doc] <= high
+
+            if not terms:
+                matches = ((0.0, doc) for doc in range(len(self) - 1, -1, -1) if keep(doc))
+            else:
+                # Ties go to the newer record
+                scored = [(score, dates[doc], doc) for doc, score in self._score(terms).items() if keep(doc)]
+                # Phrases are checked against the records, so those may need to look past the first limit
+                matches = ((score, doc) for score, _, doc in _ranked(scored, limit * 4 if phrases else limit))
+            results = []
+            refs = self.columns["refs"]
+            with open(self.records_file, "rb") as f:
+                for score, doc in matches:
+                    f.seek(refs[doc])
+                    record = loads(f.readline())
+                    if phrases:
+                        words = tokenize(" ".join(str(record.get(field) or "") for field in ("label", "text", "notes")))
+                        if not all(_contains(words, phrase) for phrase in phrases):
+                            continue
+                    results.append((score, record))
+                    if len(results) == limit:
+                        break
+            return results
+
+    def _score(self, terms):
+        """BM25 scores of the documents holding every term."""
+        postings = []
+        for term in terms:
+            parts, df = self.postings(term)
+            if not df:
+                return {}
+            postings.append((df, parts))
+        postings.sort(key=lambda item: item[0])  # rarest term first, so the candidate set only shrinks
+        lengths = self.columns["lengths"]
+        k1, b = self.k1, self.b
+        norm = k1 * b / (self.total_length / len(self) or 1.0)
+        base = k1 * (1 - b)
+        scores = None
+        for df, parts in postings:
+            scale = self.idf(df) * (k1 + 1)
+            term_scores = {}
+            for ids, tfs in parts:
+                for doc, tf in zip(ids, tfs):
+                    if scores is None or doc in scores:
+                        term_scores[doc] = scale * tf / (tf + base + norm * lengths[doc])
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                break
+        return scores
+
+    def close(self, markdown_stat=None):
+        """Flush and close; markdown_stat is the markdown's stat if every change since the last sync was ours."""
+        with self.lock:
+            if self._markdown_stale:
+                self.sync_markdown(force=True)
+            elif markdown_stat is not None and markdown_stat == self.markdown_stat():
+                self.meta["markdown_stat"] = markdown_stat
+                self.save_meta()
+            if self._records is not None:
+                self._records.close()
+                self._records = None
+            super().close()
+
+
+def _ranked(scored, first):
+    """scored best first, sorting only as far as the caller reads: the top `first`, then 4x as many, and so on."""
+    done = 0
+    n = first
+    while done < len(scored):
+        top = heapq.nlargest(n, scored)
+        yield from top[done:]
+        done = len(top)
+        n *= 4
+
+
+def _contains(words, phrase):
+    n = len(phrase)
+    first = phrase[0]
+    return any(words[i:i + n] == phrase for i, word in enumerate(words) if word == first)
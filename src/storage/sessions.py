@@ -0,0 +1,130 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ROOT = os.path.join("data", "historical")
+DEFAULT_SESSIONS_ROOT = os.path.join("data", "sessions")
+# Session ids become directory names, so only plain, short names are accepted
+SESSION_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+def storage_roots(config, project_dir=None):
+    """(root, sessions_root) from the storage section, relative paths taken from project_dir.
+
+    root holds the default state.json, history log and archive; every
+    session gets its own subdirectory of sessions_root.
+    """
+    project_dir = project_dir or PROJECT_DIR
+    storage = (config or {}).get("storage") or {}
+    return (os.path.join(project_dir, storage.get("root") or DEFAULT_ROOT),
+            os.path.join(project_dir, storage.get("sessions_root") or DEFAULT_SESSIONS_ROOT))
+
+
+def session_dir(sessions_root, session_id):
+    """The directory of one session's shard; raises ValueError for ids that aren't safe file names."""
+    if not isinstance(session_id, str) or not SESSION_ID.fullmatch(session_id) or session_id.strip(".") == "":
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return os.path.join(sessions_root, session_id)
+
+
+class _Slot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = None
+        self.users = 0
+
+
+class SessionPool:
+    """LRU of resident per-session objects (GroInstructors, server shards, ...).
+
+    ``with pool.session(id) as obj`` opens the session through factory(id)
+    on first use and keeps it resident. Once more than max_resident are
+    open, the least recently used ones nobody is inside of are closed, which
+    flushes their state to disk; the next request reopens them from there.
+    Only opening and closing a session serialize, and only on that session,
+    so requests for different sessions never wait on each other.
+    """
+
+    def __init__(self, factory, max_resident=64, close=None):
+        self.factory = factory
+        self.max_resident = max_resident
+        self.close_session = close or (lambda value: value.close())
+        self.lock = threading.Lock()
+        self.resident = OrderedDict()
+        self._closing = {}
+
+    def __len__(self):
+        return len(self.resident)
+
+    def __contains__(self, session_id):
+        return session_id in self.resident
+
+    @contextmanager
+    def session(self, session_id):
+        with self.lock:
+            slot = self.resident.get(session_id)
+            if slot is None:
+                slot = self.resident[session_id] = _Slot()
+            else:
+                self.resident.move_to_end(session_id)
+            slot.users += 1
+            previous = self._closing.get(session_id)
+        try:
+            if slot.value is None:
+                with slot.lock:
+                    if slot.value is None:
+                        if previous is not None:
+                            with previous.lock:  # an evicted copy must finish writing before we read
+                                pass
+                        slot.value = self.factory(session_id)
+            yield slot.value
+        finally:
+            with self.lock:
+                slot.users -= 1
+                if slot.value is None and not slot.users and self.resident.get(session_id) is slot:
+                    del self.resident[session_id]  # the factory failed
+                evicted = self._evictable()
+            for session_id, slot in evicted:
+                self._close(session_id, slot)
+
+    def _evictable(self):
+        """Unlink the least recently used idle sessions beyond max_resident (call with self.lock held)."""
+        evicted = []
+        excess = len(self.resident) - self.max_resident
+        for session_id, slot in list(self.resident.items()):
+            if excess <= 0:
+                break
+            if slot.users or slot.value is None:
+                continue
+            del self.resident[session_id]
+            self._closing[session_id] = slot
+            slot.lock.acquire()
+            evicted.append((session_id, slot))
+            excess -= 1
+        return evicted
+
+    def _close(self, session_id, slot):
+        try:
+            self.close_session(slot.value)
+        except Exception as e:
+            print(f"Error closing session {session_id}: {e}")
+        finally:
+            slot.lock.release()
+            with self.lock:
+                if self._closing.get(session_id) is slot:
+                    del self._closing[session_id]
+
+    def close(self):
+        """Close every resident session."""
+        with self.lock:
+            slots = list(self.resident.items())
+            self.resident.clear()
+        for session_id, slot in slots:
+            if slot.value is not None:
+                try:
+                    self.close_session(slot.value)
+                except Exception as e:
+                    print(f"Error closing session {session_id}: {e}")
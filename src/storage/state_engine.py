@@ -0,0 +1,187 @@
+import atexit
+import os
+import threading
+
+from src import metrics
+from src.storage.backends import JsonBackend
+from src.storage.codec import decode
+
+_MISSING = object()
+
+
+def merge_changes(state, base, theirs):
+    """Fold the top-level keys another writer changed (base -> theirs) into state.
+
+    Keys we changed too keep our value; those are returned.
+    """
+    conflicts = []
+    for key in list(base) + [key for key in theirs if key not in base]:
+        old, new, ours = base.get(key, _MISSING), theirs.get(key, _MISSING), state.get(key, _MISSING)
+        if new == old or new == ours:
+            continue
+        if ours != old:
+            conflicts.append(key)
+        elif new is _MISSING:
+            del state[key]
+        else:
+            state[key] = new
+    return conflicts
+
+
+class StateEngine:
+    """Resident copy of the state, changed in memory and flushed write-behind.
+
+    The state is parsed once at construction. Callers mutate ``state`` while
+    holding ``lock`` and then call ``mark_dirty()``. A background thread flushes
+    after ``flush_every`` changes or every ``flush_interval_ms`` milliseconds,
+    whichever comes first, and ``close()`` (registered with atexit) flushes
+    whatever is left on shutdown. Persistence is delegated to a storage
+    backend (state.json by default, see backends.py).
+
+    If another process (GrokAgent.scrape_data, say) commits the file in the
+    meantime, the next flush merges its changes in by top-level key; where
+    both sides changed a key, the resident value wins.
+    """
+
+    def __init__(self, state_file, default_factory=dict, flush_every=None, flush_interval_ms=None,
+                 flush_on_exit=True, backend=None):
+        self.state_file = state_file
+        self.backend = backend or JsonBackend(state_file)
+        self.default_factory = default_factory
+        self.flush_every = flush_every
+        self.flush_interval_ms = flush_interval_ms
+        self.lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.pending = 0
+        self._flush_hooks = []
+        self._merge_hooks = []
+        self.state = self.read()
+        self._worker = None
+        if flush_every or flush_interval_ms:
+            self._worker = threading.Thread(target=self._run, name="state-writer", daemon=True)
+            self._worker.start()
+        if flush_on_exit:
+            atexit.register(self.close)
+
+    def read(self):
+        with metrics.span("state.load"):
+            return self.backend.read_state(self.default_factory)
+
+    def mark_dirty(self, changes=1):
+        """Record in-memory changes; never touches the disk itself."""
+        with self.lock:
+            self.pending += changes
+            if self.flush_every and self.pending >= self.flush_every:
+                self._wake.set()
+
+    def add_flush_hook(self, hook):
+        """Call hook(state) under the lock just before each flush, e.g. to materialize derived fields."""
+        self._flush_hooks.append(hook)
+
+    def add_merge_hook(self, hook):
+        """Call hook(state, base, theirs) under the lock after another writer's commit is merged into state.
+
+        Owners of structures derived from the state (the resident top-K
+        history, say) use it to take in the other writer's changes, which
+        the next flush hook would otherwise overwrite. It may return the keys
+        it reconciled, which then aren't reported as conflicts.
+        """
+        self._merge_hooks.append(hook)
+
+    def replace(self, state):
+        with self.lock:
+            self.state = state
+            self.pending += 1
+
+    def flush(self):
+        """Write the resident state to disk if it has unsaved changes. Returns True if written."""
+        with self._flush_lock, metrics.span("state.flush"):
+            with self.lock:
+                if not self.pending:
+                    return False
+                pending, self.pending = self.pending, 0
+                for hook in self._flush_hooks:
+                    hook(self.state)
+                with metrics.span("state.encode"):
+                    payload = self.backend.prepare(self.state)
+            try:
+                self.backend.commit(payload, merge=self._merge)
+            except Exception:
+                with self.lock:
+                    self.pending += pending
+                raise
+            return True
+
+    def _merge(self, base, theirs):
+        """Journal merge hook: fold another writer's commit into the resident state and re-encode it."""
+        try:
+            base = decode(base) if base and base.strip() else {}
+            theirs = decode(theirs) if theirs.strip() else {}
+        except ValueError:
+            return None
+        if not isinstance(base, dict) or not isinstance(theirs, dict):
+            return None
+        with self.lock:
+            conflicts = merge_changes(self.state, base, theirs)
+            for hook in self._merge_hooks:
+                reconciled = hook(self.state, base, theirs) or ()
+                conflicts = [key for key in conflicts if key not in reconciled]
+            if conflicts:
+                print(f"Warning: {self.state_file} was changed by another writer; kept our {', '.join(conflicts)}.")
+            return self.backend.prepare(self.state)
+
+    def _run(self):
+        timeout = self.flush_interval_ms / 1000.0 if self.flush_interval_ms else None
+        while not self._closed:
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._closed:
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing {self.state_file}: {e}")
+
+    def close(self):
+        """Stop the writer thread and flush any remaining changes."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing {self.state_file}: {e}")
+        self.backend.close()
+        atexit.unregister(self.close)
+
+
+_shared_engines = {}
+_shared_lock = threading.Lock()
+
+
+def shared_engine(state_file, **kwargs):
+    """Return the process-wide engine for state_file, creating it on first use.
+
+    Every writer of the same file goes through one engine, and therefore one
+    lock, so concurrent updates are serialized instead of clobbering each other.
+    """
+    key = os.path.normcase(os.path.abspath(state_file))
+    with _shared_lock:
+        engine = _shared_engines.get(key)
+        if engine is None:
+            engine = _shared_engines[key] = StateEngine(state_file, **kwargs)
+        return engine
+
+
+def close_shared_engine(engine):
+    """Close a shared_engine() engine and forget it, e.g. when its session is evicted."""
+    key = os.path.normcase(os.path.abspath(engine.state_file))
+    with _shared_lock:
+        if _shared_engines.get(key) is engine:
+            del _shared_engines[key]
+    engine.close()
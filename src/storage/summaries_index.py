@@ -0,0 +1,199 @@
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.storage.backends import atomic_write
+
+FUTURE_VISION_HEADER = "## Future Vision (#DT - Deep Thought)"
+DATE_LINE = re.compile(r"Date\*\*: (.+)")
+GOAL_LINE = re.compile(r"\*\*Goal \d+\*\*")
+
+
+class SummariesIndex:
+    """Sidecar index for e3_summaries.md: per-date entry and goal counts plus section offsets.
+
+    The index remembers the size and mtime of the markdown it describes. If
+    the file was edited by hand since, the index is rebuilt from the markdown
+    in one pass; otherwise counting is a dict lookup and writes only touch
+    the bytes being added.
+    """
+
+    def __init__(self, summaries_file, index_file=None):
+        self.summaries_file = summaries_file
+        if index_file is None:
+            directory, name = os.path.split(summaries_file)
+            index_file = os.path.join(directory, "." + os.path.splitext(name)[0] + ".index.json")
+        self.index_file = index_file
+        self.data = None
+        self._batch = None
+        self._rebuild_hooks = []
+
+    def add_rebuild_hook(self, hook):
+        """Call hook() whenever the markdown turns out to have been edited and the index is rebuilt."""
+        self._rebuild_hooks.append(hook)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.summaries_file)
+        except FileNotFoundError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def ensure(self):
+        """Load the index, rebuilding it if missing or stale."""
+        if self.data is None:
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.data = {}
+        if "dates" not in self.data or self.data.get("stat") != self._stat():
+            self.rebuild()
+        return self.data
+
+    def rebuild(self):
+        """Regenerate the index by scanning the markdown once."""
+        dates = {}
+        goals = {}
+        future_vision = None
+        in_future_vision = False
+        last_date = None
+        offset = 0
+        try:
+            with open(self.summaries_file, "rb") as f:
+                for raw in f:
+                    offset += len(raw)
+                    line = raw.decode("utf-8", errors="replace")
+                    if line.startswith("## "):
+                        in_future_vision = line.rstrip("\r\n") == FUTURE_VISION_HEADER
+                        if in_future_vision and future_vision is None:
+                            # Goals go straight after the header text, before its line break
+                            future_vision = offset - (len(raw) - len(raw.rstrip(b"\r\n")))
+                        continue
+                    match = DATE_LINE.search(line)
+                    if match:
+                        last_date = match.group(1).strip()
+                        dates[last_date] = dates.get(last_date, 0) + 1
+                    elif in_future_vision and last_date and GOAL_LINE.search(line):
+                        goals[last_date] = goals.get(last_date, 0) + 1
+        except FileNotFoundError:
+            pass
+        self.data = {"dates": dates, "goals": goals, "future_vision": future_vision}
+        self._save()
+        for hook in self._rebuild_hooks:
+            hook()
+        return self.data
+
+    def synced_stat(self):
+        """The markdown's [size, mtime] if every change to it since the last rebuild went through this index."""
+        stat = self._stat()
+        return stat if self.data is not None and self.data.get("stat") == stat else None
+
+    def _save(self):
+        self.data["stat"] = self._stat()
+        # The index is derived data and self-validating, so it skips the fsync
+        atomic_write(self.index_file, json.dumps(self.data), fsync=False)
+
+    def entry_count(self, date):
+        """Number of "Date**: <date>" entries (summaries and goals) already in the file."""
+        return self.ensure()["dates"].get(date, 0)
+
+    def goal_count(self, date):
+        return self.ensure()["goals"].get(date, 0)
+
+    @contextmanager
+    def batch(self):
+        """Buffer appends and goal inserts, then write them all at once.
+
+        Counts update as each call is made, so labels come out exactly as if
+        the calls had been written one by one, but the file is appended to,
+        or its tail after the header rewritten, once for the whole batch.
+        """
+        if self._batch is not None:
+            yield self
+            return
+        data = self.ensure()
+        self._batch = {"existing": data["future_vision"] is not None, "created": False,
+                       "before": [], "goals": [], "after": []}
+        try:
+            yield self
+        finally:
+            batch, self._batch = self._batch, None
+            self._write_batch(data, batch)
+
+    def _write_batch(self, data, batch):
+        goals = b"".join(reversed(batch["goals"]))  # each goal goes straight under the header, so newest first
+        after = "".join(batch["after"]).encode("utf-8")
+        if batch["existing"]:
+            if goals:
+                with open(self.summaries_file, "r+b") as f:
+                    f.seek(data["future_vision"])
+                    tail = f.read()
+                    f.seek(data["future_vision"])
+                    f.write(goals + tail + after)
+            elif after:
+                with open(self.summaries_file, "ab") as f:
+                    f.write(after)
+        elif batch["before"] or batch["created"]:
+            with open(self.summaries_file, "ab") as f:
+                f.write("".join(batch["before"]).encode("utf-8"))
+                if batch["created"]:
+                    f.write(("\n" + FUTURE_VISION_HEADER).encode("utf-8"))
+                    data["future_vision"] = f.tell()
+                    f.write(goals + after)
+        else:
+            return
+        self._save()
+
+    def append_summary(self, date, entry):
+        """Append a summary entry at the end of the file."""
+        data = self.ensure()
+        if self._batch is not None:
+            self._batch["after" if self._batch["existing"] or self._batch["created"] else "before"].append(entry)
+        else:
+            with open(self.summaries_file, "a", encoding="utf-8") as f:
+                f.write(entry)
+        data["dates"][date] = data["dates"].get(date, 0) + 1
+        if self._batch is None:
+            self._save()
+
+    def insert_goal(self, date, entry):
+        """Insert a goal right under the Future Vision header, creating the section if needed.
+
+        Only the bytes after the header are read and rewritten; nothing before
+        it is touched and nothing is rescanned.
+        """
+        data = self.ensure()
+        encoded = ("\n" + entry).encode("utf-8")
+        if self._batch is not None:
+            self._batch["created"] = self._batch["created"] or not self._batch["existing"]
+            self._batch["goals"].append(encoded)
+            data["dates"][date] = data["dates"].get(date, 0) + 1
+            data["goals"][date] = data["goals"].get(date, 0) + 1
+            return
+        if data["future_vision"] is None:
+            with open(self.summaries_file, "ab") as f:
+                f.write(("\n" + FUTURE_VISION_HEADER).encode("utf-8"))
+                data["future_vision"] = f.tell()
+                f.write(encoded)
+        else:
+            with open(self.summaries_file, "r+b") as f:
+                f.seek(data["future_vision"])
+                tail = f.read()
+                f.seek(data["future_vision"])
+                f.write(encoded + tail)
+        data["dates"][date] = data["dates"].get(date, 0) + 1
+        data["goals"][date] = data["goals"].get(date, 0) + 1
+        self._save()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "rebuild":
+        print("Usage: python summaries_index.py rebuild <e3_summaries.md>")
+        sys.exit(1)
+    index = SummariesIndex(sys.argv[2])
+    data = index.rebuild()
+    print(f"Indexed {sum(data['dates'].values())} entries ({sum(data['goals'].values())} goals) "
+          f"into {index.index_file}")
@@ -0,0 +1,105 @@
+from collections import deque, namedtuple
+
+# Result of one scan over a message:
+#   tags        weights of every #e1–#e5 tag present
+#   weight      the highest of them, or None
+#   invalid_tag True if the message has an "#e" that isn't #e1–#e5 (and no valid tag)
+#   keywords    response-table keywords found, in table order
+#   dt          text between ‘deep thought’ and #DTend of the first #DT block, or None
+TagMatch = namedtuple("TagMatch", ["tags", "weight", "invalid_tag", "keywords", "dt"])
+
+TAG, BARE_TAG, DT_OPEN, DT_QUOTE, DT_END, KEYWORD = range(6)
+
+# The #e1–#e5 / #DT grammar; these are matched case-sensitively
+GRAMMAR = [(f"#e{i}", TAG, i) for i in range(1, 6)] + [
+    ("#e", BARE_TAG, None),
+    ("#DT", DT_OPEN, None),
+    ("‘deep thought’", DT_QUOTE, None),
+    ("#DTend", DT_END, None),
+]
+
+
+class TagMatcher:
+    """Aho–Corasick automaton over the tag grammar and a table of keywords.
+
+    Built once, it reports tags, keyword hits and the #DT span in a single
+    pass over the message, so the cost per message depends on the message
+    length, not on how many keywords the table holds. Keywords match
+    case-insensitively, like ``key in message.lower()``.
+    """
+
+    def __init__(self, keywords=()):
+        self.keywords = []
+        for key in keywords:
+            if not key.startswith("#e") and key not in self.keywords:
+                self.keywords.append(key)
+        self.patterns = [(text, kind, value, True) for text, kind, value in GRAMMAR]
+        self.patterns += [(key.lower(), KEYWORD, index, False) for index, key in enumerate(self.keywords)]
+        self._build()
+
+    def _build(self):
+        self.goto = [{}]
+        self.out = [[]]
+        for pid, (text, _, _, _) in enumerate(self.patterns):
+            state = 0
+            for ch in text.lower():
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pid)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def match(self, message):
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        tags = set()
+        bare_tag = False
+        hits = set()
+        dt_open = quote_end = dt_end = None
+        state = 0
+        for i, ch in enumerate(message):
+            for c in ch.lower():
+                while state and c not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(c, 0)
+                for pid in out[state]:
+                    text, kind, value, exact = patterns[pid]
+                    start = i + 1 - len(text)
+                    if exact and message[start:i + 1] != text:
+                        continue
+                    if kind == KEYWORD:
+                        hits.add(value)
+                    elif kind == TAG:
+                        tags.add(value)
+                    elif kind == BARE_TAG:
+                        bare_tag = True
+                    elif kind == DT_OPEN:
+                        if dt_open is None:
+                            dt_open = i + 1
+                    elif kind == DT_QUOTE:
+                        if dt_open is not None and quote_end is None and start >= dt_open:
+                            quote_end = i + 1
+                    elif kind == DT_END:
+                        if quote_end is not None and dt_end is None and start >= quote_end:
+                            dt_end = start
+        weight = max(tags) if tags else None
+        return TagMatch(
+            tags=tags,
+            weight=weight,
+            invalid_tag=bare_tag and weight is None,
+            keywords=[self.keywords[index] for index in sorted(hits)],
+            dt=message[quote_end:dt_end] if dt_end is not None else None,
+        )
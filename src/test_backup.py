@@ -0,0 +1,55 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.src.backup import IncrementalBackup, backup_state_json
+from src.storage.backends import JsonBackend
+
+
+def test_backups_round_trip_and_prune():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "state.json")
+        backup_dir = os.path.join(tmp, "backups")
+        state = {"chat_summaries": [], "input_count": 0, "progress": ""}
+        states = {}
+        for n in range(25):
+            state["chat_summaries"].append({"date": "2025-03-20", "summary": f"Summary {n} " + "x" * 200})
+            state["input_count"] = n
+            if n % 7 == 6:
+                state["progress"] = f"Updated {n}"
+            with open(source, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                entry = backup_state_json(source, backup_dir, snapshot_every=5, keep=12)
+            states[entry["id"]] = json.loads(json.dumps(state))
+        # No timestamped full copies: only the snapshots and deltas the catalog refers to
+        assert sorted(os.listdir(backup_dir)) == ["catalog.json", "deltas", "head.json", "objects"]
+        backups = IncrementalBackup(backup_dir)
+        assert len(backups.catalog) == 12
+        assert backups.catalog[0]["type"] == "snapshot"
+        assert sum(item["type"] == "delta" for item in backups.catalog) >= 8
+        kept = [item["id"] for item in backups.catalog]
+        assert kept == list(states)[-12:]
+        for backup_id in kept:
+            assert backups.state_at(backup_id) == states[backup_id]
+        for backup_id in list(states)[:-12]:
+            try:
+                backups.state_at(backup_id)
+            except ValueError:
+                continue
+            raise AssertionError(f"pruned backup {backup_id} can still be restored")
+        live = {item.get("object") or item["id"] for item in backups.catalog}
+        for sub in ("objects", "deltas"):
+            assert {name[:-3] for name in os.listdir(os.path.join(backup_dir, sub))} <= live
+        target = os.path.join(tmp, "restored.json")
+        backups.restore(target, at=kept[3], state_format="json", durable=False)
+        assert JsonBackend(target).read_state(dict) == states[kept[3]]
+
+
+if __name__ == "__main__":
+    test_backups_round_trip_and_prune()
+    print("All backup tests passed")
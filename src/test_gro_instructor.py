@@ -1,7 +1,13 @@
 import sys
 import os
-sys.path.append("F:/gro_Grok_Template/src")  # Add src to path
+import tempfile
+import yaml
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))  # Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # and the project, for src.*
 from gro_instructor import GroInstructor  # Import the class
+from src.GrokAgent.SummarizerAgent import SummarizerAgent
+from src.storage import search_index
+from src.storage.backends import open_backend
 
 def run_test():
     # Create instance
@@ -22,5 +28,117 @@ def run_test():
         print(f"You: {message}")
         print(f"gro_instructor: {reply}\n")
 
+def project(tmp, config):
+    """A project directory whose dev and prod configs are config."""
+    os.makedirs(os.path.join(tmp, "config"))
+    os.makedirs(os.path.join(tmp, "docs"))
+    for env in ("dev", "prod"):
+        with open(os.path.join(tmp, "config", f"{env}_config.yaml"), "w", encoding="utf-8") as f:
+            yaml.safe_dump(config, f)
+    return tmp
+
+
+def run_messages(tmp, messages, **kwargs):
+    """State and e3_summaries.md after responding to messages in a fresh project."""
+    project(tmp, {"storage": {"root": "data"}})
+    agent = GroInstructor(project_dir=tmp, **kwargs)
+    agent.respond_many(messages)
+    agent.close()
+    with open(os.path.join(tmp, "docs", "e3_summaries.md"), encoding="utf-8") as f:
+        markdown = f.read()
+    return agent.load_state(), markdown
+
+
+def test_follow_log_matches_inline():
+    messages = ["please summarize"] + [f"Task {i} #e{i % 5 + 1}" if i % 9 else f"summarize {i}" for i in range(45)] + [
+        "Ship it #e3 #DT ‘deep thought’ automate the release #DTend"]
+    with tempfile.TemporaryDirectory() as inline_dir, tempfile.TemporaryDirectory() as follow_dir:
+        inline, inline_md = run_messages(inline_dir, messages)
+        # The whole batch reaches the follower at once, so each summary has to look back from its own entry
+        followed, followed_md = run_messages(follow_dir, messages, follow_log=True)
+        for key in ("chat_summaries", "e3_reflections", "input_count", "latest_input"):
+            assert followed.get(key) == inline.get(key), key
+        assert [(e["input"], e["weight"]) for e in followed["history"]] == \
+            [(e["input"], e["weight"]) for e in inline["history"]]
+        assert inline["chat_summaries"][0]["summary"] == "Recent activity: 1x #e2"
+        assert followed_md == inline_md
+
+
+def test_storage_comes_from_config():
+    with tempfile.TemporaryDirectory() as tmp:
+        project(tmp, {"data": {"history_size": 3}, "storage": {"backend": "sqlite", "root": "data"}})
+        agent = GroInstructor(project_dir=tmp, async_markdown=False)
+        for message in ["Hello #e5", "Help #e3", "Debug #e1", "Plan #e2"]:
+            agent.respond(message)
+        agent.close()
+        data = os.path.join(tmp, "data")
+        assert os.path.exists(os.path.join(data, "state.db"))
+        assert not os.path.exists(os.path.join(data, "state.json"))
+        # The server opens the same backend from the same config, so both see one state
+        backend = open_backend("sqlite", os.path.join(data, "state.json"))
+        state = backend.read_state(dict)
+        backend.close()
+        assert state["input_count"] == 4 and len(state["history"]) == 3
+
+
+def test_format_and_durability_come_from_config():
+    with tempfile.TemporaryDirectory() as tmp:
+        project(tmp, {"storage": {"backend": "json", "format": "pretty", "durable": False, "root": "data"}})
+        agent = GroInstructor(project_dir=tmp, async_markdown=False)
+        agent.respond("Hello #e5")
+        assert agent.backend.journal.durable is False
+        agent.close()
+        with open(os.path.join(tmp, "data", "state.json"), "rb") as f:
+            assert f.read(2) == b"{\n"  # indented, where the compact default would be '{"'
+        # An explicit argument still wins over the config
+        agent = GroInstructor(project_dir=tmp, async_markdown=False, durable=True, history_size=1)
+        assert agent.backend.journal.durable is True and agent.load_state()["input_count"] == 1
+        agent.close()
+
+
+def test_summarizer_shares_the_configured_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, "data")
+        project(tmp, {"data": {"keywords": ["task"]}, "storage": {"backend": "sqlite", "root": data}})
+        summarizer = SummarizerAgent(config_path=os.path.join(tmp, "config", "dev_config.yaml"))
+        summarizer.summarize_and_prune("Project task from the summarizer")
+        summarizer.backend.close()
+        assert sorted(name for name in os.listdir(data) if name.startswith("state")) == ["state.db"]
+        assert summarizer.keywords == ["task"]
+        agent = GroInstructor(project_dir=tmp, async_markdown=False)
+        assert agent.load_state()["latest_input"] == "Project task from the summarizer"
+        agent.close()
+
+
+def test_search_does_not_reparse_unchanged_markdown():
+    with tempfile.TemporaryDirectory() as tmp:
+        project(tmp, {"storage": {"root": "data"}})
+        agent = GroInstructor(project_dir=tmp)
+        for i in range(20):
+            agent.respond(f"Fix the cache layer {i} #e3")
+        agent.close()
+        parses = []  # parses of the whole file, not of one capture's entry
+        parse_markdown = search_index.parse_markdown
+        search_index.parse_markdown = lambda text: parses.extend([1] if text.count("**Date**") > 1 else []) \
+            or parse_markdown(text)
+        try:
+            # Every first search builds or opens the index; only the first one reads the markdown
+            for expected in (20, 20, 20):
+                agent = GroInstructor(project_dir=tmp)
+                assert len(agent.search("cache", sources=["markdown"], limit=50)) == expected
+                agent.close()
+            assert len(parses) == 1
+            # Captures made while it is open are indexed as they are written, without a re-parse
+            agent = GroInstructor(project_dir=tmp)
+            agent.search("cache")
+            agent.respond("Fix the cache eviction #e3")
+            agent.flush_captures()
+            assert any("eviction" in r["text"] for r in agent.search("cache eviction", sources=["markdown"]))
+            agent.close()
+            assert len(parses) == 1
+        finally:
+            search_index.parse_markdown = parse_markdown
+
+
 if __name__ == "__main__":
     run_test()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.analytics import Analytics
+from src.replay import replay
+from src.storage.codec import dumps
+from src.storage.history_store import RECORD, HistoryStore
+from src.storage.log_reader import LogReader
+
+# Child process: append count entries one at a time, tagged with the writer's name
+WRITER_SCRIPT = """
+import sys
+sys.path.append({project!r})
+from src.storage.history_store import HistoryStore
+
+store = HistoryStore({directory!r}, segment_bytes=2048)
+for i in range({count}):
+    store.append({{"input": "{name} " + str(i), "timestamp": "2025-03-20T10:00:00", "weight": 2}})
+"""
+
+
+def entry(i):
+    return {"input": f"Task {i} #e{i % 5 + 1}", "timestamp": f"2025-03-20T10:{i // 60:02d}:{i % 60:02d}",
+            "weight": i % 5 + 1}
+
+
+def filled_store(directory, count=50):
+    store = HistoryStore(directory, segment_bytes=1024)
+    store.append_many(entry(i) for i in range(count))
+    return store
+
+
+def begin_append(store, item):
+    """Do the first half of an append under the writer lock: the segment line, not yet its index record.
+
+    Returns the function that finishes it, as the writer would after a pause.
+    """
+    store.lock.acquire()
+    line = (dumps(item) + "\n").encode("utf-8")
+    path = store.segment_path(store._segment)
+    offset = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(line)
+
+    def finish():
+        with open(store.index_file, "ab") as f:
+            f.write(RECORD.pack(0.0, store._segment, offset, len(line), int(item["weight"])))
+        with open(store.weight_path(item["weight"]), "ab") as f:
+            f.write((len(store)).to_bytes(8, "little"))
+        store._count += 1
+        store.lock.release()
+    return finish
+
+
+def test_recovers_crashed_append():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = filled_store(tmp)
+        last_segment = store.segment_path(store._segment)
+        # What a crash mid-batch leaves: a torn line, a torn index record and a segment the batch started
+        with open(last_segment, "ab") as f:
+            f.write(b'{"input": "torn')
+        with open(store.index_file, "ab") as f:
+            f.write(RECORD.pack(0.0, store._segment, 10 ** 6, 40, 2)[:11])
+        with open(store.segment_path(store._segment + 1), "wb") as f:
+            f.write(b'{"input": "lost"}\n')
+        recovered = HistoryStore(tmp, segment_bytes=1024)
+        assert len(recovered) == 50
+        assert recovered.last(1) == [entry(49)]
+        assert not os.path.exists(store.segment_path(store._segment + 1))
+        recovered.append(entry(50))
+        assert HistoryStore(tmp).slice(0, 100) == [entry(i) for i in range(51)]
+
+
+def test_reader_leaves_writer_mid_append_alone():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = filled_store(tmp)
+        finish = begin_append(store, entry(50))
+        sizes = {path: os.path.getsize(path) for path in store.segment_paths()}
+        reader = HistoryStore(tmp, readonly=True)
+        assert len(reader) == 50 and reader.last(1) == [entry(49)]
+        assert replay(tmp, workers=1)["input_count"] == 50
+        assert len(Analytics.from_log(tmp)) == 50
+        assert {path: os.path.getsize(path) for path in store.segment_paths()} == sizes
+        # Another writer waits for the append to finish instead of trimming it as a crash
+        opened = []
+        opener = threading.Thread(target=lambda: opened.append(HistoryStore(tmp, segment_bytes=1024)))
+        opener.start()
+        opener.join(0.2)
+        assert not opened
+        finish()
+        opener.join()
+        assert len(opened[0]) == 51
+        assert HistoryStore(tmp, readonly=True).last(2) == [entry(49), entry(50)]
+
+
+def test_log_reader_mid_append():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = filled_store(tmp)
+        finish = begin_append(store, entry(50))
+        sizes = {path: os.path.getsize(path) for path in store.segment_paths()}
+        with LogReader(tmp) as reader:
+            assert list(reader.field("input")) == [entry(i)["input"] for i in range(50)]
+            assert len(reader.weights()) == len(reader.timestamps()) == 50
+        assert {path: os.path.getsize(path) for path in store.segment_paths()} == sizes
+        finish()
+        with LogReader(tmp) as reader:
+            assert list(reader.records()) == [entry(i) for i in range(51)]
+
+
+def test_writers_share_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        children = [subprocess.Popen([sys.executable, "-c", WRITER_SCRIPT.format(
+            project=PROJECT_DIR, directory=tmp, count=150, name=name)]) for name in ("a", "b")]
+        for child in children:
+            assert child.wait() == 0
+        store = HistoryStore(tmp, readonly=True)
+        entries = store.slice(0, len(store))
+        assert len(entries) == 300
+        for name in ("a", "b"):
+            assert [e["input"] for e in entries if e["input"].startswith(name)] == [f"{name} {i}" for i in range(150)]
+        export = os.path.join(tmp, "history_log.jsonl")
+        store.export_jsonl(export)
+        with open(export, encoding="utf-8") as f:
+            assert len(f.readlines()) == 300
+
+
+if __name__ == "__main__":
+    test_recovers_crashed_append()
+    test_reader_leaves_writer_mid_append_alone()
+    test_log_reader_mid_append()
+    test_writers_share_store()
+    print("All history store tests passed")
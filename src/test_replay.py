@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.gro_instructor import GroInstructor
+from src.replay import log_files, replay
+from src.storage.codec import dumps
+
+# Enough messages for several every-10th summaries, with "summarize" requests and #e3/#DT captures among them
+MESSAGES = [f"Project task {i} #e{i % 5 + 1}" if i % 7 else f"please summarize {i}" for i in range(95)] + [
+    "Ship it #e3 #DT ‘deep thought’ automate the release #DTend", "Hello", "Debug #e9"]
+COMPARED = ["history", "chat_summaries", "e3_reflections", "input_count", "latest_input"]
+
+
+def respond_all(project_dir):
+    os.makedirs(os.path.join(project_dir, "docs"))
+    agent = GroInstructor(project_dir=project_dir, async_markdown=False, retrieval=False, search=False)
+    for message in MESSAGES:
+        agent.respond(message)
+    state = agent.load_state()
+    agent.close()
+    return state, os.path.splitext(agent.log_file)[0]
+
+
+def test_replay_matches_respond():
+    with tempfile.TemporaryDirectory() as tmp:
+        state, log = respond_all(tmp)
+        sequential = replay(log, workers=1)
+        assert {key: sequential.get(key) for key in COMPARED} == {key: state.get(key) for key in COMPARED}
+
+
+def test_parallel_replay_matches_sequential():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, log = respond_all(tmp)
+        # Blank and broken lines shift the chunks' summary phase, which the second pass has to correct
+        jsonl = os.path.join(tmp, "history_log.jsonl")
+        with open(jsonl, "wb") as out:
+            for path in log_files(log):
+                with open(path, "rb") as f:
+                    for i, line in enumerate(f):
+                        out.write(line)
+                        if i % 13 == 0:
+                            out.write(b"\n{\"input\": \"torn\n")
+        expected = dumps(replay(jsonl, workers=1))
+        assert dumps(replay(jsonl, workers=3, chunk_bytes=512)) == expected
+
+
+if __name__ == "__main__":
+    test_replay_matches_respond()
+    test_parallel_replay_matches_sequential()
+    print("All replay tests passed")
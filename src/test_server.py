@@ -0,0 +1,83 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import yaml
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.GrokAgent.GrokAgent import GrokAgent
+from src.utils.server import IngestServer, StateShard
+
+
+def make_agent(tmp, **storage):
+    """A GrokAgent on a config of its own, with the stream summarizer on and state under tmp."""
+    config = {"server": {"host": "127.0.0.1", "port": 0}, "data": {"keywords": ["task"], "history_size": 5},
+              "storage": dict({"root": os.path.join(tmp, "data"), "sessions_root": os.path.join(tmp, "sessions")},
+                              **storage),
+              "summarizer": {"window": 2}}
+    os.makedirs(os.path.join(tmp, "data"))
+    config_file = os.path.join(tmp, "config.yaml")
+    with open(config_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return GrokAgent(config_path=config_file)
+
+
+def test_shard_summarizer_shares_the_engine_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = make_agent(tmp, backend="sqlite")
+        shard = StateShard(agent, os.path.join(tmp, "session", "state.json"))
+        shard.ingest([{"input": f"Project task {i}"} for i in range(4)])
+        assert shard.summarizer.backend is shard.engine.backend
+        assert len(shard.engine.state["chat_summaries"]) == 2
+        shard.close()
+        # Closing the shard closed the only connection it opened
+        try:
+            shard.summarizer.backend.conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            pass
+        else:
+            raise AssertionError("the summarizer's connection is still open")
+        agent.backend.close()
+
+
+def post(server, path, body):
+    """(status, reply) of a POST to the running server."""
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}{path}",
+                                     data=json.dumps(body).encode(), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_batch_is_validated_before_anything_is_applied():
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = make_agent(tmp)
+        server = IngestServer(("127.0.0.1", 0), agent)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            for body in ({"input": "Project task"}, {"inputs": "Project task"},
+                         [{"input": "Project task"}, "not an object"], [{"input": ["not", "text"]}]):
+                status, reply = post(server, "/batch", body)
+                assert status == 400, (body, reply)
+            assert server.engine.state.get("latest_input", "") == ""
+            assert post(server, "/batch", {"inputs": [{"input": "Project task"}]}) == \
+                (200, {"status": "saved", "count": 1})
+            assert post(server, "/batch", []) == (200, {"status": "saved", "count": 0})
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.close()
+            agent.backend.close()
+
+
+if __name__ == "__main__":
+    test_shard_summarizer_shares_the_engine_backend()
+    test_batch_is_validated_before_anything_is_applied()
+    print("All server tests passed")
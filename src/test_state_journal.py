@@ -0,0 +1,169 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.storage.backends import JsonBackend
+from src.storage.bounded_history import BoundedHistory, PRIORITY_FIRST
+from src.storage.state_engine import StateEngine
+
+STAGES = ["tmp_written", "journaled", "renamed"]
+
+# Child process: commit state {"n": 1} over {"n": 0}, dying hard at the given stage
+CRASH_SCRIPT = """
+import os, sys
+sys.path.append({project!r})
+from src.storage import journal
+from src.storage.backends import JsonBackend
+
+def crash(stage):
+    if stage == {stage!r}:
+        os._exit(1)
+
+journal.crash_hook = crash
+JsonBackend({state_file!r}).write_state({{"n": 1, "pad": "x" * 100000}})
+"""
+
+# Child process: increment a shared counter through read-modify-write transactions
+WRITER_SCRIPT = """
+import sys
+sys.path.append({project!r})
+from src.storage.backends import JsonBackend
+
+backend = JsonBackend({state_file!r}, durable=False)
+for _ in range({count}):
+    with backend.transaction(dict) as state:
+        state["n"] = state.get("n", 0) + 1
+"""
+
+
+def run_child(script, **kwargs):
+    code = script.format(project=PROJECT_DIR, **kwargs)
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+
+
+def test_crash_at_each_stage():
+    for stage in STAGES:
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = os.path.join(tmp, "state.json")
+            JsonBackend(state_file).write_state({"n": 0})
+            result = run_child(CRASH_SCRIPT, stage=stage, state_file=state_file)
+            assert result.returncode == 1, result.stderr
+            # Whatever was on disk at the crash, a reader sees a whole state: the old one or the new one
+            state = JsonBackend(state_file).read_state(dict)
+            expected = 0 if stage == "tmp_written" else 1
+            assert state.get("n") == expected, (stage, state.get("n"))
+            assert not os.path.exists(state_file + ".tmp")
+            assert os.path.getsize(state_file + ".journal") == 0
+            print(f"crash at {stage}: recovered n={state['n']}")
+
+
+def test_torn_journal_rolls_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "state.json")
+        JsonBackend(state_file).write_state({"n": 0})
+        # A temp file that doesn't match the journal (or a half-written journal) must not be promoted
+        with open(state_file + ".tmp", "w") as f:
+            f.write('{"n": 1, "pad": "trunc')
+        with open(state_file + ".journal", "w") as f:
+            f.write('{"sha256": "ab')
+        assert JsonBackend(state_file).read_state(dict) == {"n": 0}
+        assert not os.path.exists(state_file + ".tmp")
+
+
+def test_corrupt_state_is_moved_aside():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "state.json")
+        with open(state_file, "w") as f:
+            f.write('{"n": ')
+        assert JsonBackend(state_file).read_state(dict) == {}
+        assert any(name.startswith("state.json.corrupt-") for name in os.listdir(tmp))
+
+
+def test_concurrent_writers_lose_no_updates():
+    writers, count = 4, 50
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "state.json")
+        code = [WRITER_SCRIPT.format(project=PROJECT_DIR, state_file=state_file, count=count)] * writers
+        procs = [subprocess.Popen([sys.executable, "-c", c]) for c in code]
+        for p in procs:
+            assert p.wait() == 0
+        with open(state_file, "r", encoding="utf-8") as f:
+            assert json.load(f)["n"] == writers * count
+        print(f"{writers} writers x {count} transactions: n={writers * count}")
+
+
+def test_resident_engine_merges_other_writers():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "state.json")
+        JsonBackend(state_file).write_state({"n": 0, "input": "", "progress": "old"})
+        engine = StateEngine(state_file, flush_on_exit=False)
+        # Other writers commit while the engine holds unsaved changes of its own
+        result = run_child(WRITER_SCRIPT, state_file=state_file, count=3)
+        assert result.returncode == 0, result.stderr
+        with JsonBackend(state_file).transaction(dict) as state:
+            state["input"] = "scraped"
+            state["progress"] = "theirs"
+        with engine.lock:
+            engine.state["progress"] = "ours"
+            engine.state["history"] = [{"input": "a"}]
+            engine.mark_dirty()
+        engine.close()
+        state = JsonBackend(state_file).read_state(dict)
+        assert state == {"n": 3, "input": "scraped", "progress": "ours", "history": [{"input": "a"}]}
+
+
+def test_same_size_commit_in_the_same_tick_is_merged():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "state.json")
+        JsonBackend(state_file).write_state({"progress": "10:00:00", "n": 0})
+        engine = StateEngine(state_file, flush_on_exit=False)
+        seen = os.stat(state_file)
+        # Another writer's commit of the same size, landing in the same mtime tick
+        JsonBackend(state_file).write_state({"progress": "10:00:01", "n": 0})
+        os.utime(state_file, ns=(seen.st_atime_ns, seen.st_mtime_ns))
+        with engine.lock:
+            engine.state["n"] = 1
+            engine.mark_dirty()
+        engine.close()
+        assert JsonBackend(state_file).read_state(dict) == {"progress": "10:00:01", "n": 1}
+
+
+def test_merged_history_reaches_the_resident_heap():
+    def entry(text, second):
+        return {"input": text, "timestamp": f"2025-03-20T10:00:{second:02d}", "weight": 2}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "state.json")
+        JsonBackend(state_file).write_state({"history": [entry("a", 1)]})
+        engine = StateEngine(state_file, flush_on_exit=False)
+        history = BoundedHistory(3, PRIORITY_FIRST, engine.state["history"])
+        engine.add_flush_hook(history.store)
+        engine.add_merge_hook(history.merge)
+        # Another writer adds an entry while this engine adds its own
+        with JsonBackend(state_file).transaction(dict) as state:
+            state["history"] = [entry("theirs", 2)] + state["history"]
+        with engine.lock:
+            history.push(entry("ours", 3))
+            engine.mark_dirty()
+        engine.flush()
+        # The next flush materializes the heap again; the other writer's entry has to be in it
+        with engine.lock:
+            history.push(entry("later", 4))
+            engine.mark_dirty()
+        engine.close()
+        state = JsonBackend(state_file).read_state(dict)
+        assert [e["input"] for e in state["history"]] == ["later", "ours", "theirs"]
+
+
+if __name__ == "__main__":
+    test_crash_at_each_stage()
+    test_torn_journal_rolls_back()
+    test_corrupt_state_is_moved_aside()
+    test_concurrent_writers_lose_no_updates()
+    test_resident_engine_merges_other_writers()
+    test_same_size_commit_in_the_same_tick_is_merged()
+    test_merged_history_reaches_the_resident_heap()
+    print("All journal tests passed")
@@ -0,0 +1,47 @@
+import os
+import random
+import re
+import sys
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+from src.gro_instructor import new_matcher, RESPONSES
+
+KEYWORDS = [key for key in RESPONSES if not key.startswith("#e")]
+VALID_TAGS = [f"#e{i}" for i in range(1, 6)]
+
+# Pieces that overlap each other's prefixes and suffixes, so the fuzz hits the automaton's fail links
+PIECES = VALID_TAGS + ["#e", "#e6", "#E3", "#", "e", "#D", "#DT", "#DTend", "#dtend", "‘deep thought’",
+                       "‘deep", " thought’", "hello", "HeLLo", "hel", "help", "debug", "summarize", "SUMMARIZE",
+                       "x", " ", "  ", "\n"]
+
+
+def substring_match(message):
+    """What the checks in respond() did before TagMatcher: substring tests and the #DT regex."""
+    tags = {i for i in range(1, 6) if f"#e{i}" in message}
+    weight = max(tags) if tags else None
+    invalid_tag = weight is None and any(tag not in VALID_TAGS and "#e" in tag for tag in message.split())
+    keywords = [key for key in KEYWORDS if key in message.lower()]
+    dt_match = re.search(r"#DT.*?‘deep thought’(.*?)#DTend", message, re.DOTALL)
+    return tags, weight, invalid_tag, keywords, dt_match.group(1) if dt_match else None
+
+
+def test_matches_substring_checks():
+    matcher = new_matcher()
+    rng = random.Random(8)
+    for _ in range(20000):
+        message = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 12)))
+        match = matcher.match(message)
+        assert (match.tags, match.weight, match.invalid_tag, match.keywords, match.dt) == \
+            substring_match(message), message
+
+
+def test_dt_block():
+    match = new_matcher().match("Plan #e3 #DT ‘deep thought’ map the modules #DTend then #DTend")
+    assert match.tags == {3}
+    assert match.dt == " map the modules "
+
+
+if __name__ == "__main__":
+    test_matches_substring_checks()
+    test_dt_block()
+    print("All tag matcher tests passed")
@@ -1,71 +1,226 @@
-import sys
 import os
-sys.path.append("F:/gro_Grok_Template")
-import json
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 try:
     from src.GrokAgent.GrokAgent import GrokAgent
+    from src.GrokAgent.SummarizerAgent import SummarizerAgent
+    from src import metrics
+    from src.storage.state_engine import close_shared_engine, shared_engine
+    from src.storage.sessions import SessionPool, session_dir, storage_roots
+    from src.storage.backends import open_backend
+    from src.storage.codec import dumps, loads
+    from src.tag_matcher import TagMatcher
+    from src.storage.archive import StateArchive, Compactor
+    from src.storage.bounded_history import BoundedHistory, PRIORITY_FIRST
 except ModuleNotFoundError as e:
     print(f"Import failed: {e}")
     sys.exit(1)
 
+matcher = TagMatcher()
+
+def default_state():
+    return {"history": [], "chat_summaries": [], "wip": {}, "related_data": {}, "progress": "", "latest_input": ""}
+
+def check_inputs(inputs):
+    """Raise ValueError unless inputs is a list of chat input dicts, before any of them is applied."""
+    if not isinstance(inputs, list):
+        raise ValueError("Expected a list of chat inputs")
+    for i, data in enumerate(inputs):
+        if not isinstance(data, dict):
+            raise ValueError(f"Input {i} is not an object")
+        if not isinstance(data.get("input", ""), str):
+            raise ValueError(f"Input {i}: 'input' must be a string")
+
+class StateShard:
+    """One state file with its engine, top-K history, compactor and optional stream summarizer."""
+
+    def __init__(self, agent, state_file):
+        self.agent = agent
+        self.state_file = state_file
+        # Commits happen synchronously per request, so no background flushing is needed
+        storage = agent.config.get("storage", {})
+        backend = open_backend(storage.get("backend"), state_file, durable=storage.get("durable", True),
+                               state_format=storage.get("format"))
+        self.engine = shared_engine(backend.path, default_factory=default_state, backend=backend)
+        if self.engine.backend is not backend:
+            backend.close()  # the file already had an engine, which keeps its own backend
+        # Keep the top K entries by weight (desc), then timestamp (desc)
+        history = self.engine.state.get("history")
+        self.history = BoundedHistory(agent.config["data"].get("history_size", 5), PRIORITY_FIRST,
+                                      history if isinstance(history, list) else [])
+        self.engine.add_flush_hook(self.history.store)
+        self.engine.add_merge_hook(self.history.merge)
+        # Keep the hot state under data.max_size_mb; older entries go to the archive
+        self.compactor = None
+        max_size_mb = agent.config["data"].get("max_size_mb")
+        if max_size_mb:
+            archive = StateArchive(os.path.join(os.path.dirname(os.path.abspath(state_file)), "archive"))
+            self.compactor = Compactor(self.engine, archive, max_size_mb).start()
+        # Optionally summarize the ingest stream every summarizer.window inputs, continuing the saved totals
+        self.summarizer = None
+        window = agent.config.get("summarizer", {}).get("window")
+        if window:
+            # It shares the engine's backend, so closing the engine releases everything
+            self.summarizer = SummarizerAgent(state_file, backend=self.engine.backend, window=window,
+                                              keywords=agent.config["data"].get("keywords") or (),
+                                              config_path=agent.config_service.path)
+            self.summarizer.resume(self.engine.state)
+
+    def ingest(self, inputs):
+        """Apply chat inputs under the state file's lock and commit them once."""
+        with self.engine.lock, metrics.span("ingest.apply"):
+            state = self.engine.state
+            for data in inputs:
+                self.apply(state, data)
+            self.engine.mark_dirty(len(inputs))
+        metrics.count("gro_entries_processed_total", len(inputs), stage="ingest")
+        # Concurrent requests share a flush: whoever writes first commits everyone's updates
+        self.engine.flush()
+        return len(inputs)
+
+    def apply(self, state, data):
+        self.agent.apply_input(state, data)
+
+        # Parse e-value tag (the lowest one present wins here)
+        latest_input = data.get("input", "")
+        tags = matcher.match(latest_input).tags
+        weight = min(tags) if tags else 2  # Default to #e2 (medium)
+
+        # Add to history with weight
+        new_entry = {
+            "input": latest_input,
+            "timestamp": datetime.now().isoformat(),
+            "weight": weight
+        }
+        self.history.push(new_entry)
+        if self.summarizer is not None:
+            for summary in self.summarizer.feed(new_entry):
+                self.summarizer.commit(summary, state)
+        state["latest_input"] = latest_input
+        state["progress"] = f"Updated on {datetime.now().isoformat()}"
+
+    def close(self):
+        if self.compactor is not None:
+            self.compactor.stop()
+        close_shared_engine(self.engine)
+
+
+class IngestServer(ThreadingHTTPServer):
+    """Threaded server sharing one GrokAgent; each session's state is a separate shard.
+
+    Requests without a session id go to the default state file. Requests for
+    /sessions/<id> (or carrying an X-Session-ID header) go to that session's
+    own state.json under storage.sessions_root, so unrelated sessions never
+    wait on each other's lock. At most storage.max_sessions shards stay
+    resident; the least recently used are flushed and closed.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, agent, state_file=None, verbose=False, sessions_root=None, max_sessions=None):
+        super().__init__(address, SimpleHTTPRequestHandler)
+        self.agent = agent
+        self.verbose = verbose
+        self.default = StateShard(agent, state_file or agent.state_file)
+        # The default shard's parts, as before sessions existed
+        self.engine, self.history = self.default.engine, self.default.history
+        self.compactor, self.summarizer = self.default.compactor, self.default.summarizer
+        self.sessions_root = sessions_root or storage_roots(agent.config)[1]
+        self.sessions = SessionPool(self.open_session,
+                                    max_sessions or agent.config.get("storage", {}).get("max_sessions") or 64)
+
+    def open_session(self, session_id):
+        directory = session_dir(self.sessions_root, session_id)
+        os.makedirs(directory, exist_ok=True)
+        return StateShard(self.agent, os.path.join(directory, "state.json"))
+
+    def ingest(self, inputs, session_id=None):
+        # A bad item fails the whole request up front, so no earlier item is half-applied
+        check_inputs(inputs)
+        if session_id is None:
+            return self.default.ingest(inputs)
+        with self.sessions.session(session_id) as shard:
+            return shard.ingest(inputs)
+
+    def close(self):
+        """Flush and close every shard."""
+        self.sessions.close()
+        self.default.close()
+
 class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
+    status = None
+
+    def do_GET(self):
+        # Prometheus scrape endpoint; everything else is POST-only
+        if self.path.rstrip("/") == "/metrics":
+            self.send_body(200, metrics.render().encode(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self.send_json(404, {"error": "not found"})
+        metrics.count("gro_http_requests_total", method="GET", status=self.status)
+
     def do_POST(self):
-        print("Received POST request")
-        state_file = "F:/gro_Grok_Template/data/historical/state.json"
+        with metrics.profiled("http.post"), metrics.span("http.post"):
+            self.handle_post()
+        metrics.count("gro_http_requests_total", method="POST", status=self.status)
+
+    def handle_post(self):
         try:
             length = int(self.headers["Content-Length"])
-            data = json.loads(self.rfile.read(length).decode())
-            print(f"Data received: {data}")
-            agent = GrokAgent()
-            agent.scrape_data(data)
-            print("Data scraped")
-
-            # Load state
-            try:
-                with open(state_file, "r") as f:
-                    state = json.load(f)
-            except FileNotFoundError:
-                state = {"history": [], "chat_summaries": [], "wip": {}, "related_data": {}, "progress": "", "latest_input": ""}
-
-            # Parse e-value tag
-            latest_input = data.get("input", "")
-            weight = 2  # Default to #e2 (medium)
-            for i in range(1, 6):
-                if f"#e{i}" in latest_input:
-                    weight = i
-                    break
-
-            # Add to history with weight
-            new_entry = {
-                "input": latest_input,
-                "timestamp": datetime.now().isoformat(),
-                "weight": weight
-            }
-            state["history"].append(new_entry)
-
-            # Sort by weight (desc), then timestamp (desc), keep top 5
-            if len(state["history"]) > 5:
-                state["history"] = sorted(state["history"], key=lambda x: (x["weight"], x["timestamp"]), reverse=True)[:5]
-            state["latest_input"] = latest_input
-            state["progress"] = f"Updated on {datetime.now().isoformat()}"
-
-            # Save state
-            with open(state_file, "w") as f:
-                json.dump(state, f, indent=2)
-            print(f"State saved to: {os.path.abspath(state_file)}")
-
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"status": "saved"}).encode())
+            body = self.rfile.read(length)
+            metrics.count("gro_bytes_read_total", len(body), file="http")
+            data = loads(body)
+            if self.server.verbose:
+                print(f"Data received: {data}")
+            # /sessions/<id>[/batch] (or an X-Session-ID header) routes to that session's shard
+            path = self.path.rstrip("/")
+            session_id = self.headers.get("X-Session-ID")
+            if path.startswith("/sessions/"):
+                session_id, _, path = path[len("/sessions/"):].partition("/")
+                path = "/" + path
+            if path == "/batch":
+                # Accept either {"inputs": [...]} or a bare list of chat inputs; check_inputs rejects anything else
+                inputs = data.get("inputs") if isinstance(data, dict) else data
+                count = self.server.ingest(inputs, session_id)
+                self.send_json(200, {"status": "saved", "count": count})
+            else:
+                self.server.ingest([data], session_id)
+                self.send_json(200, {"status": "saved"})
+        except ValueError as e:
+            # Unparseable body, malformed inputs or an invalid session id
+            self.send_json(400, {"error": str(e)})
         except Exception as e:
             print(f"Error in POST: {str(e)}")
-            self.send_response(500)
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.send_json(500, {"error": str(e)})
+
+    def send_json(self, code, payload):
+        self.send_body(code, dumps(payload).encode(), "application/json")
+
+    def send_body(self, code, body, content_type):
+        self.status = code
+        self.send_response(code)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def run(host=None, port=None, state_file=None, verbose=False):
+    agent = GrokAgent()
+    host = host or agent.config["server"]["host"]
+    port = port or agent.config["server"]["port"]
+    httpd = IngestServer((host, port), agent, state_file=state_file, verbose=verbose)
+    print(f"Server running at {host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.close()
 
-httpd = HTTPServer(('localhost', 8000), SimpleHTTPRequestHandler)
-print("Server running at localhost:8000")
-httpd.serve_forever()
\ No newline at end of file
+if __name__ == "__main__":
+    run(verbose="--verbose" in sys.argv)
@@ -1,6 +1,9 @@
 import os
+import sys
 import json
 import subprocess
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.storage.history_store import HistoryStore
 
 # Base directory
 BASE_DIR = "F:/gro_Grok_Template"
@@ -19,7 +22,7 @@ def check_tidy():
     print("Expect: If 'EXISTS', rerun solidify_template.py to delete.")
 
 def check_state_files():
-    """Step 2: Verify state.json and history_log.jsonl."""
+    """Step 2: Verify state.json, history_log.jsonl and the history_log/ store."""
     print("\nStep 2: Checking state files...")
     state_file = os.path.join(TEMPLATE_DIR, "state.json")
     history_file = os.path.join(TEMPLATE_DIR, "history_log.jsonl")
@@ -53,7 +56,19 @@ def check_state_files():
             print("   Not empty—check contents")
     else:
         print(f" - {history_file} missing—ERROR")
-    print("Expect: state.json matches template, history_log.jsonl is 0 bytes.")
+
+    # Check the history_log/ store, where entries are logged after the first run imports the .jsonl
+    store_dir = os.path.join(TEMPLATE_DIR, "history_log")
+    if os.path.isdir(store_dir):
+        entries = len(HistoryStore(store_dir, readonly=True))
+        print(f" - {store_dir} entries: {entries}")
+        if entries == 0:
+            print("   Empty as expected—GOOD")
+        else:
+            print("   Not empty—check contents")
+    else:
+        print(f" - {store_dir} not created yet—GOOD")
+    print("Expect: state.json matches template, history_log.jsonl is 0 bytes, history_log/ empty or absent.")
 
 def check_setup_md():
     """Step 3: Verify SETUP.md contents."""